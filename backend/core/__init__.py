@@ -1,2 +1,2 @@
 from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from .database import db, close_db
+from .database import db, close_db, ensure_indexes, run_in_transaction, bulk_write_atomic
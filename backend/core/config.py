@@ -17,3 +17,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 # Email Configuration
 SUPPORT_EMAIL = os.environ.get('SUPPORT_EMAIL', 'support@bharatbit.world')
 OTC_EMAIL = os.environ.get('OTC_EMAIL', 'otc@bharatbit.world')
+
+# Uploads (multipart KYC images, wallet and payment proofs)
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 10 * 1024 * 1024))  # per file
@@ -1,8 +1,174 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
+from pymongo.errors import OperationFailure
 from .config import MONGO_URL, DB_NAME
 
+logger = logging.getLogger(__name__)
+
 client = AsyncIOMotorClient(MONGO_URL)
 db = client[DB_NAME]
 
+T = TypeVar("T")
+
+# (collection, keys, options) - created on startup, each one independently so
+# a single failure (e.g. existing duplicates blocking a unique index) does not
+# stop the others from being built.
+INDEXES = [
+    ("wallet_ledger", [("user_id", 1), ("created_at", 1), ("id", 1)], {}),
+    # At most one entry per order, so a completed order can never be credited twice
+    (
+        "wallet_ledger", "order_id",
+        {"unique": True, "partialFilterExpression": {"order_id": {"$type": "string"}}}
+    ),
+    ("wallet_ledger", [("created_at", 1), ("id", 1)], {}),
+    ("wallet_ledger", [("asset", 1), ("user_id", 1)], {}),
+    ("ledger_checkpoints", [("user_id", 1), ("as_of", -1)], {"unique": True}),
+    ("ledger_checkpoints", [("as_of", -1)], {}),
+    ("orders", "status", {}),
+    ("orders", "created_at", {}),
+    ("orders", "updated_at", {}),
+    ("orders", [("created_at", -1), ("id", -1)], {}),
+    ("orders", [("status", 1), ("created_at", -1), ("id", -1)], {}),
+    ("orders", [("user_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("orders", [("total_inr", -1), ("id", -1)], {}),
+    ("users", "id", {}),
+    ("users", "email", {}),
+    ("users", "client_uid", {}),
+    ("users", [("role", 1), ("created_at", -1), ("id", -1)], {}),
+    ("users", [("rm_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("users", [("rm_id", 1), ("kyc_status", 1)], {}),
+    ("users", [("full_name", "text"), ("company_name", "text")], {"weights": {"full_name": 2, "company_name": 1}}),
+    ("orders", [("rm_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("orders", [("asset", 1), ("user_id", 1)], {}),
+    ("orders", "tx_hash", {"sparse": True}),
+    ("orders", "wallet_address", {"sparse": True}),
+    ("daily_stats", [("metric", 1), ("date", 1)], {}),
+    ("daily_stats", [("metric", 1), ("rm_id", 1), ("date", 1)], {}),
+    ("reconciliation_reports", [("started_at", -1)], {}),
+    ("push_fanouts", "id", {"unique": True}),
+    ("kyc_documents", "user_id", {"unique": True}),
+    ("kyc_documents", "id", {}),
+    ("kyc_documents", [("status", 1), ("submitted_at", -1), ("id", -1)], {}),
+    ("kyc_documents", [("submitted_at", 1), ("id", 1)], {}),
+    ("kyc_documents", [("status", 1), ("auto_verification.status", 1), ("submitted_at", -1), ("id", -1)], {}),
+    (
+        "kyc_documents", "fingerprints.pan",
+        {"unique": True, "partialFilterExpression": {"fingerprints.pan": {"$type": "string"}}}
+    ),
+    (
+        "kyc_documents", "fingerprints.aadhaar",
+        {"unique": True, "partialFilterExpression": {"fingerprints.aadhaar": {"$type": "string"}}}
+    ),
+    # Non-unique copy used by duplicate checks and the collisions report
+    ("kyc_documents", "collision_fingerprints.pan", {"sparse": True}),
+    ("kyc_documents", "collision_fingerprints.aadhaar", {"sparse": True}),
+    ("kyc_documents", "collision_fingerprints.bank", {"sparse": True}),
+    # Reference checks before deleting a blob (services.blob_store.release_blob)
+    ("kyc_documents", [("documents.$**", 1)], {}),
+    ("orders", "payment_proof_document.sha256", {"sparse": True}),
+    ("saved_wallets", "proof_document.sha256", {"sparse": True}),
+    ("kyc_documents", "reviewed_at", {"sparse": True}),
+    ("kyc_documents", "auto_verification.completed_at", {"sparse": True}),
+    ("kyc_image_hashes", "phash", {}),
+    ("kyc_image_hashes", "kyc_id", {}),
+    ("kyc_image_hashes", "created_at", {}),
+    ("kyc_verification_cache", "key", {"unique": True}),
+    ("kyc_verification_cache", "expires_at", {"expireAfterSeconds": 0}),
+    (
+        "saved_wallets",
+        [("user_id", 1), ("normalized_address", 1), ("network_key", 1)],
+        {"unique": True, "partialFilterExpression": {"normalized_address": {"$exists": True}}}
+    ),
+    ("saved_wallets", [("normalized_address", 1), ("network_key", 1)], {}),
+    ("saved_wallets", "verification_status", {}),
+    ("saved_wallets", [("verification_status", 1), ("created_at", -1), ("id", -1)], {}),
+    ("saved_wallets", [("user_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("saved_wallets", [("created_at", -1), ("id", -1)], {}),
+    ("saved_wallets", "verified_at", {"sparse": True}),
+]
+
+# An index with the same name already exists with different options
+INDEX_OPTIONS_CONFLICT_CODES = (85, 86)
+
+async def _replace_index(collection: str, keys, options: Dict, error: OperationFailure):
+    """
+    Rebuild an index whose options changed (e.g. made unique). If the new
+    definition cannot be built (e.g. existing duplicates), the old one is
+    restored so lookups stay indexed, and the failure is logged.
+    """
+    key_spec = [(keys, 1)] if isinstance(keys, str) else [tuple(key) for key in keys]
+    existing = await db[collection].index_information()
+    name = next((name for name, index in existing.items() if index["key"] == key_spec), None)
+    if name is None:
+        raise error
+    old_options = {k: v for k, v in existing[name].items() if k not in ("key", "v", "ns")}
+    await db[collection].drop_index(name)
+    try:
+        await db[collection].create_index(keys, **options)
+        logger.info(f"Rebuilt index {name} on {collection} with {options}")
+    except OperationFailure as e:
+        await db[collection].create_index(keys, **old_options)
+        logger.error(f"Kept the previous {name} index on {collection}; could not apply {options}: {e}")
+
+async def ensure_indexes():
+    """Create the indexes the routers and jobs rely on (safe to run on every startup)"""
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            if e.code not in INDEX_OPTIONS_CONFLICT_CODES:
+                logger.error(f"Failed to create index {keys} on {collection}: {e}")
+                continue
+            try:
+                await _replace_index(collection, keys, options, e)
+            except Exception as e:
+                logger.error(f"Failed to replace index {keys} on {collection}: {e}")
+        except Exception as e:
+            logger.error(f"Failed to create index {keys} on {collection}: {e}")
+
+# None until the first transaction is attempted; standalone servers reject
+# transactions, in which case callbacks run without a session.
+_transactions_supported: Optional[bool] = None
+
+def _transactions_unsupported(error: OperationFailure) -> bool:
+    return error.code == 20 or "Transaction numbers are only allowed" in str(error)
+
+async def run_in_transaction(callback: Callable[[Optional[AsyncIOMotorClientSession]], Awaitable[T]]) -> T:
+    """
+    Run `await callback(session)` as one multi-document transaction.
+    
+    The callback must pass `session` to every read and write it makes. The
+    whole callback is retried on TransientTransactionError (e.g. a write
+    conflict with a concurrent request) and the commit on
+    UnknownTransactionCommitResult. On a standalone server without
+    transaction support the callback runs once with session=None.
+    """
+    global _transactions_supported
+    if _transactions_supported is False:
+        return await callback(None)
+    
+    async with await client.start_session() as session:
+        try:
+            result = await session.with_transaction(callback)
+        except OperationFailure as e:
+            if _transactions_supported is None and _transactions_unsupported(e):
+                logger.warning("MongoDB transactions not supported by this deployment; running without them")
+                _transactions_supported = False
+                return await callback(None)
+            raise
+    
+    _transactions_supported = True
+    return result
+
+async def bulk_write_atomic(operations: Dict[str, List]) -> Dict[str, object]:
+    """Apply one ordered bulk_write per collection, all inside a single transaction"""
+    async def apply(session):
+        return {
+            name: await db[name].bulk_write(ops, ordered=True, session=session)
+            for name, ops in operations.items() if ops
+        }
+    return await run_in_transaction(apply)
+
 async def close_db():
     client.close()
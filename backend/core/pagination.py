@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+
+# Keyset (cursor) pagination over (created_at, id), newest first, or over
+# (field, id) in either direction. The cursor is the sort key of the last
+# item on the previous page, so each page is a bounded index range scan no
+# matter how deep the client pages. The sort field must be present on every
+# document.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(doc: dict, field: str = "created_at") -> str:
+    value = doc[field]
+    payload = {"v": value.isoformat() if isinstance(value, datetime) else value, "id": doc["id"], "f": field}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: str, field: str = "created_at", direction: int = -1) -> dict:
+    """Turn a cursor into the filter selecting everything after it in the given sort order"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        value = payload["v"]
+        if field.endswith("_at"):
+            value = datetime.fromisoformat(value)
+        last_id = payload["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("f", field) != field:
+        raise HTTPException(status_code=400, detail="Cursor belongs to a different sort order")
+    
+    after = "$lt" if direction < 0 else "$gt"
+    return {"$or": [
+        {field: {after: value}},
+        {field: value, "id": {after: last_id}}
+    ]}
+
+def apply_cursor(query: dict, cursor: Optional[str], field: str = "created_at", direction: int = -1) -> dict:
+    if not cursor:
+        return query
+    after = decode_cursor(cursor, field, direction)
+    return {"$and": [query, after]} if query else after
+
+def sort_spec(field: str = "created_at", direction: int = -1):
+    return [(field, direction), ("id", direction)]
@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+import math
+import re
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, List
+from xml.sax.saxutils import escape
+
+# Export helpers: turn a Motor cursor into CSV/NDJSON text chunks for a
+# StreamingResponse. Rows are pulled in driver-sized batches and flushed every
+# EXPORT_FLUSH_ROWS rows, so memory stays flat regardless of result size.
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FLUSH_ROWS = 500
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):  # Enum
+        return value.value
+    return value
+
+# Text a spreadsheet would run as a formula (e.g. "=HYPERLINK(...)" in a
+# wallet label) is exported with a leading apostrophe so it stays text
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def _cell_text(value):
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _batched(cursor):
+    # Aggregation cursors are batched by the batchSize passed to aggregate()
+    return cursor.batch_size(EXPORT_BATCH_SIZE) if hasattr(cursor, "batch_size") else cursor
+
+async def stream_csv(cursor, columns: List[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    
+    async for doc in _batched(cursor):
+        writer.writerow([_cell_text(_serialize(doc.get(col))) for col in columns])
+        rows += 1
+        if rows % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+async def stream_ndjson(cursor, columns: List[str]) -> AsyncIterator[str]:
+    chunk = []
+    async for doc in _batched(cursor):
+        chunk.append(json.dumps({col: _serialize(doc.get(col)) for col in columns}))
+        if len(chunk) >= EXPORT_FLUSH_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+# XLSX is a zip of XML parts. The zip is written to an unseekable sink
+# (entries carry trailing data descriptors), so each worksheet is
+# deflated and handed to the client as rows arrive; the workbook parts
+# that list the sheets are written last, once their number is known.
+XLSX_MAX_ROWS = 1_048_576  # Excel's per-sheet limit, header row included
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}'
+    '</Types>'
+)
+_XLSX_SHEET_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>'
+)
+_XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_END = '</sheetData></worksheet>'
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that collects bytes for the generator to yield"""
+    def __init__(self):
+        self.chunks: List[bytes] = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+# Characters XML 1.0 does not allow even when escaped
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+def _xlsx_cell(value) -> str:
+    value = _serialize(value)
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        # Excel has no NaN or infinity; leave the cell empty
+        return f"<c><v>{value}</v></c>" if math.isfinite(value) else "<c/>"
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str)
+    value = _cell_text(_XML_ILLEGAL.sub("", value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(value)}</t></is></c>'
+
+def _xlsx_row(values) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+async def stream_xlsx(cursor, columns: List[str]) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+    header = _xlsx_row(columns)
+    sheets = 0
+    sheet = None
+    rows = 0
+    
+    def open_sheet():
+        nonlocal sheets, sheet, rows
+        sheets += 1
+        sheet = archive.open(f"xl/worksheets/sheet{sheets}.xml", "w", force_zip64=True)
+        sheet.write((_XLSX_SHEET_START + header).encode())
+        rows = 1
+    
+    open_sheet()
+    buffered = []
+    async for doc in _batched(cursor):
+        if rows == XLSX_MAX_ROWS:
+            sheet.write("".join(buffered).encode())
+            buffered = []
+            sheet.write(_XLSX_SHEET_END.encode())
+            sheet.close()
+            open_sheet()
+        buffered.append(_xlsx_row(doc.get(col) for col in columns))
+        rows += 1
+        if len(buffered) >= EXPORT_FLUSH_ROWS:
+            sheet.write("".join(buffered).encode())
+            buffered = []
+            data = sink.drain()
+            if data:
+                yield data
+    
+    sheet.write(("".join(buffered) + _XLSX_SHEET_END).encode())
+    sheet.close()
+    
+    numbers = range(1, sheets + 1)
+    archive.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES.format(
+        sheets="".join(_XLSX_SHEET_TYPE.format(n=n) for n in numbers)
+    ))
+    archive.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+    archive.writestr("xl/workbook.xml", _XLSX_WORKBOOK.format(
+        sheets="".join(f'<sheet name="Sheet{n}" sheetId="{n}" r:id="rId{n}"/>' for n in numbers)
+    ))
+    archive.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS.format(rels="".join(
+        f'<Relationship Id="rId{n}" '
+        f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{n}.xml"/>'
+        for n in numbers
+    )))
+    archive.close()
+    yield sink.drain()
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+    "xlsx": (stream_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
@@ -9,5 +9,6 @@ from .schemas import (
     CreateOrderRequest, UpdateOrderRequest, SaveWalletRequest,
     AdminKYCActionRequest, AdminOrderUpdateRequest, AdminRateUpdateRequest,
     ManualLedgerEntryRequest, AssignRMRequest, AdminWalletActionRequest,
-    RegisterPushTokenRequest
+    AdminBulkKYCActionRequest, AdminBulkWalletActionRequest,
+    RegisterPushTokenRequest, WalletAddressItem, AdminValidateAddressesRequest
 )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -65,6 +65,7 @@ class User(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
     relationship_manager: Optional[str] = None
+    rm_id: Optional[str] = None  # Admin account of the relationship manager
     rm_phone: Optional[str] = None
     rm_whatsapp: Optional[str] = None
     push_token: Optional[str] = None  # For push notifications
@@ -97,6 +98,7 @@ class KYCDocument(BaseModel):
     nominee_name: str
     nominee_relationship: str
     nominee_dob: str
+    documents: Dict[str, Dict] = Field(default_factory=dict)  # Image field -> blob reference
     status: KYCStatus = KYCStatus.PENDING
     submitted_at: datetime = Field(default_factory=datetime.utcnow)
     reviewed_at: Optional[datetime] = None
@@ -113,9 +115,11 @@ class Order(BaseModel):
     total_inr: float
     status: OrderStatus = OrderStatus.AWAITING_PAYMENT
     payment_proof: Optional[str] = None
+    payment_proof_document: Optional[Dict] = None  # Blob reference for uploaded proofs
     tx_hash: Optional[str] = None
     wallet_address: Optional[str] = None
     notes: Optional[str] = None
+    rm_id: Optional[str] = None  # Client's relationship manager, for RM book views
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = None
 
@@ -161,8 +165,11 @@ class SavedWallet(BaseModel):
     asset: str
     network: str
     wallet_address: str
+    normalized_address: Optional[str] = None  # Per-network canonical form, uniquely indexed
+    network_key: Optional[str] = None
     label: str
     proof_image: Optional[str] = None
+    proof_document: Optional[Dict] = None  # Blob reference for uploaded proofs
     verification_status: WalletVerificationStatus = WalletVerificationStatus.PENDING
     is_primary: bool = False
     admin_notes: Optional[str] = None
@@ -271,6 +278,8 @@ class AdminRateUpdateRequest(BaseModel):
     buy_rate: float
     sell_rate: float
     user_specific: Optional[str] = None
+    # Push the new rate to clients: "all", or "asset" for those who trade or hold it
+    notify: Optional[str] = Field(None, pattern="^(all|asset)$")
 
 class ManualLedgerEntryRequest(BaseModel):
     user_id: str
@@ -283,11 +292,29 @@ class AssignRMRequest(BaseModel):
     rm_name: str
     rm_phone: str
     rm_whatsapp: Optional[str] = None
+    rm_id: Optional[str] = None  # Admin account of the RM; clients appear in that RM's book (omit to keep it, null to clear)
+
+class WalletAddressItem(BaseModel):
+    network: str
+    address: str
+
+class AdminValidateAddressesRequest(BaseModel):
+    addresses: List[WalletAddressItem] = Field(..., max_length=10000)
 
 class AdminWalletActionRequest(BaseModel):
     wallet_id: str
     action: str  # "approve" or "reject"
     notes: Optional[str] = None
 
+class AdminBulkKYCActionRequest(BaseModel):
+    kyc_ids: List[str] = Field(..., min_length=1, max_length=500)
+    action: str  # "approve" or "reject", applied to every document
+    rejection_reason: Optional[str] = None
+
+class AdminBulkWalletActionRequest(BaseModel):
+    wallet_ids: List[str] = Field(..., min_length=1, max_length=500)
+    action: str  # "approve" or "reject", applied to every wallet
+    notes: Optional[str] = None
+
 class RegisterPushTokenRequest(BaseModel):
     push_token: str
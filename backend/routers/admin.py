@@ -1,47 +1,213 @@
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+import asyncio
 import logging
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 
-from core.database import db
+from core.database import db, run_in_transaction
 from core.dependencies import get_admin_user
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_cursor, encode_cursor, sort_spec
+from core.streaming import EXPORT_BATCH_SIZE, EXPORT_FORMATS
 from models import (
-    KYCStatus, OrderStatus, UserRole, TransactionType,
+    KYCStatus, OrderStatus, OrderType, UserRole, TransactionType, AccountType, WalletVerificationStatus,
     AdminKYCActionRequest, AdminOrderUpdateRequest, AdminRateUpdateRequest,
     ManualLedgerEntryRequest, AssignRMRequest, AdminWalletActionRequest,
+    AdminValidateAddressesRequest, AdminBulkKYCActionRequest, AdminBulkWalletActionRequest,
     AssetRate, WalletLedger, User
 )
-from services.push_service import notify_kyc_approved, notify_kyc_rejected, notify_order_status_update
+from services.push_service import (
+    push_service, push_message, kyc_approved_content, kyc_rejected_content, wallet_decision_content,
+    notify_kyc_approved, notify_kyc_rejected, notify_order_status_update
+)
+from services.reconciliation_service import start_reconciliation
+from services.rate_notifications import enqueue_rate_notification
+from services.ledger_service import to_utc_naive
+from services.analytics_service import (
+    ANALYTICS_TIMEZONE, TIMESERIES_GRANULARITIES, TIMESERIES_GROUPS,
+    get_dashboard_analytics, get_order_timeseries, get_rm_book_stats
+)
+from services.order_cache import (
+    order_columns, BUCKETS as ORDER_CACHE_BUCKETS, DIMENSIONS as ORDER_CACHE_DIMENSIONS, METRICS as ORDER_CACHE_METRICS
+)
+from services.admin_search import MIN_QUERY_LENGTH, search as search_all
+from services.admin_events import event_stream
+from services.daily_stats import (
+    move_rm_orders, record_order_status_change, record_kyc_status_change, record_kyc_status_changes, record_user_registered
+)
+from services.wallet_address import normalize_address, network_key, address_lookup_candidates
+from services.address_validation import validate_addresses
+from services.blob_store import decode_data_url, blob_response
+from services.kyc_verification import AUTO_VERIFICATION_STATUSES, enqueue_kyc_verification
+from services.image_similarity import find_similar_images
+from services.identity_fingerprints import collision_report, find_collisions
+from services.kyc_storage import (
+    KYC_IMAGE_FIELDS, KYC_QUEUE_PROJECTION, TEXT_OR_IMAGE_FIELDS, document_links, drop_inline_images
+)
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 logger = logging.getLogger(__name__)
 
+# Admin list endpoints page with a cursor over (sort field, id) and join the
+# owning user's contact fields in the same aggregation. Sort fields are
+# limited to ones present on every document so the cursor stays valid.
+SORT_ORDERS = {"desc": -1, "asc": 1}
+ORDER_SORT_FIELDS = ("created_at", "total_inr", "quantity")
+WALLET_SORT_FIELDS = ("created_at",)
+USER_SORT_FIELDS = ("created_at", "email")
+
+USER_JOIN = [
+    {"$lookup": {
+        "from": "users",
+        "localField": "user_id",
+        "foreignField": "id",
+        "pipeline": [{"$project": {"_id": 0, "email": 1, "mobile": 1, "full_name": 1, "client_uid": 1}}],
+        "as": "_user"
+    }},
+    {"$set": {
+        "user_email": {"$first": "$_user.email"},
+        "user_mobile": {"$first": "$_user.mobile"},
+        "user_name": {"$first": "$_user.full_name"},
+        "client_uid": {"$first": "$_user.client_uid"}
+    }}
+]
+
+def _sort_param(fields) -> str:
+    return f"^({'|'.join(fields)})$"
+
+def _date_range(query: dict, start: Optional[datetime], end: Optional[datetime], field: str = "created_at") -> dict:
+    bounds = {}
+    if start:
+        bounds["$gte"] = to_utc_naive(start)
+    if end:
+        bounds["$lt"] = to_utc_naive(end)
+    if bounds:
+        query[field] = bounds
+    return query
+
+async def _resolve_user_id(user: str) -> str:
+    """Accept a user id, email or client ID for list filters"""
+    found = await db.users.find_one(
+        {"$or": [{"id": user}, {"email": user.lower()}, {"client_uid": user}]},
+        {"_id": 0, "id": 1}
+    )
+    if not found:
+        raise HTTPException(status_code=404, detail="User not found")
+    return found["id"]
+
+async def _page(
+    collection,
+    query: dict,
+    response: Response,
+    sort: str,
+    order: str,
+    limit: int,
+    cursor: Optional[str],
+    join_user: bool = True,
+    exclude: tuple = (),
+    projection: Optional[dict] = None
+) -> list:
+    direction = SORT_ORDERS[order]
+    pipeline = [
+        {"$match": apply_cursor(query, cursor, sort, direction)},
+        {"$sort": dict(sort_spec(sort, direction))},
+        {"$limit": limit}
+    ]
+    if projection:
+        pipeline.append({"$project": projection})
+    if join_user:
+        pipeline += USER_JOIN
+        exclude += ("_user",)
+    pipeline.append({"$project": {"_id": 0, **{field: 0 for field in exclude}}})
+    
+    docs = await collection.aggregate(pipeline).to_list(limit)
+    if len(docs) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1], sort)
+    return docs
+
+def _user_query(
+    kyc_status: Optional[KYCStatus],
+    account_type: Optional[AccountType],
+    frozen: Optional[bool],
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> dict:
+    query = _date_range({"role": "user"}, start, end)
+    if kyc_status:
+        query["kyc_status"] = kyc_status.value
+    if account_type:
+        query["account_type"] = account_type.value
+    if frozen is not None:
+        query["is_frozen"] = frozen if frozen else {"$ne": True}
+    return query
+
 @router.get("/users")
-async def admin_get_users(admin: dict = Depends(get_admin_user)):
-    users = await db.users.find({"role": "user"}, {"password_hash": 0}).to_list(100)
-    for user in users:
-        user.pop("_id", None)
-    return users
+async def admin_get_users(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    kyc_status: Optional[KYCStatus] = Query(None),
+    account_type: Optional[AccountType] = Query(None),
+    frozen: Optional[bool] = Query(None),
+    start: Optional[datetime] = Query(None, description="Registered at or after"),
+    end: Optional[datetime] = Query(None, description="Registered before"),
+    sort: str = Query("created_at", pattern=_sort_param(USER_SORT_FIELDS)),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    admin: dict = Depends(get_admin_user)
+):
+    query = _user_query(kyc_status, account_type, frozen, start, end)
+    return await _page(db.users, query, response, sort, order, limit, cursor, join_user=False, exclude=("password_hash",))
 
 @router.get("/kyc-pending")
-async def admin_get_pending_kyc(admin: dict = Depends(get_admin_user)):
-    kyc_docs = await db.kyc_documents.find({"status": {"$in": ["pending", "under_review"]}}).to_list(100)
+async def admin_get_pending_kyc(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    auto_status: Optional[str] = Query(None, pattern=f"^({'|'.join(AUTO_VERIFICATION_STATUSES)})$"),
+    admin: dict = Depends(get_admin_user)
+):
+    """
+    Review queue summaries, newest first. Images are not included; each row
+    links to its documents (and thumbnails) for loading on demand.
+    auto_status narrows the queue to one automated verification outcome.
+    """
+    query = {"status": {"$in": ["pending", "under_review"]}}
+    if auto_status:
+        query["auto_verification.status"] = auto_status
+    query = apply_cursor(query, cursor, "submitted_at")
+    kyc_docs = await db.kyc_documents.find(query, KYC_QUEUE_PROJECTION).sort(sort_spec("submitted_at")).to_list(limit)
     
     user_ids = list(set(doc["user_id"] for doc in kyc_docs if doc.get("user_id")))
-    users = await db.users.find({"id": {"$in": user_ids}}).to_list(len(user_ids))
+    users = await db.users.find(
+        {"id": {"$in": user_ids}},
+        {"_id": 0, "id": 1, "email": 1, "mobile": 1}
+    ).to_list(len(user_ids))
     user_map = {u["id"]: u for u in users}
     
     for doc in kyc_docs:
-        doc.pop("_id", None)
+        doc["documents"] = document_links(doc["id"], doc.get("documents") or {})
         user = user_map.get(doc.get("user_id"))
         if user:
-            doc["user_email"] = user["email"]
-            doc["user_mobile"] = user["mobile"]
+            doc["user_email"] = user.get("email")
+            doc["user_mobile"] = user.get("mobile")
     
+    if len(kyc_docs) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(kyc_docs[-1], "submitted_at")
     return kyc_docs
 
+@router.get("/kyc/collisions")
+async def admin_kyc_collisions(admin: dict = Depends(get_admin_user)):
+    """KYC documents sharing a PAN, Aadhaar or bank account, grouped by fingerprint"""
+    return await collision_report()
+
 @router.get("/kyc/{kyc_id}")
 async def admin_get_kyc_detail(kyc_id: str, admin: dict = Depends(get_admin_user)):
-    kyc_doc = await db.kyc_documents.find_one({"id": kyc_id})
+    # Images are not inlined; each is fetched from its document URL when viewed
+    kyc_doc = await db.kyc_documents.find_one(
+        {"id": kyc_id}, {field: 0 for field in KYC_IMAGE_FIELDS if field not in TEXT_OR_IMAGE_FIELDS}
+    )
     if not kyc_doc:
         raise HTTPException(status_code=404, detail="KYC not found")
     
@@ -51,34 +217,89 @@ async def admin_get_kyc_detail(kyc_id: str, admin: dict = Depends(get_admin_user
         user.pop("_id", None)
         user.pop("password_hash", None)
     kyc_doc["user"] = user
+    # Near-duplicates of these images and shared identity numbers from other users
+    kyc_doc["similar_images"] = await find_similar_images(kyc_doc)
+    kyc_doc.pop("fingerprints", None)
+    kyc_doc["identity_collisions"] = await find_collisions(kyc_doc.pop("collision_fingerprints", None) or {}, kyc_doc["user_id"])
     
-    return kyc_doc
+    kyc_doc["documents"] = document_links(kyc_doc["id"], kyc_doc.get("documents") or {})
+    return drop_inline_images(kyc_doc)
 
-@router.post("/kyc/action")
-async def admin_kyc_action(data: AdminKYCActionRequest, admin: dict = Depends(get_admin_user)):
-    kyc_doc = await db.kyc_documents.find_one({"id": data.kyc_id})
+@router.post("/kyc/{kyc_id}/verify")
+async def admin_rerun_kyc_verification(kyc_id: str, admin: dict = Depends(get_admin_user)):
+    """Queue the automated PAN/Aadhaar/bank checks again for a KYC document"""
+    result = await db.kyc_documents.update_one(
+        {"id": kyc_id},
+        {"$set": {"auto_verification": {"status": "queued", "queued_at": datetime.utcnow()}}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="KYC not found")
+    
+    enqueue_kyc_verification(kyc_id)
+    return {"success": True, "message": "Verification queued"}
+
+@router.get("/kyc/{kyc_id}/documents/{field}")
+async def admin_get_kyc_image(
+    kyc_id: str,
+    field: str,
+    variant: str = Query("image", pattern="^(image|thumbnail)$"),
+    admin: dict = Depends(get_admin_user)
+):
+    """Stream one KYC image (or its thumbnail) from the blob store"""
+    if field not in KYC_IMAGE_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown document")
+    
+    kyc_doc = await db.kyc_documents.find_one({"id": kyc_id}, {"_id": 0, f"documents.{field}": 1, field: 1})
     if not kyc_doc:
         raise HTTPException(status_code=404, detail="KYC not found")
     
+    ref = (kyc_doc.get("documents") or {}).get(field)
+    if not ref:
+        # Not migrated yet: the image is still inline in the KYC document
+        if not kyc_doc.get(field):
+            raise HTTPException(status_code=404, detail="Document not uploaded")
+        try:
+            data, content_type = decode_data_url(kyc_doc[field])
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Stored document is not valid image data")
+        return Response(content=data, media_type=content_type)
+    
+    if variant == "thumbnail" and ref.get("thumbnail"):
+        ref = ref["thumbnail"]
+    return await blob_response(ref)
+
+@router.post("/kyc/action")
+async def admin_kyc_action(data: AdminKYCActionRequest, admin: dict = Depends(get_admin_user)):
     new_status = KYCStatus.APPROVED if data.action == "approve" else KYCStatus.REJECTED
     
-    await db.kyc_documents.update_one(
-        {"id": data.kyc_id},
-        {"$set": {
-            "status": new_status,
-            "reviewed_at": datetime.utcnow(),
-            "reviewed_by": admin["id"],
-            "rejection_reason": data.rejection_reason
-        }}
-    )
+    async def apply(session):
+        kyc_doc = await db.kyc_documents.find_one_and_update(
+            {"id": data.kyc_id},
+            {"$set": {
+                "status": new_status,
+                "reviewed_at": datetime.utcnow(),
+                "reviewed_by": admin["id"],
+                "rejection_reason": data.rejection_reason
+            }},
+            projection={"user_id": 1},
+            session=session
+        )
+        if not kyc_doc:
+            raise HTTPException(status_code=404, detail="KYC not found")
+        
+        user = await db.users.find_one_and_update(
+            {"id": kyc_doc["user_id"]},
+            {"$set": {"kyc_status": new_status}},
+            projection={"email": 1, "push_token": 1, "role": 1, "kyc_status": 1, "created_at": 1},
+            session=session
+        )
+        if user:
+            await record_kyc_status_change(user, user.get("kyc_status"), new_status, session)
+        return user
     
-    await db.users.update_one(
-        {"id": kyc_doc["user_id"]},
-        {"$set": {"kyc_status": new_status}}
-    )
+    user = await run_in_transaction(apply)
     
     # Send push notification
-    user = await db.users.find_one({"id": kyc_doc["user_id"]})
     if user and user.get("push_token"):
         push_tokens = [user["push_token"]]
         if data.action == "approve":
@@ -88,39 +309,187 @@ async def admin_kyc_action(data: AdminKYCActionRequest, admin: dict = Depends(ge
     
     return {"success": True, "message": f"KYC {data.action}d successfully"}
 
-@router.get("/wallets/pending")
-async def admin_get_pending_wallets(admin: dict = Depends(get_admin_user)):
-    wallets = await db.saved_wallets.find({"verification_status": "pending"}).sort("created_at", -1).to_list(100)
+BULK_ACTIONS = ("approve", "reject")
+
+def _check_bulk_action(action: str):
+    if action not in BULK_ACTIONS:
+        raise HTTPException(status_code=400, detail="Action must be approve or reject")
+
+async def _send_bulk_push(results: list, messages: list):
+    """Send (result, message) pairs as one batched push and record each ticket on its result"""
+    tickets = await push_service.send_push_messages([message for _, message in messages])
+    for (result, _), ticket in zip(messages, tickets):
+        result["notified"] = ticket.get("status") == "ok"
+        if ticket.get("status") != "ok":
+            result["push_error"] = ticket.get("message")
+
+@router.post("/kyc/bulk-action")
+async def admin_bulk_kyc_action(data: AdminBulkKYCActionRequest, admin: dict = Depends(get_admin_user)):
+    """
+    Approve or reject many KYC documents at once. Documents and users are
+    each updated with one bulk write inside a single transaction, and the
+    resulting push notifications go out as one batched send.
+    """
+    _check_bulk_action(data.action)
+    new_status = KYCStatus.APPROVED if data.action == "approve" else KYCStatus.REJECTED
+    kyc_ids = list(dict.fromkeys(data.kyc_ids))
     
-    user_ids = list(set(w["user_id"] for w in wallets if w.get("user_id")))
-    users = await db.users.find({"id": {"$in": user_ids}}).to_list(len(user_ids))
-    user_map = {u["id"]: u for u in users}
+    async def apply(session):
+        kyc_docs = await db.kyc_documents.find(
+            {"id": {"$in": kyc_ids}}, {"_id": 0, "id": 1, "user_id": 1}, session=session
+        ).to_list(len(kyc_ids))
+        if not kyc_docs:
+            return kyc_docs, {}
+        
+        user_ids = list({doc["user_id"] for doc in kyc_docs})
+        users = await db.users.find(
+            {"id": {"$in": user_ids}},
+            {"_id": 0, "id": 1, "email": 1, "push_token": 1, "role": 1, "kyc_status": 1, "created_at": 1},
+            session=session
+        ).to_list(len(user_ids))
+        
+        reviewed_at = datetime.utcnow()
+        await db.kyc_documents.bulk_write([
+            UpdateOne({"id": doc["id"]}, {"$set": {
+                "status": new_status,
+                "reviewed_at": reviewed_at,
+                "reviewed_by": admin["id"],
+                "rejection_reason": data.rejection_reason
+            }})
+            for doc in kyc_docs
+        ], ordered=False, session=session)
+        if users:
+            await db.users.bulk_write([
+                UpdateOne({"id": user["id"]}, {"$set": {"kyc_status": new_status}})
+                for user in users
+            ], ordered=False, session=session)
+            await record_kyc_status_changes(
+                [(user, user.get("kyc_status"), new_status) for user in users], session
+            )
+        return kyc_docs, {user["id"]: user for user in users}
     
-    for wallet in wallets:
-        wallet.pop("_id", None)
-        user = user_map.get(wallet.get("user_id"))
-        if user:
-            wallet["user_email"] = user["email"]
-            wallet["user_mobile"] = user["mobile"]
+    kyc_docs, user_map = await run_in_transaction(apply)
+    
+    found = {doc["id"]: doc for doc in kyc_docs}
+    results, messages = [], []
+    for kyc_id in kyc_ids:
+        doc = found.get(kyc_id)
+        if not doc:
+            results.append({"kyc_id": kyc_id, "success": False, "error": "KYC not found"})
+            continue
+        result = {"kyc_id": kyc_id, "user_id": doc["user_id"], "success": True, "status": new_status.value, "notified": False}
+        results.append(result)
+        user = user_map.get(doc["user_id"])
+        if user and user.get("push_token"):
+            if data.action == "approve":
+                content = kyc_approved_content(user.get("email", "User"))
+            else:
+                content = kyc_rejected_content(data.rejection_reason or "")
+            messages.append((result, push_message(user["push_token"], **content)))
     
-    return wallets
+    await _send_bulk_push(results, messages)
+    
+    updated = sum(1 for result in results if result["success"])
+    logger.info(f"Admin {admin['id']} bulk {data.action}d {updated} KYC documents")
+    return {"success": True, "updated": updated, "results": results}
+
+async def _wallet_query(
+    status: Optional[str],
+    asset: Optional[str],
+    network: Optional[str],
+    user: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> dict:
+    query = _date_range({}, start, end)
+    if status:
+        query["verification_status"] = status
+    if asset:
+        query["asset"] = asset
+    if network:
+        query["network"] = network
+    if user:
+        query["user_id"] = await _resolve_user_id(user)
+    return query
+
+@router.get("/wallets/pending")
+async def admin_get_pending_wallets(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    asset: Optional[str] = Query(None),
+    network: Optional[str] = Query(None),
+    user: Optional[str] = Query(None, description="User id, email or client ID"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    sort: str = Query("created_at", pattern=_sort_param(WALLET_SORT_FIELDS)),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    admin: dict = Depends(get_admin_user)
+):
+    query = await _wallet_query("pending", asset, network, user, start, end)
+    return await _page(db.saved_wallets, query, response, sort, order, limit, cursor)
 
 @router.get("/wallets/all")
-async def admin_get_all_wallets(admin: dict = Depends(get_admin_user)):
-    wallets = await db.saved_wallets.find().sort("created_at", -1).to_list(100)
+async def admin_get_all_wallets(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    status: Optional[WalletVerificationStatus] = Query(None),
+    asset: Optional[str] = Query(None),
+    network: Optional[str] = Query(None),
+    user: Optional[str] = Query(None, description="User id, email or client ID"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    sort: str = Query("created_at", pattern=_sort_param(WALLET_SORT_FIELDS)),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    admin: dict = Depends(get_admin_user)
+):
+    query = await _wallet_query(status.value if status else None, asset, network, user, start, end)
+    return await _page(db.saved_wallets, query, response, sort, order, limit, cursor)
+
+@router.get("/wallets/by-address")
+async def admin_get_wallets_by_address(
+    address: str = Query(..., min_length=1),
+    network: Optional[str] = Query(None),
+    admin: dict = Depends(get_admin_user)
+):
+    """Every client who has saved a given address (served by the normalized address index)"""
+    if network:
+        query = {"normalized_address": normalize_address(network, address), "network_key": network_key(network)}
+    else:
+        query = {"normalized_address": {"$in": address_lookup_candidates(address)}}
+    
+    wallets = await db.saved_wallets.find(query, {"_id": 0, "proof_image": 0}).to_list(1000)
     
     user_ids = list(set(w["user_id"] for w in wallets if w.get("user_id")))
-    users = await db.users.find({"id": {"$in": user_ids}}).to_list(len(user_ids))
+    users = await db.users.find({"id": {"$in": user_ids}}, {"id": 1, "email": 1, "mobile": 1, "client_uid": 1, "full_name": 1}).to_list(len(user_ids))
     user_map = {u["id"]: u for u in users}
     
     for wallet in wallets:
-        wallet.pop("_id", None)
         user = user_map.get(wallet.get("user_id"))
         if user:
-            wallet["user_email"] = user["email"]
-            wallet["user_mobile"] = user["mobile"]
+            wallet["user_email"] = user.get("email")
+            wallet["user_mobile"] = user.get("mobile")
+            wallet["client_uid"] = user.get("client_uid")
+            wallet["full_name"] = user.get("full_name")
     
-    return wallets
+    return {"address": address, "user_count": len(user_ids), "wallets": wallets}
+
+@router.post("/wallets/validate")
+async def admin_validate_addresses(data: AdminValidateAddressesRequest, admin: dict = Depends(get_admin_user)):
+    """Validate a batch of addresses locally (checksums and formats, no network calls)"""
+    items = [item.dict() for item in data.addresses]
+    results = await asyncio.to_thread(validate_addresses, items)
+    invalid = sum(1 for r in results if not r["valid"])
+    unchecked = sum(1 for r in results if not r["checked"])
+    
+    return {
+        "total": len(results),
+        "valid": len(results) - invalid,
+        "invalid": invalid,
+        "unchecked": unchecked,
+        "results": results
+    }
 
 @router.get("/wallets/{wallet_id}")
 async def admin_get_wallet_detail(wallet_id: str, admin: dict = Depends(get_admin_user)):
@@ -137,6 +506,17 @@ async def admin_get_wallet_detail(wallet_id: str, admin: dict = Depends(get_admi
     
     return wallet
 
+@router.get("/wallets/{wallet_id}/proof")
+async def admin_get_wallet_proof(wallet_id: str, admin: dict = Depends(get_admin_user)):
+    """Stream an uploaded wallet ownership proof"""
+    wallet = await db.saved_wallets.find_one({"id": wallet_id}, {"_id": 0, "proof_document": 1})
+    if not wallet:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    if not wallet.get("proof_document"):
+        raise HTTPException(status_code=404, detail="Proof not uploaded")
+    
+    return await blob_response(wallet["proof_document"])
+
 @router.post("/wallets/action")
 async def admin_wallet_action(data: AdminWalletActionRequest, admin: dict = Depends(get_admin_user)):
     wallet = await db.saved_wallets.find_one({"id": data.wallet_id})
@@ -157,29 +537,106 @@ async def admin_wallet_action(data: AdminWalletActionRequest, admin: dict = Depe
     
     return {"success": True, "message": f"Wallet {data.action}d successfully"}
 
-@router.get("/orders")
-async def admin_get_orders(admin: dict = Depends(get_admin_user)):
-    orders = await db.orders.find().sort("created_at", -1).to_list(100)
+@router.post("/wallets/bulk-action")
+async def admin_bulk_wallet_action(data: AdminBulkWalletActionRequest, admin: dict = Depends(get_admin_user)):
+    """Verify or reject many saved wallets with one bulk write and one batched push send"""
+    _check_bulk_action(data.action)
+    new_status = "verified" if data.action == "approve" else "rejected"
+    wallet_ids = list(dict.fromkeys(data.wallet_ids))
     
-    user_ids = list(set(o["user_id"] for o in orders if o.get("user_id")))
-    users = await db.users.find({"id": {"$in": user_ids}}).to_list(len(user_ids))
-    user_map = {u["id"]: u for u in users}
+    wallets = await db.saved_wallets.aggregate([
+        {"$match": {"id": {"$in": wallet_ids}}},
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "id",
+            "pipeline": [{"$project": {"_id": 0, "push_token": 1}}],
+            "as": "_user"
+        }},
+        {"$project": {"_id": 0, "id": 1, "user_id": 1, "label": 1, "push_token": {"$first": "$_user.push_token"}}}
+    ]).to_list(len(wallet_ids))
     
-    for order in orders:
-        order.pop("_id", None)
-        user = user_map.get(order.get("user_id"))
-        if user:
-            order["user_email"] = user["email"]
-            order["user_mobile"] = user["mobile"]
+    if wallets:
+        verified_at = datetime.utcnow()
+        await db.saved_wallets.bulk_write([
+            UpdateOne({"id": wallet["id"]}, {"$set": {
+                "verification_status": new_status,
+                "admin_notes": data.notes,
+                "verified_by": admin["id"],
+                "verified_at": verified_at
+            }})
+            for wallet in wallets
+        ], ordered=False)
+    
+    found = {wallet["id"]: wallet for wallet in wallets}
+    results, messages = [], []
+    for wallet_id in wallet_ids:
+        wallet = found.get(wallet_id)
+        if not wallet:
+            results.append({"wallet_id": wallet_id, "success": False, "error": "Wallet not found"})
+            continue
+        result = {"wallet_id": wallet_id, "user_id": wallet["user_id"], "success": True, "status": new_status, "notified": False}
+        results.append(result)
+        if wallet.get("push_token"):
+            content = wallet_decision_content(wallet.get("label", ""), data.action == "approve", data.notes)
+            messages.append((result, push_message(wallet["push_token"], **content)))
+    
+    await _send_bulk_push(results, messages)
     
-    return orders
+    updated = sum(1 for result in results if result["success"])
+    logger.info(f"Admin {admin['id']} bulk {data.action}d {updated} wallets")
+    return {"success": True, "updated": updated, "results": results}
 
-@router.put("/orders/update")
-async def admin_update_order(data: AdminOrderUpdateRequest, admin: dict = Depends(get_admin_user)):
-    order = await db.orders.find_one({"id": data.order_id})
+async def _order_query(
+    status: Optional[OrderStatus],
+    asset: Optional[str],
+    order_type: Optional[OrderType],
+    user: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> dict:
+    query = _date_range({}, start, end)
+    if status:
+        query["status"] = status.value
+    if asset:
+        query["asset"] = asset
+    if order_type:
+        query["order_type"] = order_type.value
+    if user:
+        query["user_id"] = await _resolve_user_id(user)
+    return query
+
+@router.get("/orders")
+async def admin_get_orders(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    status: Optional[OrderStatus] = Query(None),
+    asset: Optional[str] = Query(None),
+    order_type: Optional[OrderType] = Query(None),
+    user: Optional[str] = Query(None, description="User id, email or client ID"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    sort: str = Query("created_at", pattern=_sort_param(ORDER_SORT_FIELDS)),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    admin: dict = Depends(get_admin_user)
+):
+    query = await _order_query(status, asset, order_type, user, start, end)
+    return await _page(db.orders, query, response, sort, order, limit, cursor)
+
+@router.get("/orders/{order_id}/payment-proof")
+async def admin_get_payment_proof(order_id: str, admin: dict = Depends(get_admin_user)):
+    """Stream an uploaded payment proof"""
+    order = await db.orders.find_one({"id": order_id}, {"_id": 0, "payment_proof_document": 1})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    if not order.get("payment_proof_document"):
+        raise HTTPException(status_code=404, detail="Proof not uploaded")
     
+    return await blob_response(order["payment_proof_document"])
+
+@router.put("/orders/update")
+async def admin_update_order(data: AdminOrderUpdateRequest, admin: dict = Depends(get_admin_user)):
     update_data = {
         "status": data.status,
         "updated_at": datetime.utcnow()
@@ -187,10 +644,45 @@ async def admin_update_order(data: AdminOrderUpdateRequest, admin: dict = Depend
     if data.notes:
         update_data["notes"] = data.notes
     
-    await db.orders.update_one({"id": data.order_id}, {"$set": update_data})
+    async def apply(session):
+        # Writing the order first means concurrent updates of the same order
+        # write-conflict; the loser is retried and then sees the ledger entry
+        # the winner committed, so an order is never credited twice.
+        order = await db.orders.find_one_and_update(
+            {"id": data.order_id}, {"$set": update_data}, session=session
+        )
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        await record_order_status_change(order, order.get("status"), data.status, session)
+        
+        # Handle ledger entries for completed orders. The unique order_id
+        # index is the guard on standalone servers, where there is no
+        # transaction and two updates can both pass the find_one.
+        if data.status == OrderStatus.COMPLETED:
+            existing_ledger = await db.wallet_ledger.find_one({"order_id": data.order_id}, {"_id": 1}, session=session)
+            if not existing_ledger:
+                ledger = WalletLedger(
+                    user_id=order["user_id"],
+                    asset=order["asset"],
+                    transaction_type=TransactionType.CREDIT if order["order_type"] == "buy" else TransactionType.DEBIT,
+                    amount=order["quantity"],
+                    description=f"Order {data.order_id[:8]} completed",
+                    order_id=data.order_id
+                )
+                try:
+                    await db.wallet_ledger.insert_one(ledger.dict(), session=session)
+                except DuplicateKeyError:
+                    # A write error aborts a transaction, so only absorb it without one
+                    if session is not None:
+                        raise
+                    logger.info(f"Order {data.order_id} was already credited by a concurrent update")
+        
+        return order
+    
+    order = await run_in_transaction(apply)
     
     # Send push notification for order update
-    user = await db.users.find_one({"id": order["user_id"]})
+    user = await db.users.find_one({"id": order["user_id"]}, {"push_token": 1})
     if user and user.get("push_token"):
         await notify_order_status_update(
             [user["push_token"]],
@@ -200,20 +692,6 @@ async def admin_update_order(data: AdminOrderUpdateRequest, admin: dict = Depend
             order.get("quantity", 0)
         )
     
-    # Handle ledger entries for completed orders
-    if data.status == OrderStatus.COMPLETED:
-        existing_ledger = await db.wallet_ledger.find_one({"order_id": data.order_id})
-        if not existing_ledger:
-            ledger = WalletLedger(
-                user_id=order["user_id"],
-                asset=order["asset"],
-                transaction_type=TransactionType.CREDIT if order["order_type"] == "buy" else TransactionType.DEBIT,
-                amount=order["quantity"],
-                description=f"Order {data.order_id[:8]} completed",
-                order_id=data.order_id
-            )
-            await db.wallet_ledger.insert_one(ledger.dict())
-    
     return {"success": True, "message": "Order updated successfully"}
 
 @router.post("/rates/update")
@@ -234,7 +712,21 @@ async def admin_update_rate(data: AdminRateUpdateRequest, admin: dict = Depends(
     
     await db.asset_rates.update_one(filter_query, {"$set": rate.dict()}, upsert=True)
     
-    return {"success": True, "message": "Rate updated successfully"}
+    response = {"success": True, "message": "Rate updated successfully"}
+    if data.notify:
+        # Clients see the buy rate; a user-specific rate only notifies that client
+        response["notification_id"] = await enqueue_rate_notification(
+            data.asset, data.buy_rate, data.notify, user_id=data.user_specific
+        )
+    return response
+
+@router.get("/rates/notifications/{notification_id}")
+async def admin_get_rate_notification(notification_id: str, admin: dict = Depends(get_admin_user)):
+    """Progress of a rate-change push fan-out: status plus delivered/failed counts once finished"""
+    fanout = await db.push_fanouts.find_one({"id": notification_id}, {"_id": 0})
+    if not fanout:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return fanout
 
 @router.get("/rates")
 async def admin_get_rates(admin: dict = Depends(get_admin_user)):
@@ -267,112 +759,343 @@ async def admin_freeze_user(user_id: str, admin: dict = Depends(get_admin_user))
 
 @router.put("/users/{user_id}/assign-rm")
 async def admin_assign_rm(user_id: str, data: AssignRMRequest, admin: dict = Depends(get_admin_user)):
-    await db.users.update_one(
-        {"id": user_id},
-        {"$set": {
-            "relationship_manager": data.rm_name,
-            "rm_phone": data.rm_phone,
-            "rm_whatsapp": data.rm_whatsapp
-        }}
-    )
+    # rm_id is only changed when the request sends it, so editing an RM's
+    # contact details leaves the client's book (and its orders) where they are
+    move_book = "rm_id" in data.model_fields_set
+    if move_book and data.rm_id and not await db.users.find_one({"id": data.rm_id, "role": "admin"}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail="rm_id must be an admin account")
+    
+    fields = {
+        "relationship_manager": data.rm_name,
+        "rm_phone": data.rm_phone,
+        "rm_whatsapp": data.rm_whatsapp
+    }
+    if move_book:
+        fields["rm_id"] = data.rm_id
+    
+    async def apply(session):
+        user = await db.users.find_one_and_update(
+            {"id": user_id},
+            {"$set": fields},
+            projection={"_id": 0, "rm_id": 1},
+            session=session
+        )
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        # The client's orders move to the new RM's book
+        if move_book and user.get("rm_id") != data.rm_id:
+            await db.orders.update_many({"user_id": user_id}, {"$set": {"rm_id": data.rm_id}}, session=session)
+            await move_rm_orders(user_id, user.get("rm_id"), data.rm_id, session)
+    
+    await run_in_transaction(apply)
     return {"success": True, "message": "RM assigned successfully"}
 
+# ==================== RM BOOKS ====================
+# Each relationship manager's clients, their orders and KYC queue, and
+# volume, scoped by the rm_id stamped on users and orders. Pass "me" as the
+# RM to get the calling admin's own book.
+
+def _rm_scope(rm_id: str, admin: dict) -> str:
+    return admin["id"] if rm_id == "me" else rm_id
+
+@router.get("/rm")
+async def admin_list_rms(admin: dict = Depends(get_admin_user)):
+    """Relationship managers with at least one client, with client counts"""
+    rows = await db.users.aggregate([
+        {"$match": {"role": "user", "rm_id": {"$type": "string"}}},
+        {"$group": {"_id": "$rm_id", "clients": {"$sum": 1}, "rm_name": {"$last": "$relationship_manager"}}},
+        {"$sort": {"clients": -1}}
+    ]).to_list(None)
+    return [{"rm_id": row["_id"], "rm_name": row["rm_name"], "clients": row["clients"]} for row in rows]
+
+@router.get("/rm/{rm_id}/clients")
+async def admin_rm_clients(
+    rm_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    kyc_status: Optional[KYCStatus] = Query(None),
+    admin: dict = Depends(get_admin_user)
+):
+    query = {"rm_id": _rm_scope(rm_id, admin), "role": "user"}
+    if kyc_status:
+        query["kyc_status"] = kyc_status.value
+    return await _page(db.users, query, response, "created_at", "desc", limit, cursor, join_user=False, exclude=("password_hash",))
+
+@router.get("/rm/{rm_id}/orders")
+async def admin_rm_orders(
+    rm_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    status: Optional[OrderStatus] = Query(None),
+    admin: dict = Depends(get_admin_user)
+):
+    query = {"rm_id": _rm_scope(rm_id, admin)}
+    if status:
+        query["status"] = status.value
+    return await _page(db.orders, query, response, "created_at", "desc", limit, cursor)
+
+@router.get("/rm/{rm_id}/kyc-pending")
+async def admin_rm_pending_kyc(
+    rm_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    admin: dict = Depends(get_admin_user)
+):
+    """KYC submissions awaiting review from the RM's clients, newest first"""
+    # Every client of the RM who may have a submission in review; clients who
+    # never submitted have no KYC document and so drop out of the page query
+    user_ids = await db.users.distinct(
+        "id", {"rm_id": _rm_scope(rm_id, admin), "kyc_status": {"$in": ["pending", "under_review"]}}
+    )
+    query = {"user_id": {"$in": user_ids}, "status": {"$in": ["pending", "under_review"]}}
+    kyc_docs = await _page(
+        db.kyc_documents, query, response, "submitted_at", "desc", limit, cursor, projection=KYC_QUEUE_PROJECTION
+    )
+    for doc in kyc_docs:
+        doc["documents"] = document_links(doc["id"], doc.get("documents") or {})
+    return kyc_docs
+
+@router.get("/rm/{rm_id}/volume")
+async def admin_rm_volume(
+    rm_id: str,
+    days: int = Query(30, ge=1, le=366),
+    admin: dict = Depends(get_admin_user)
+):
+    """Order counts and volumes across the RM's clients, with a daily series"""
+    return await get_rm_book_stats(_rm_scope(rm_id, admin), days)
+
+@router.get("/search")
+async def admin_search(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, description="Email, mobile, client ID, name, tx hash or wallet address"),
+    limit: int = Query(20, ge=1, le=100),
+    admin: dict = Depends(get_admin_user)
+):
+    """Users, orders and wallets matching q, ranked best first"""
+    return await search_all(q, limit)
+
+@router.get("/events")
+async def admin_events_stream(request: Request, admin: dict = Depends(get_admin_user)):
+    """
+    Server-sent events for the admin dashboard: kyc.submitted, kyc.status,
+    kyc.auto_verification, wallet.saved, wallet.status, order.created and
+    order.status, each carrying a summary of the record. Without change
+    streams, order edits that may not have changed the status arrive as
+    order.updated. A resync event means the client fell behind and should
+    reload its lists.
+    """
+    return StreamingResponse(
+        event_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/analytics")
 async def admin_get_analytics(admin: dict = Depends(get_admin_user)):
     """Enhanced analytics with charts data"""
-    
-    # Basic counts
-    total_users = await db.users.count_documents({"role": "user"})
-    verified_users = await db.users.count_documents({"role": "user", "kyc_status": "approved"})
-    pending_kyc = await db.kyc_documents.count_documents({"status": {"$in": ["pending", "under_review"]}})
-    total_orders = await db.orders.count_documents({})
-    completed_orders = await db.orders.count_documents({"status": "completed"})
-    pending_orders = await db.orders.count_documents({"status": {"$in": ["awaiting_payment", "processing"]}})
-    pending_wallets = await db.saved_wallets.count_documents({"verification_status": "pending"})
-    
-    # Volume calculations
-    orders = await db.orders.find({"status": "completed"}).to_list(1000)
-    total_buy_volume = sum(o.get("total_inr", 0) for o in orders if o.get("order_type") == "buy")
-    total_sell_volume = sum(o.get("total_inr", 0) for o in orders if o.get("order_type") == "sell")
-    
-    # Orders by asset
-    asset_breakdown = {}
-    for order in orders:
-        asset = order.get("asset", "Unknown")
-        if asset not in asset_breakdown:
-            asset_breakdown[asset] = {"count": 0, "volume": 0}
-        asset_breakdown[asset]["count"] += 1
-        asset_breakdown[asset]["volume"] += order.get("total_inr", 0)
-    
-    # Daily orders (last 7 days)
-    daily_orders = []
-    for i in range(7):
-        date = datetime.utcnow() - timedelta(days=i)
-        start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = start + timedelta(days=1)
-        
-        count = await db.orders.count_documents({
-            "created_at": {"$gte": start, "$lt": end}
-        })
-        volume = 0
-        day_orders = await db.orders.find({
-            "created_at": {"$gte": start, "$lt": end},
-            "status": "completed"
-        }).to_list(1000)
-        volume = sum(o.get("total_inr", 0) for o in day_orders)
-        
-        daily_orders.append({
-            "date": start.strftime("%Y-%m-%d"),
-            "day": start.strftime("%a"),
-            "count": count,
-            "volume": volume
-        })
-    
-    daily_orders.reverse()
-    
-    # KYC status breakdown
-    kyc_approved = await db.users.count_documents({"kyc_status": "approved"})
-    kyc_pending = await db.users.count_documents({"kyc_status": "pending"})
-    kyc_rejected = await db.users.count_documents({"kyc_status": "rejected"})
-    kyc_under_review = await db.users.count_documents({"kyc_status": "under_review"})
-    
-    # Recent registrations (last 7 days)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    new_users_this_week = await db.users.count_documents({
-        "role": "user",
-        "created_at": {"$gte": week_ago}
-    })
-    
-    return {
-        "overview": {
-            "total_users": total_users,
-            "verified_users": verified_users,
-            "pending_kyc": pending_kyc,
-            "total_orders": total_orders,
-            "completed_orders": completed_orders,
-            "pending_orders": pending_orders,
-            "pending_wallets": pending_wallets,
-            "new_users_this_week": new_users_this_week
-        },
-        "volume": {
-            "total_buy_volume": total_buy_volume,
-            "total_sell_volume": total_sell_volume,
-            "total_volume": total_buy_volume + total_sell_volume
-        },
-        "charts": {
-            "asset_breakdown": [
-                {"asset": k, "count": v["count"], "volume": v["volume"]} 
-                for k, v in asset_breakdown.items()
-            ],
-            "daily_orders": daily_orders,
-            "kyc_status": {
-                "approved": kyc_approved,
-                "pending": kyc_pending,
-                "rejected": kyc_rejected,
-                "under_review": kyc_under_review
+    return await get_dashboard_analytics()
+
+@router.get("/analytics/timeseries")
+async def admin_analytics_timeseries(
+    start: Optional[datetime] = Query(None, alias="from", description="Range start; naive times are read in tz"),
+    end: Optional[datetime] = Query(None, alias="to", description="Range end (exclusive); defaults to now"),
+    granularity: str = Query("day", pattern=f"^({'|'.join(TIMESERIES_GRANULARITIES)})$"),
+    tz: str = Query(ANALYTICS_TIMEZONE, description="IANA timezone for bucket boundaries"),
+    group_by: Optional[str] = Query(None, pattern=f"^({'|'.join(TIMESERIES_GROUPS)})$"),
+    admin: dict = Depends(get_admin_user)
+):
+    """Order count and volume per hour/day/week/month in tz, zero-filled per series for charting"""
+    try:
+        return await get_order_timeseries(start, end, granularity, tz, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _csv_param(value: Optional[str], allowed=None, name: str = "") -> list:
+    values = [v.strip() for v in (value or "").split(",") if v.strip()]
+    if allowed is not None:
+        unknown = [v for v in values if v not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown {name}: {', '.join(unknown)} (expected {', '.join(allowed)})")
+    return values
+
+@router.get("/analytics/query")
+async def admin_analytics_query(
+    group_by: Optional[str] = Query(None, description="Comma-separated: asset, order_type, status"),
+    bucket: Optional[str] = Query(None, pattern=f"^({'|'.join(ORDER_CACHE_BUCKETS)})$"),
+    metrics: str = Query("count,volume", description=f"Comma-separated: {', '.join(ORDER_CACHE_METRICS)}"),
+    start: Optional[datetime] = Query(None, description="Orders created at or after (UTC)"),
+    end: Optional[datetime] = Query(None, description="Orders created before (UTC)"),
+    asset: Optional[str] = Query(None),
+    order_type: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    admin: dict = Depends(get_admin_user)
+):
+    """Ad-hoc order aggregates (e.g. volume by asset by hour) from the in-memory order columns"""
+    try:
+        return await order_columns.query(
+            group_by=_csv_param(group_by, ORDER_CACHE_DIMENSIONS, "group_by"),
+            bucket=bucket,
+            metrics=_csv_param(metrics, ORDER_CACHE_METRICS, "metrics") or ["count"],
+            start=to_utc_naive(start) if start else None,
+            end=to_utc_naive(end) if end else None,
+            filters={
+                "asset": _csv_param(asset),
+                "order_type": _csv_param(order_type),
+                "status": _csv_param(status)
             }
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ==================== EXPORTS ====================
+# Full registers for compliance, streamed oldest first from an aggregation
+# cursor in EXPORT_BATCH_SIZE batches, so memory stays flat however many rows
+# match. Filters mirror the list endpoints.
+
+EXPORT_FORMAT_PATTERN = f"^({'|'.join(EXPORT_FORMATS)})$"
+
+ORDER_EXPORT_COLUMNS = [
+    "id", "created_at", "client_uid", "user_email", "user_name", "asset", "order_type", "quantity",
+    "rate", "total_inr", "status", "tx_hash", "wallet_address", "notes", "updated_at"
+]
+USER_EXPORT_COLUMNS = [
+    "id", "client_uid", "created_at", "full_name", "email", "mobile", "account_type", "company_name",
+    "kyc_status", "is_frozen", "is_mobile_verified", "is_email_verified", "relationship_manager", "last_login"
+]
+LEDGER_EXPORT_COLUMNS = [
+    "id", "created_at", "client_uid", "user_email", "asset", "transaction_type", "amount", "description", "order_id"
+]
+KYC_EXPORT_COLUMNS = [
+    "id", "submitted_at", "client_uid", "user_email", "status", "account_holder_name",
+    "authorized_signatory_name", "pan_masked", "aadhaar_masked", "bank_name", "bank_ifsc",
+    "bank_account_masked", "auto_verification_status", "reviewed_at", "reviewed_by", "rejection_reason"
+]
+
+def _masked(field: str) -> dict:
+    """All but the last four characters of a field replaced with X"""
+    value = {"$ifNull": [f"${field}", ""]}
+    length = {"$strLenCP": value}
+    return {"$cond": [
+        {"$gt": [length, 4]},
+        {"$concat": ["XXXXXXXX", {"$substrCP": [value, {"$subtract": [length, 4]}, 4]}]},
+        None
+    ]}
+
+def _export_response(
+    collection,
+    query: dict,
+    columns: list,
+    format: str,
+    name: str,
+    sort: str = "created_at",
+    join_user: bool = True,
+    computed: Optional[dict] = None
+) -> StreamingResponse:
+    pipeline = [{"$match": query}, {"$sort": dict(sort_spec(sort, 1))}]
+    if join_user:
+        pipeline += USER_JOIN
+    if computed:
+        pipeline.append({"$set": computed})
+    pipeline.append({"$project": {"_id": 0, **{column: 1 for column in columns}}})
+    
+    cursor = collection.aggregate(pipeline, batchSize=EXPORT_BATCH_SIZE, allowDiskUse=True)
+    stream, media_type = EXPORT_FORMATS[format]
+    filename = f"{name}_{datetime.utcnow():%Y%m%d_%H%M%S}.{format}"
+    return StreamingResponse(
+        stream(cursor, columns),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/export/orders")
+async def admin_export_orders(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    status: Optional[OrderStatus] = Query(None),
+    asset: Optional[str] = Query(None),
+    order_type: Optional[OrderType] = Query(None),
+    user: Optional[str] = Query(None, description="User id, email or client ID"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    admin: dict = Depends(get_admin_user)
+):
+    query = await _order_query(status, asset, order_type, user, start, end)
+    return _export_response(db.orders, query, ORDER_EXPORT_COLUMNS, format, "orders")
+
+@router.get("/export/users")
+async def admin_export_users(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    kyc_status: Optional[KYCStatus] = Query(None),
+    account_type: Optional[AccountType] = Query(None),
+    frozen: Optional[bool] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    admin: dict = Depends(get_admin_user)
+):
+    query = _user_query(kyc_status, account_type, frozen, start, end)
+    return _export_response(db.users, query, USER_EXPORT_COLUMNS, format, "users", join_user=False)
+
+@router.get("/export/ledger")
+async def admin_export_ledger(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    asset: Optional[str] = Query(None),
+    transaction_type: Optional[TransactionType] = Query(None),
+    user: Optional[str] = Query(None, description="User id, email or client ID"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    admin: dict = Depends(get_admin_user)
+):
+    query = _date_range({}, start, end)
+    if asset:
+        query["asset"] = asset
+    if transaction_type:
+        query["transaction_type"] = transaction_type.value
+    if user:
+        query["user_id"] = await _resolve_user_id(user)
+    return _export_response(db.wallet_ledger, query, LEDGER_EXPORT_COLUMNS, format, "ledger")
+
+@router.get("/export/kyc")
+async def admin_export_kyc(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    status: Optional[KYCStatus] = Query(None),
+    auto_status: Optional[str] = Query(None, pattern=f"^({'|'.join(AUTO_VERIFICATION_STATUSES)})$"),
+    start: Optional[datetime] = Query(None, description="Submitted at or after"),
+    end: Optional[datetime] = Query(None, description="Submitted before"),
+    admin: dict = Depends(get_admin_user)
+):
+    """KYC register; Aadhaar and bank account numbers are masked to their last four digits"""
+    query = _date_range({}, start, end, "submitted_at")
+    if status:
+        query["status"] = status.value
+    if auto_status:
+        query["auto_verification.status"] = auto_status
+    return _export_response(
+        db.kyc_documents, query, KYC_EXPORT_COLUMNS, format, "kyc", sort="submitted_at",
+        computed={
+            "pan_masked": _masked("pan_number"),
+            "aadhaar_masked": _masked("aadhaar_number"),
+            "bank_account_masked": _masked("bank_account_number"),
+            "auto_verification_status": "$auto_verification.status"
         }
-    }
+    )
+
+@router.post("/reconciliation/run", status_code=202)
+async def admin_run_reconciliation(admin: dict = Depends(get_admin_user)):
+    """
+    Start checking every completed order against its ledger entry. The run
+    happens in the background; its report appears at /reconciliation/latest.
+    """
+    if not start_reconciliation():
+        raise HTTPException(status_code=409, detail="A reconciliation is already running")
+    return {"success": True, "message": "Reconciliation started"}
+
+@router.get("/reconciliation/latest")
+async def admin_get_latest_reconciliation(admin: dict = Depends(get_admin_user)):
+    report = await db.reconciliation_reports.find_one({}, {"_id": 0}, sort=[("started_at", -1)])
+    if not report:
+        raise HTTPException(status_code=404, detail="No reconciliation has been run yet")
+    return report
 
 @router.post("/init-default-data")
 async def init_default_data(admin: dict = Depends(get_admin_user)):
@@ -390,7 +1113,9 @@ async def init_default_data(admin: dict = Depends(get_admin_user)):
             is_email_verified=True,
             kyc_status=KYCStatus.APPROVED
         )
-        await db.users.insert_one(admin_user.dict())
+        admin_doc = admin_user.dict()
+        await db.users.insert_one(admin_doc)
+        await record_user_registered(admin_doc)
     
     default_rates = [
         {"asset": "USDT", "buy_rate": 84.50, "sell_rate": 83.50},
@@ -14,6 +14,7 @@ from models import (
     ForgotPasswordRequest, ResetPasswordRequest, KYCStatus, UserRole,
     RegisterPushTokenRequest, AccountType
 )
+from services.daily_stats import record_user_registered
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 logger = logging.getLogger(__name__)
@@ -53,7 +54,9 @@ async def register(data: RegisterRequest):
         referral_code=data.referral_code,
         invite_code=data.invite_code
     )
-    await db.users.insert_one(user.dict())
+    user_doc = user.dict()
+    await db.users.insert_one(user_doc)
+    await record_user_registered(user_doc)
     
     # Send email OTP
     from services.email_service import send_otp_email, notify_admin_new_registration
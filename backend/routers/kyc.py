@@ -1,37 +1,108 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from datetime import datetime
 import logging
+from pymongo.errors import DuplicateKeyError
 
-from core.database import db
+from core.database import db, run_in_transaction
 from core.dependencies import get_current_user
 from models import KYCDocument, KYCSubmitRequest, KYCStatus
+from services.blob_store import BLOB_REFERENCE_PREFIX
+from services.kyc_storage import (
+    store_kyc_images, release_originals, release_kyc_images, drop_inline_images, KYC_IMAGE_FIELDS, KYC_WITHOUT_IMAGES
+)
+from services.uploads import receive_upload
+from services.kyc_verification import enqueue_kyc_verification
+from services.image_similarity import record_kyc_image_hashes
+from services.identity_fingerprints import (
+    FINGERPRINT_LABELS, UNIQUE_FINGERPRINTS, find_collisions, kyc_fingerprints
+)
+from services.daily_stats import record_kyc_status_change
 
 router = APIRouter(prefix="/kyc", tags=["KYC"])
 logger = logging.getLogger(__name__)
 
 @router.post("/submit")
 async def submit_kyc(data: KYCSubmitRequest, current_user: dict = Depends(get_current_user)):
-    existing = await db.kyc_documents.find_one({"user_id": current_user["id"]})
+    # PAN and Aadhaar may belong to one account only; checked by fingerprint
+    fingerprints = kyc_fingerprints(data.dict())
+    collisions = await find_collisions(
+        {kind: fingerprints[kind] for kind in UNIQUE_FINGERPRINTS if kind in fingerprints},
+        current_user["id"]
+    )
+    if collisions:
+        kind = next(iter(collisions))
+        raise HTTPException(status_code=400, detail=f"This {FINGERPRINT_LABELS[kind]} is already registered to another account")
+    
+    # Checked before any image is stored; apply() checks again in the transaction
+    existing = await db.kyc_documents.find_one({"user_id": current_user["id"]}, {"_id": 0, "status": 1, "documents": 1})
     if existing and existing.get("status") == "approved":
         raise HTTPException(status_code=400, detail="KYC already approved")
     
+    # Images go to the blob store; the KYC document keeps only their references
+    fields, documents, originals = await store_kyc_images(data.dict(), current_user["id"])
     kyc_doc = KYCDocument(
         user_id=current_user["id"],
-        **data.dict()
+        documents=documents,
+        **fields
     )
     
-    if existing:
+    async def apply(session):
+        existing = await db.kyc_documents.find_one({"user_id": current_user["id"]}, {"status": 1}, session=session)
+        if existing and existing.get("status") == "approved":
+            raise HTTPException(status_code=400, detail="KYC already approved")
+        
         await db.kyc_documents.update_one(
             {"user_id": current_user["id"]},
-            {"$set": {**kyc_doc.dict(), "submitted_at": datetime.utcnow()}}
+            {"$set": {
+                **kyc_doc.dict(),
+                "fingerprints": fingerprints,
+                "collision_fingerprints": fingerprints,
+                "submitted_at": datetime.utcnow(),
+                "auto_verification": {"status": "queued", "queued_at": datetime.utcnow()}
+            }},
+            upsert=True,
+            session=session
+        )
+        user = await db.users.find_one_and_update(
+            {"id": current_user["id"]},
+            {"$set": {"kyc_status": KYCStatus.UNDER_REVIEW}},
+            projection={"role": 1, "kyc_status": 1, "created_at": 1},
+            session=session
         )
-    else:
-        await db.kyc_documents.insert_one(kyc_doc.dict())
+        if user:
+            await record_kyc_status_change(user, user.get("kyc_status"), KYCStatus.UNDER_REVIEW, session)
     
-    await db.users.update_one(
-        {"id": current_user["id"]},
-        {"$set": {"kyc_status": KYCStatus.UNDER_REVIEW}}
-    )
+    # The unique fingerprint indexes catch a concurrent submission of the same
+    # number; the user_id index a concurrent submission from this account
+    try:
+        await run_in_transaction(apply)
+    except Exception as e:
+        # Nothing references the images just stored; the raw uploads are kept for a retry
+        try:
+            await release_kyc_images(documents)
+        except Exception as release_error:
+            logger.error(f"Failed to release images of a failed KYC submission: {release_error}")
+        if not isinstance(e, DuplicateKeyError):
+            raise
+        field = next(iter((e.details or {}).get("keyPattern") or {}), "")
+        kind = field[len("fingerprints."):] if field.startswith("fingerprints.") else None
+        if kind in UNIQUE_FINGERPRINTS:
+            raise HTTPException(status_code=400, detail=f"This {FINGERPRINT_LABELS[kind]} is already registered to another account")
+        raise HTTPException(status_code=409, detail="A KYC submission for this account is already in progress, please retry")
+    enqueue_kyc_verification(kyc_doc.id)
+    
+    # The raw uploads (with their EXIF/GPS metadata) and the images of the
+    # submission this one replaces are no longer needed
+    try:
+        await release_originals(documents, originals, current_user["id"])
+        await release_kyc_images((existing or {}).get("documents") or {}, current_user["id"])
+    except Exception as e:
+        logger.error(f"Failed to release superseded KYC images: {e}")
+    
+    try:
+        await record_kyc_image_hashes(kyc_doc.id, current_user["id"], documents)
+    except Exception as e:
+        logger.error(f"Failed to record KYC image hashes: {e}")
     
     # Send email notification to admin
     try:
@@ -50,13 +121,34 @@ async def submit_kyc(data: KYCSubmitRequest, current_user: dict = Depends(get_cu
     
     return {"success": True, "message": "KYC submitted for review"}
 
+@router.post("/upload")
+async def upload_kyc_document(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Upload one KYC image as multipart/form-data (part "file", optional form
+    field "field"). The file is streamed into storage; pass the returned
+    reference as that field's value in /kyc/submit instead of base64.
+    """
+    form, ref = await receive_upload(request, current_user["id"])
+    field = form.get("field")
+    if field and field not in KYC_IMAGE_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown KYC document field: {field}")
+    
+    return {
+        "success": True,
+        "field": field,
+        "reference": f"{BLOB_REFERENCE_PREFIX}{ref['sha256']}",
+        **ref
+    }
+
 @router.get("/status")
 async def get_kyc_status(current_user: dict = Depends(get_current_user)):
-    kyc_doc = await db.kyc_documents.find_one({"user_id": current_user["id"]})
+    kyc_doc = await db.kyc_documents.find_one(
+        {"user_id": current_user["id"]},
+        {"_id": 0, "status": 1, "submitted_at": 1, "rejection_reason": 1}
+    )
     if not kyc_doc:
         return {"status": "not_submitted", "kyc_status": current_user.get("kyc_status", "pending")}
     
-    kyc_doc.pop("_id", None)
     return {
         "status": kyc_doc.get("status", "pending"),
         "kyc_status": current_user.get("kyc_status", "pending"),
@@ -66,8 +158,7 @@ async def get_kyc_status(current_user: dict = Depends(get_current_user)):
 
 @router.get("/document")
 async def get_kyc_document(current_user: dict = Depends(get_current_user)):
-    kyc_doc = await db.kyc_documents.find_one({"user_id": current_user["id"]})
+    kyc_doc = await db.kyc_documents.find_one({"user_id": current_user["id"]}, KYC_WITHOUT_IMAGES)
     if not kyc_doc:
         raise HTTPException(status_code=404, detail="KYC not found")
-    kyc_doc.pop("_id", None)
-    return kyc_doc
+    return drop_inline_images(kyc_doc)
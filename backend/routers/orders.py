@@ -1,12 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from datetime import datetime
 import logging
 
 from core.database import db
 from core.dependencies import get_current_user
+from services.blob_store import is_blob_reference, resolve_blob_reference
+from services.uploads import receive_upload
 from models import (
     Order, CreateOrderRequest, UpdateOrderRequest, OrderStatus
 )
+from services.daily_stats import record_order_created
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 logger = logging.getLogger(__name__)
@@ -36,9 +39,12 @@ async def create_order(data: CreateOrderRequest, current_user: dict = Depends(ge
         quantity=data.quantity,
         rate=price,
         total_inr=total,
-        wallet_address=data.wallet_address
+        wallet_address=data.wallet_address,
+        rm_id=current_user.get("rm_id")
     )
-    await db.orders.insert_one(order.dict())
+    order_doc = order.dict()
+    await db.orders.insert_one(order_doc)
+    await record_order_created(order_doc)
     
     return {
         "success": True,
@@ -75,7 +81,9 @@ async def update_order(order_id: str, data: UpdateOrderRequest, current_user: di
         raise HTTPException(status_code=404, detail="Order not found")
     
     update_data = {"updated_at": datetime.utcnow()}
-    if data.payment_proof:
+    if is_blob_reference(data.payment_proof):
+        update_data["payment_proof_document"] = await resolve_blob_reference(data.payment_proof, current_user["id"])
+    elif data.payment_proof:
         update_data["payment_proof"] = data.payment_proof
     if data.tx_hash:
         update_data["tx_hash"] = data.tx_hash
@@ -83,3 +91,21 @@ async def update_order(order_id: str, data: UpdateOrderRequest, current_user: di
     await db.orders.update_one({"id": order_id}, {"$set": update_data})
     
     return {"success": True, "message": "Order updated"}
+
+@router.post("/{order_id}/payment-proof")
+async def upload_payment_proof(order_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """Attach a payment proof to an order as a multipart upload (part "file")"""
+    order = await db.orders.find_one(
+        {"id": order_id, "user_id": current_user["id"]},
+        {"_id": 0, "id": 1}
+    )
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    _, ref = await receive_upload(request, current_user["id"])
+    await db.orders.update_one(
+        {"id": order_id},
+        {"$set": {"payment_proof_document": ref, "updated_at": datetime.utcnow()}}
+    )
+    
+    return {"success": True, "proof": ref}
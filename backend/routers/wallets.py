@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from typing import Optional
 import logging
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
-from core.database import db
+from core.database import db, bulk_write_atomic
 from core.dependencies import get_current_user
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_cursor, encode_cursor, sort_spec
+from core.streaming import EXPORT_FORMATS
+from services.ledger_service import get_balances, to_utc_naive
+from services.wallet_address import normalize_address, network_key
+from services.address_validation import validate_address
+from services.blob_store import is_blob_reference, resolve_blob_reference
+from services.uploads import receive_upload
 from models import (
     SavedWallet, SaveWalletRequest, WalletVerificationStatus
 )
@@ -14,24 +25,38 @@ logger = logging.getLogger(__name__)
 # Create alias router for /wallet (without 's') for backwards compatibility
 wallet_alias_router = APIRouter(prefix="/wallet", tags=["Wallets"])
 
+LEDGER_EXPORT_COLUMNS = ["id", "created_at", "asset", "transaction_type", "amount", "description", "order_id"]
+
 @router.post("/save")
 async def save_wallet(data: SaveWalletRequest, current_user: dict = Depends(get_current_user)):
-    existing = await db.saved_wallets.find_one({
-        "user_id": current_user["id"],
-        "wallet_address": data.wallet_address
-    })
-    if existing:
-        raise HTTPException(status_code=400, detail="Wallet address already saved")
+    # Reject malformed addresses up front instead of queueing them for review
+    check = validate_address(data.network, data.wallet_address)
+    if not check["valid"]:
+        raise HTTPException(status_code=400, detail=f"Invalid {data.network} address: {check['error']}")
+    
+    # A proof uploaded through /wallets/{id}/proof arrives as a blob reference
+    proof_image, proof_document = data.proof_image, None
+    if is_blob_reference(proof_image):
+        proof_document = await resolve_blob_reference(proof_image, current_user["id"])
+        proof_image = None
     
     wallet = SavedWallet(
         user_id=current_user["id"],
         asset=data.asset,
         network=data.network,
         wallet_address=data.wallet_address,
+        normalized_address=normalize_address(data.network, data.wallet_address),
+        network_key=network_key(data.network),
         label=data.label,
-        proof_image=data.proof_image
+        proof_image=proof_image,
+        proof_document=proof_document
     )
-    await db.saved_wallets.insert_one(wallet.dict())
+    
+    # The unique (user_id, normalized_address, network_key) index rejects duplicates
+    try:
+        await db.saved_wallets.insert_one(wallet.dict())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Wallet address already saved")
     
     return {
         "success": True,
@@ -62,6 +87,57 @@ async def get_verified_wallets(current_user: dict = Depends(get_current_user)):
         wallet.pop("_id", None)
     return wallets
 
+# Ledger routes (registered before /{wallet_id} so they are not shadowed by it)
+@router.get("/balance")
+async def get_wallet_balance(
+    as_of: Optional[datetime] = Query(None, description="Point in time (ISO 8601); defaults to now"),
+    current_user: dict = Depends(get_current_user)
+):
+    balances = await get_balances(current_user["id"], as_of)
+    return [{"asset": k, "balance": v} for k, v in balances.items()]
+
+@router.get("/ledger")
+async def get_wallet_ledger(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Newest-first ledger page; the next page's cursor is returned in X-Next-Cursor"""
+    query = apply_cursor({"user_id": current_user["id"]}, cursor)
+    entries = await db.wallet_ledger.find(query, {"_id": 0}).sort(sort_spec()).to_list(limit)
+    
+    if len(entries) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(entries[-1])
+    return entries
+
+@router.get("/ledger/export")
+async def export_wallet_ledger(
+    format: str = Query("csv", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream the full ledger as CSV, NDJSON or XLSX without loading it into memory"""
+    query = {"user_id": current_user["id"]}
+    created_at = {}
+    if from_date:
+        created_at["$gte"] = to_utc_naive(from_date)
+    if to_date:
+        created_at["$lte"] = to_utc_naive(to_date)
+    if created_at:
+        query["created_at"] = created_at
+    
+    cursor = db.wallet_ledger.find(query, {"_id": 0}).sort(sort_spec())
+    stream, media_type = EXPORT_FORMATS[format]
+    filename = f"ledger_{current_user.get('client_uid', current_user['id'])}.{format}"
+    
+    return StreamingResponse(
+        stream(cursor, LEDGER_EXPORT_COLUMNS),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/{wallet_id}")
 async def get_wallet(wallet_id: str, current_user: dict = Depends(get_current_user)):
     wallet = await db.saved_wallets.find_one({"id": wallet_id, "user_id": current_user["id"]})
@@ -79,17 +155,36 @@ async def set_primary_wallet(wallet_id: str, current_user: dict = Depends(get_cu
     if wallet.get("verification_status") != "verified":
         raise HTTPException(status_code=400, detail="Only verified wallets can be set as primary")
     
-    await db.saved_wallets.update_many(
-        {"user_id": current_user["id"], "asset": wallet["asset"]},
-        {"$set": {"is_primary": False}}
+    # Stamping every wallet of the asset (not just clearing the flag) makes two
+    # concurrent set-primary calls conflict, so one retries instead of both
+    # committing a primary.
+    await bulk_write_atomic({"saved_wallets": [
+        UpdateMany(
+            {"user_id": current_user["id"], "asset": wallet["asset"]},
+            {"$set": {"is_primary": False, "primary_changed_at": datetime.utcnow()}}
+        ),
+        UpdateOne({"id": wallet_id}, {"$set": {"is_primary": True}})
+    ]})
+    
+    return {"success": True, "message": "Primary wallet updated"}
+
+@router.post("/{wallet_id}/proof")
+async def upload_wallet_proof(wallet_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """Attach an ownership proof to a saved wallet as a multipart upload (part "file")"""
+    wallet = await db.saved_wallets.find_one(
+        {"id": wallet_id, "user_id": current_user["id"]},
+        {"_id": 0, "id": 1}
     )
+    if not wallet:
+        raise HTTPException(status_code=404, detail="Wallet not found")
     
+    _, ref = await receive_upload(request, current_user["id"])
     await db.saved_wallets.update_one(
         {"id": wallet_id},
-        {"$set": {"is_primary": True}}
+        {"$set": {"proof_document": ref}, "$unset": {"proof_image": ""}}
     )
     
-    return {"success": True, "message": "Primary wallet updated"}
+    return {"success": True, "proof": ref}
 
 @router.delete("/{wallet_id}")
 async def delete_wallet(wallet_id: str, current_user: dict = Depends(get_current_user)):
@@ -100,36 +195,19 @@ async def delete_wallet(wallet_id: str, current_user: dict = Depends(get_current
     await db.saved_wallets.delete_one({"id": wallet_id})
     return {"success": True, "message": "Wallet deleted"}
 
-# Ledger routes
-@router.get("/balance")
-async def get_wallet_balance(current_user: dict = Depends(get_current_user)):
-    ledger_entries = await db.wallet_ledger.find({"user_id": current_user["id"]}).to_list(1000)
-    
-    balances = {}
-    for entry in ledger_entries:
-        asset = entry["asset"]
-        if asset not in balances:
-            balances[asset] = 0
-        
-        if entry["transaction_type"] == "credit":
-            balances[asset] += entry["amount"]
-        else:
-            balances[asset] -= entry["amount"]
-    
-    return [{"asset": k, "balance": v} for k, v in balances.items()]
-
-@router.get("/ledger")
-async def get_wallet_ledger(current_user: dict = Depends(get_current_user)):
-    entries = await db.wallet_ledger.find({"user_id": current_user["id"]}).sort("created_at", -1).to_list(100)
-    for entry in entries:
-        entry.pop("_id", None)
-    return entries
-
 # Alias routes for /wallet (without 's') - backwards compatibility
 @wallet_alias_router.get("/balance")
-async def get_wallet_balance_alias(current_user: dict = Depends(get_current_user)):
-    return await get_wallet_balance(current_user)
+async def get_wallet_balance_alias(
+    as_of: Optional[datetime] = Query(None, description="Point in time (ISO 8601); defaults to now"),
+    current_user: dict = Depends(get_current_user)
+):
+    return await get_wallet_balance(as_of, current_user)
 
 @wallet_alias_router.get("/ledger")
-async def get_wallet_ledger_alias(current_user: dict = Depends(get_current_user)):
-    return await get_wallet_ledger(current_user)
+async def get_wallet_ledger_alias(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
+    return await get_wallet_ledger(response, limit, cursor, current_user)
@@ -7,10 +7,22 @@ A premium Over-the-Counter crypto trading desk for high-net-worth Indian clients
 
 from fastapi import FastAPI, APIRouter
 from starlette.middleware.cors import CORSMiddleware
+import asyncio
 import logging
 import os
 
-from core.database import close_db
+from core.database import close_db, ensure_indexes
+from services.ledger_service import CHECKPOINTS_ENABLED, run_checkpoint_scheduler
+from services.image_processing import shutdown_image_pool
+from services.kyc_service import kyc_service
+from services.kyc_verification import cancel_verification_jobs, resume_pending_verifications
+from services.daily_stats import ensure_daily_stats
+from services.rate_notifications import cancel_rate_notifications, interrupt_stale_rate_notifications
+from services.reconciliation_service import cancel_reconciliation
+from services.image_similarity import phash_index
+from services.order_cache import order_columns
+from services.admin_search import user_directory
+from services.admin_events import admin_events
 from routers import (
     auth_router,
     users_router,
@@ -109,11 +121,48 @@ async def root():
         "health": "/api/health"
     }
 
+# Long-running background jobs started with the app
+background_tasks = []
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    admin_events.stop()
+    cancel_verification_jobs()
+    cancel_rate_notifications()
+    cancel_reconciliation()
+    shutdown_image_pool()
+    await kyc_service.close()
     await close_db()
 
 @app.on_event("startup")
 async def startup():
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to ensure indexes: {e}")
+    
+    try:
+        await resume_pending_verifications()
+    except Exception as e:
+        logger.error(f"Failed to resume KYC verifications: {e}")
+    
+    # First start with the daily_stats rollups: build them from the raw data
+    background_tasks.append(asyncio.create_task(ensure_daily_stats()))
+    
+    try:
+        await interrupt_stale_rate_notifications()
+    except Exception as e:
+        logger.error(f"Failed to close out unfinished rate fan-outs: {e}")
+    
+    # Build the in-memory indexes without delaying startup
+    background_tasks.append(asyncio.create_task(phash_index.load()))
+    background_tasks.append(asyncio.create_task(order_columns.load()))
+    background_tasks.append(asyncio.create_task(user_directory.load()))
+    
+    if CHECKPOINTS_ENABLED:
+        background_tasks.append(asyncio.create_task(run_checkpoint_scheduler()))
+    
     logger.info("BharatBit OTC Desk API v2.0.0 - Server started")
     logger.info("CORS Origins: " + str(origins_list))
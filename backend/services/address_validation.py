@@ -0,0 +1,293 @@
+# Local wallet address validation: checks an address against the encoding
+# rules of its network before it is queued for manual review. Pure Python;
+# alphabets and Keccak constants are precomputed at import time.
+
+import re
+import hashlib
+from typing import Dict, List, Optional
+
+from services.wallet_address import network_family
+
+# ==================== KECCAK-256 (for EIP-55) ====================
+# hashlib.sha3_256 uses the FIPS-202 padding, Ethereum uses the original
+# Keccak padding, so the permutation is implemented here.
+
+_MASK64 = (1 << 64) - 1
+
+_KECCAK_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+
+# Rotation offset per lane, indexed x + 5 * y
+_KECCAK_RHO = [
+    0, 1, 62, 28, 27,
+    36, 44, 6, 55, 20,
+    3, 10, 43, 25, 39,
+    41, 45, 15, 21, 8,
+    18, 2, 61, 56, 14,
+]
+
+# Destination lane of the pi step: (x, y) -> (y, 2x + 3y)
+_KECCAK_PI = [y + 5 * ((2 * x + 3 * y) % 5) for y in range(5) for x in range(5)]
+
+# Lane neighbours used by the chi step
+_KECCAK_CHI = [((i + 1) % 5 + 5 * (i // 5), (i + 2) % 5 + 5 * (i // 5)) for i in range(25)]
+
+_KECCAK_RATE = 136  # bytes, for a 256-bit output
+
+def _rotl64(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (64 - shift))) & _MASK64 if shift else value
+
+def _keccak_f1600(lanes: List[int]) -> List[int]:
+    for round_constant in _KECCAK_ROUND_CONSTANTS:
+        c = [lanes[x] ^ lanes[x + 5] ^ lanes[x + 10] ^ lanes[x + 15] ^ lanes[x + 20] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rotl64(c[(x + 1) % 5], 1) for x in range(5)]
+
+        b = [0] * 25
+        for i in range(25):
+            b[_KECCAK_PI[i]] = _rotl64(lanes[i] ^ d[i % 5], _KECCAK_RHO[i])
+
+        lanes = [b[i] ^ (~b[j] & b[k]) for i, (j, k) in enumerate(_KECCAK_CHI)]
+        lanes[0] ^= round_constant
+    return lanes
+
+def keccak256(data: bytes) -> bytes:
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b"\x00" * (-len(padded) % _KECCAK_RATE))
+    padded[-1] |= 0x80
+
+    lanes = [0] * 25
+    for offset in range(0, len(padded), _KECCAK_RATE):
+        block = padded[offset:offset + _KECCAK_RATE]
+        for i in range(_KECCAK_RATE // 8):
+            lanes[i] ^= int.from_bytes(block[8 * i:8 * i + 8], "little")
+        lanes = _keccak_f1600(lanes)
+
+    return b"".join(lane.to_bytes(8, "little") for lane in lanes[:4])
+
+# ==================== BASE58 ====================
+
+BITCOIN_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+RIPPLE_ALPHABET = "rpshnaf39wBUDNEGHJKLM4PQRST7VWXYZ2bcdeCg65jkm8oFqi1tuvAxyz"
+
+_BASE58_MAPS = {
+    alphabet: {char: index for index, char in enumerate(alphabet)}
+    for alphabet in (BITCOIN_ALPHABET, RIPPLE_ALPHABET)
+}
+
+def base58_decode(value: str, alphabet: str = BITCOIN_ALPHABET) -> Optional[bytes]:
+    char_map = _BASE58_MAPS[alphabet]
+    number = 0
+    for char in value:
+        digit = char_map.get(char)
+        if digit is None:
+            return None
+        number = number * 58 + digit
+
+    leading_zeros = len(value) - len(value.lstrip(alphabet[0]))
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big") if number else b""
+    return b"\x00" * leading_zeros + body
+
+def base58check_decode(value: str, alphabet: str = BITCOIN_ALPHABET) -> Optional[bytes]:
+    """Payload without the 4-byte checksum, or None if decoding/checksum fails"""
+    raw = base58_decode(value, alphabet)
+    if raw is None or len(raw) < 5:
+        return None
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        return None
+    return payload
+
+# ==================== BECH32 / BECH32M ====================
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_MAP = {char: index for index, char in enumerate(BECH32_CHARSET)}
+_BECH32_GENERATOR = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+BECH32_CONST = 1
+BECH32M_CONST = 0x2BC830A3
+
+def _bech32_polymod(values: List[int]) -> int:
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                checksum ^= _BECH32_GENERATOR[i]
+    return checksum
+
+def _bech32_hrp_expand(hrp: str) -> List[int]:
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+def bech32_decode(value: str, max_length: Optional[int] = 90):
+    """(hrp, data, spec constant) or None; spec is BECH32_CONST or BECH32M_CONST"""
+    if value.lower() != value and value.upper() != value:
+        return None  # mixed case is never valid
+    value = value.lower()
+    if max_length and len(value) > max_length:
+        return None
+
+    separator = value.rfind("1")
+    if separator < 1 or separator + 7 > len(value):
+        return None
+
+    hrp = value[:separator]
+    if any(ord(c) < 33 or ord(c) > 126 for c in hrp):
+        return None
+    try:
+        data = [_BECH32_MAP[c] for c in value[separator + 1:]]
+    except KeyError:
+        return None
+
+    spec = _bech32_polymod(_bech32_hrp_expand(hrp) + data)
+    if spec not in (BECH32_CONST, BECH32M_CONST):
+        return None
+    return hrp, data[:-6], spec
+
+def _convert_bits(data: List[int], from_bits: int, to_bits: int) -> Optional[List[int]]:
+    """Regroup 5-bit words into bytes without padding (BIP-173 rules)"""
+    accumulator, bits, result = 0, 0, []
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        accumulator = (accumulator << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((accumulator >> bits) & max_value)
+    if bits >= from_bits or ((accumulator << (to_bits - bits)) & max_value):
+        return None
+    return result
+
+# ==================== PER-FAMILY CHECKS ====================
+# Each check returns (format, None) when valid or (None, reason) when not.
+
+_EVM_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+def _check_evm(address: str):
+    if not _EVM_PATTERN.match(address):
+        return None, "Expected 0x followed by 40 hex characters"
+    body = address[2:]
+    if body.islower() or body.isupper() or body.isdigit():
+        return "hex", None  # no checksum encoded
+
+    digest = keccak256(body.lower().encode()).hex()
+    for char, nibble in zip(body, digest):
+        if char.isalpha() and (char.isupper() != (int(nibble, 16) >= 8)):
+            return None, "EIP-55 checksum mismatch"
+    return "eip55", None
+
+def _check_bitcoin(address: str):
+    if address[:3].lower() == "bc1":
+        decoded = bech32_decode(address)
+        if not decoded or decoded[0] != "bc" or not decoded[1]:
+            return None, "Invalid bech32 address"
+        _, data, spec = decoded
+        version, program = data[0], _convert_bits(data[1:], 5, 8)
+        if version > 16 or program is None or not 2 <= len(program) <= 40:
+            return None, "Invalid witness program"
+        if version == 0 and (len(program) not in (20, 32) or spec != BECH32_CONST):
+            return None, "Invalid segwit v0 address"
+        if version > 0 and spec != BECH32M_CONST:
+            return None, "Taproot addresses must use bech32m"
+        return ("bech32" if version == 0 else "bech32m"), None
+
+    payload = base58check_decode(address)
+    if payload is None:
+        return None, "Invalid Base58Check encoding or checksum"
+    if len(payload) != 21 or payload[0] not in (0x00, 0x05):
+        return None, "Not a mainnet P2PKH/P2SH address"
+    return "base58check", None
+
+def _check_tron(address: str):
+    payload = base58check_decode(address)
+    if payload is None:
+        return None, "Invalid Base58Check encoding or checksum"
+    if len(payload) != 21 or payload[0] != 0x41:
+        return None, "Not a Tron address"
+    return "base58check", None
+
+def _check_xrp(address: str):
+    payload = base58check_decode(address, RIPPLE_ALPHABET)
+    if payload is None:
+        return None, "Invalid Base58Check encoding or checksum"
+    if len(payload) == 21 and payload[0] == 0x00:
+        return "classic", None
+    if len(payload) == 31 and payload[:2] == b"\x05\x44":
+        return "x-address", None
+    return None, "Not an XRP address"
+
+def _check_solana(address: str):
+    if not 32 <= len(address) <= 44:
+        return None, "Expected 32-44 Base58 characters"
+    raw = base58_decode(address)
+    if raw is None or len(raw) != 32:
+        return None, "Not a 32-byte Base58 public key"
+    return "base58", None
+
+def _check_dogecoin(address: str):
+    payload = base58check_decode(address)
+    if payload is None:
+        return None, "Invalid Base58Check encoding or checksum"
+    if len(payload) != 21 or payload[0] not in (0x1E, 0x16):
+        return None, "Not a Dogecoin address"
+    return "base58check", None
+
+def _check_cardano(address: str):
+    if address[:4].lower() == "addr":
+        decoded = bech32_decode(address, max_length=None)
+        if not decoded or decoded[0] != "addr" or decoded[2] != BECH32_CONST:
+            return None, "Invalid Shelley bech32 address"
+        return "bech32", None
+    # Byron addresses carry a CBOR CRC rather than a Base58 checksum
+    if address[:3] in ("Ae2", "Ddz") and base58_decode(address) is not None:
+        return "byron", None
+    return None, "Not a Cardano address"
+
+_CHECKS = {
+    "evm": _check_evm,
+    "bitcoin": _check_bitcoin,
+    "tron": _check_tron,
+    "xrp": _check_xrp,
+    "solana": _check_solana,
+    "dogecoin": _check_dogecoin,
+    "cardano": _check_cardano,
+}
+
+def validate_address(network: str, address: str) -> Dict:
+    """
+    Validate an address for a network.
+
+    Returns {"valid", "checked", "family", "format", "error"}. Networks
+    without a local check come back as valid with checked=False so they
+    still go through manual review.
+    """
+    address = (address or "").strip()
+    family = network_family(network or "")
+    check = _CHECKS.get(family)
+
+    if not address:
+        return {"valid": False, "checked": True, "family": family, "format": None, "error": "Address is empty"}
+    if not check:
+        return {"valid": True, "checked": False, "family": family, "format": None, "error": None}
+
+    address_format, error = check(address)
+    return {
+        "valid": error is None,
+        "checked": True,
+        "family": family,
+        "format": address_format,
+        "error": error
+    }
+
+def validate_addresses(items: List[Dict]) -> List[Dict]:
+    """Batch form of validate_address for [{"network", "address"}] items"""
+    return [
+        {"network": item.get("network"), "address": item.get("address"), **validate_address(item.get("network"), item.get("address"))}
+        for item in items
+    ]
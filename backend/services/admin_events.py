@@ -0,0 +1,267 @@
+import os
+import json
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+# Live admin dashboard events. One producer per process turns writes to
+# orders, saved wallets and KYC documents into small summary events and fans
+# them out to every connected /admin/events client. The producer follows a
+# MongoDB change stream; on a standalone server, where change streams are
+# unavailable, it polls each collection past per-field high-water marks
+# instead. It only runs while at least one client is connected.
+ADMIN_EVENTS_POLL_SECONDS = float(os.getenv('ADMIN_EVENTS_POLL_SECONDS', 2))
+
+KEEPALIVE_SECONDS = 15
+RECONNECT_DELAY_SECONDS = 5
+SUBSCRIBER_QUEUE_SIZE = 1000
+POLL_BATCH_SIZE = 500
+LAST_SEEN_SIZE = 10000
+
+# Per collection: the fields summarized in an event, the event for a new
+# record (by the timestamp that marks it new), and the events for field
+# changes, each with the timestamp the polling fallback watches for it. Where
+# that timestamp also moves on edits that leave the field alone (an order's
+# updated_at bumps on tx-hash and proof uploads), the last element is the
+# neutral event polling sends when it cannot tell that the field changed.
+EVENT_SOURCES = {
+    "orders": {
+        "fields": ["id", "user_id", "asset", "order_type", "quantity", "total_inr", "status", "created_at"],
+        "created": ("created_at", "order.created"),
+        "changes": [("status", "updated_at", "order.status", "order.updated")]
+    },
+    "saved_wallets": {
+        "fields": ["id", "user_id", "asset", "network", "label", "verification_status", "created_at"],
+        "created": ("created_at", "wallet.saved"),
+        "changes": [("verification_status", "verified_at", "wallet.status", None)]
+    },
+    "kyc_documents": {
+        "fields": ["id", "user_id", "status", "submitted_at", "account_holder_name", "auto_verification.status"],
+        # Resubmissions update the existing document, so submitted_at marks new work
+        "created": ("submitted_at", "kyc.submitted"),
+        "changes": [
+            ("status", "reviewed_at", "kyc.status", None),
+            ("auto_verification.status", "auto_verification.completed_at", "kyc.auto_verification", None)
+        ]
+    }
+}
+
+CHANGE_PIPELINE = [{"$match": {
+    "ns.coll": {"$in": list(EVENT_SOURCES)},
+    "operationType": {"$in": ["insert", "update"]}
+}}]
+
+def _get(doc: Dict, path: str):
+    for key in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+def _summary(collection: str, doc: Dict) -> Dict:
+    return {field.replace(".", "_"): _get(doc, field) for field in EVENT_SOURCES[collection]["fields"]}
+
+def _touches(updated_fields: Dict, field: str) -> bool:
+    """Whether an update set `field`, directly or through a parent or child path"""
+    return any(
+        key == field or key.startswith(field + ".") or field.startswith(key + ".")
+        for key in updated_fields
+    )
+
+def event_from_change(change: Dict) -> Optional[Dict]:
+    """The dashboard event for a change stream document, or None if it is not one"""
+    collection = change["ns"]["coll"]
+    source = EVENT_SOURCES[collection]
+    doc = change.get("fullDocument")
+    if not doc:
+        return None
+    
+    if change["operationType"] == "insert":
+        event_type = source["created"][1]
+    else:
+        updated = change.get("updateDescription", {}).get("updatedFields", {})
+        if _touches(updated, source["created"][0]):
+            event_type = source["created"][1]
+        else:
+            event_type = next((event for field, _, event, _ in source["changes"] if _touches(updated, field)), None)
+        if event_type is None:
+            return None
+    return {"type": event_type, "data": _summary(collection, doc)}
+
+def _change_streams_unsupported(error: OperationFailure) -> bool:
+    return error.code in (40573, 136) or "only supported on replica sets" in str(error)
+
+def _resume_token_lost(error: OperationFailure) -> bool:
+    # ChangeStreamHistoryLost, InvalidResumeToken, ChangeStreamFatalError
+    return error.code in (286, 260, 280)
+
+class AdminEventHub:
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._producer: Optional[asyncio.Task] = None
+        self._sequence = 0
+        # None until the first attempt to open a change stream
+        self._change_streams: Optional[bool] = None
+        # Polling: last value seen per (collection, field, record id) for the
+        # fields whose timestamp is shared with other edits
+        self._last_seen: "OrderedDict[Tuple[str, str, str], object]" = OrderedDict()
+        # Where the producer stopped, so a reconnect after an error continues
+        # from there: the change stream resume token, or the polling
+        # high-water mark per (collection, timestamp field)
+        self._resume_token: Optional[Dict] = None
+        self._marks: Optional[Dict[Tuple[str, str], datetime]] = None
+    
+    @property
+    def mode(self) -> str:
+        return "polling" if self._change_streams is False else "change_stream"
+    
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.create_task(self._produce())
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            self.stop()
+    
+    def stop(self):
+        if self._producer:
+            self._producer.cancel()
+            self._producer = None
+        # With nobody connected there is no gap to replay; the next client
+        # loads its lists fresh
+        self._resume_token = None
+        self._marks = None
+    
+    def publish(self, event: Dict):
+        self._sequence += 1
+        event["id"] = self._sequence
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client this far behind gets one resync marker in place of
+                # its backlog and reloads its lists
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "id": self._sequence, "data": {}})
+    
+    async def _produce(self):
+        while True:
+            try:
+                if self._change_streams is not False:
+                    await self._watch()
+                else:
+                    await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if self._change_streams is not True and _change_streams_unsupported(e):
+                    logger.warning("MongoDB change streams not supported by this deployment; polling for admin events")
+                    self._change_streams = False
+                    continue
+                if self._resume_token is not None and _resume_token_lost(e):
+                    # The gap has rolled off the oplog; clients must reload
+                    logger.warning("Admin event stream could not resume; continuing from now")
+                    self._resume_token = None
+                    self.publish({"type": "resync", "data": {}})
+                    continue
+                logger.error(f"Admin event producer failed: {e}")
+            except PyMongoError as e:
+                logger.error(f"Admin event producer failed: {e}")
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+    
+    async def _watch(self):
+        while True:
+            async with db.watch(CHANGE_PIPELINE, full_document="updateLookup", resume_after=self._resume_token) as stream:
+                self._change_streams = True
+                async for change in stream:
+                    self._resume_token = stream.resume_token
+                    event = event_from_change(change)
+                    if event:
+                        self.publish(event)
+    
+    def _seen(self, collection: str, field: str, doc: Dict):
+        """Record the record's current value of field; return the previous one, or None if not seen"""
+        key = (collection, field, doc.get("id"))
+        previous = self._last_seen.pop(key, None)
+        self._last_seen[key] = _get(doc, field)
+        if len(self._last_seen) > LAST_SEEN_SIZE:
+            self._last_seen.popitem(last=False)
+        return previous
+    
+    def _polled_type(self, collection: str, doc: Dict, watch: Tuple) -> str:
+        _, _, event_type, field, neutral = watch
+        if field is None:
+            # A new record: remember the fields later polls compare against
+            for tracked, _, _, has_neutral in EVENT_SOURCES[collection]["changes"]:
+                if has_neutral:
+                    self._seen(collection, tracked, doc)
+            return event_type
+        if neutral is None:
+            return event_type
+        previous = self._seen(collection, field, doc)
+        return event_type if previous is not None and previous != _get(doc, field) else neutral
+    
+    async def _poll(self):
+        started = datetime.utcnow()
+        # (collection, timestamp, event, changed field, neutral event)
+        watches = []
+        for collection, source in EVENT_SOURCES.items():
+            watches.append((collection, source["created"][0], source["created"][1], None, None))
+            watches += [
+                (collection, timestamp, event, field, neutral)
+                for field, timestamp, event, neutral in source["changes"]
+            ]
+        if self._marks is None:
+            self._marks = {(watch[0], watch[1]): started for watch in watches}
+        marks = self._marks
+        
+        while True:
+            for watch in watches:
+                collection, timestamp = watch[0], watch[1]
+                docs = await self._poll_once(collection, timestamp, marks[(collection, timestamp)])
+                for doc in docs:
+                    self.publish({"type": self._polled_type(collection, doc, watch), "data": _summary(collection, doc)})
+                if docs:
+                    marks[(collection, timestamp)] = _get(docs[-1], timestamp)
+            await asyncio.sleep(ADMIN_EVENTS_POLL_SECONDS)
+    
+    async def _poll_once(self, collection: str, field: str, mark: datetime) -> List[Dict]:
+        projection = {"_id": 0, field: 1, **{f: 1 for f in EVENT_SOURCES[collection]["fields"]}}
+        return await db[collection].find(
+            {field: {"$gt": mark}}, projection
+        ).sort(field, 1).limit(POLL_BATCH_SIZE).to_list(POLL_BATCH_SIZE)
+
+admin_events = AdminEventHub()
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def format_sse(event: Dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=_json_default)}\n\n"
+
+async def event_stream(request) -> AsyncIterator[str]:
+    """Server-sent events for one client, with keepalive comments while idle"""
+    queue = admin_events.subscribe()
+    try:
+        yield f"retry: {RECONNECT_DELAY_SECONDS * 1000}\n\n"
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        admin_events.unsubscribe(queue)
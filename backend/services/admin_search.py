@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import re
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from core.database import db
+from services.wallet_address import address_lookup_candidates
+
+logger = logging.getLogger(__name__)
+
+# Admin search across users, orders and saved wallets. Numeric lookups
+# (client ID, mobile) are answered from in-memory prefix indexes; emails,
+# transaction hashes and wallet addresses use anchored prefix regexes,
+# which MongoDB serves as index range scans; names use the users text
+# index. All lookups run concurrently and the hits are ranked together.
+
+MIN_QUERY_LENGTH = 2
+# Digit prefixes shorter than this match too many mobiles to be useful
+MIN_MOBILE_DIGITS = 4
+# Hashes and addresses are only searched once the prefix is selective
+MIN_HASH_LENGTH = 6
+
+REFRESH_OVERLAP = timedelta(seconds=30)
+LOAD_BATCH_SIZE = 10000
+
+class PrefixIndex:
+    """
+    Sorted (key, id) pairs. Keys sharing a prefix are contiguous, so a
+    prefix search is one binary search plus a scan of the matches - the
+    same walk as a trie, without a node object per character.
+    """
+    def __init__(self):
+        self._keys: List[str] = []
+        self._ids: List[str] = []
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def build(self, pairs: List[Tuple[str, str]]):
+        pairs = sorted(set(pairs))
+        self._keys = [key for key, _ in pairs]
+        self._ids = [value for _, value in pairs]
+    
+    def add(self, key: str, value: str):
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            if self._ids[position] == value:
+                return
+            position += 1
+        self._keys.insert(position, key)
+        self._ids.insert(position, value)
+    
+    def search(self, prefix: str, limit: int) -> List[Tuple[str, str]]:
+        """Up to limit (key, id) pairs whose key starts with prefix, shortest keys first"""
+        matches = []
+        position = bisect_left(self._keys, prefix)
+        while position < len(self._keys) and self._keys[position].startswith(prefix):
+            matches.append((self._keys[position], self._ids[position]))
+            position += 1
+            if len(matches) >= limit * 4:
+                break
+        matches.sort(key=lambda match: len(match[0]))
+        return matches[:limit]
+
+def _digits(value: str) -> str:
+    return re.sub(r"\D", "", value or "")
+
+def mobile_keys(mobile: str) -> List[str]:
+    """The full number with country code, and the 10-digit national number"""
+    digits = _digits(mobile)
+    keys = [digits] if digits else []
+    if len(digits) > 10:
+        keys.append(digits[-10:])
+    return keys
+
+class UserDirectory:
+    """Prefix indexes over client IDs and mobiles, kept current by tailing new users"""
+    def __init__(self):
+        self.client_uids = PrefixIndex()
+        self.mobiles = PrefixIndex()
+        self._watermark: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+    
+    def add(self, user: Dict):
+        if user.get("client_uid"):
+            self.client_uids.add(str(user["client_uid"]), user["id"])
+        for key in mobile_keys(user.get("mobile")):
+            self.mobiles.add(key, user["id"])
+    
+    async def load(self):
+        async with self._lock:
+            started = datetime.utcnow()
+            uids, mobiles = [], []
+            cursor = db.users.find({}, {"_id": 0, "id": 1, "client_uid": 1, "mobile": 1}).batch_size(LOAD_BATCH_SIZE)
+            async for user in cursor:
+                if user.get("client_uid"):
+                    uids.append((str(user["client_uid"]), user["id"]))
+                mobiles += [(key, user["id"]) for key in mobile_keys(user.get("mobile"))]
+            self.client_uids.build(uids)
+            self.mobiles.build(mobiles)
+            self._watermark = started
+            logger.info(f"User directory loaded with {len(uids)} users")
+    
+    async def refresh(self):
+        """Load on first use, then pick up users registered since (mobile and client ID never change)"""
+        if self._watermark is None:
+            await self.load()
+            return
+        async with self._lock:
+            started = datetime.utcnow()
+            async for user in db.users.find(
+                {"created_at": {"$gte": self._watermark - REFRESH_OVERLAP}},
+                {"_id": 0, "id": 1, "client_uid": 1, "mobile": 1}
+            ):
+                self.add(user)
+            self._watermark = started
+
+user_directory = UserDirectory()
+
+def _prefix_score(query: str, value: str) -> float:
+    """100 for an exact match, otherwise 50-100 by how much of the value the query covers"""
+    if not value:
+        return 0
+    if query == value:
+        return 100
+    return round(50 + 50 * len(query) / len(value), 2)
+
+def _prefix_regex(values: List[str]) -> Dict:
+    return {"$in": [re.compile("^" + re.escape(value)) for value in values]}
+
+USER_FIELDS = {"_id": 0, "id": 1, "client_uid": 1, "email": 1, "mobile": 1, "full_name": 1,
+               "company_name": 1, "kyc_status": 1, "account_type": 1, "is_frozen": 1}
+
+async def _directory_hits(query: str, limit: int) -> List[Dict]:
+    digits = _digits(query)
+    if not digits or not re.fullmatch(r"[\d\s+()-]+", query):
+        return []
+    await user_directory.refresh()
+    
+    scores: Dict[str, Tuple[float, str]] = {}
+    for key, user_id in user_directory.client_uids.search(digits, limit):
+        scores[user_id] = max(scores.get(user_id, (0, "")), (_prefix_score(digits, key), "client_uid"))
+    if len(digits) >= MIN_MOBILE_DIGITS:
+        for key, user_id in user_directory.mobiles.search(digits, limit):
+            scores[user_id] = max(scores.get(user_id, (0, "")), (_prefix_score(digits, key), "mobile"))
+    if not scores:
+        return []
+    
+    users = await db.users.find({"id": {"$in": list(scores)}}, USER_FIELDS).to_list(len(scores))
+    return [{"type": "user", "score": scores[u["id"]][0], "matched": scores[u["id"]][1], **u} for u in users]
+
+async def _email_hits(query: str, limit: int) -> List[Dict]:
+    if " " in query:
+        return []
+    users = await db.users.find(
+        {"email": _prefix_regex(list({query, query.lower()}))}, USER_FIELDS
+    ).limit(limit).to_list(limit)
+    return [
+        {"type": "user", "score": _prefix_score(query.lower(), u["email"].lower()), "matched": "email", **u}
+        for u in users
+    ]
+
+async def _name_hits(query: str, limit: int) -> List[Dict]:
+    if not re.search(r"[A-Za-z]", query) or "@" in query:
+        return []
+    users = await db.users.find(
+        {"$text": {"$search": query}},
+        {**USER_FIELDS, "text_score": {"$meta": "textScore"}}
+    ).sort([("text_score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+    hits = []
+    for user in users:
+        text_score = user.pop("text_score", 0)
+        # Text matches rank below identifier prefixes unless the name matches outright
+        name = (user.get("full_name") or user.get("company_name") or "").lower()
+        score = 90 if name == query.lower() else min(80, 40 + 20 * text_score)
+        hits.append({"type": "user", "score": round(score, 2), "matched": "name", **user})
+    return hits
+
+async def _order_hits(query: str, limit: int) -> List[Dict]:
+    if len(query) < MIN_HASH_LENGTH or " " in query:
+        return []
+    candidates = list({query, query.lower()})
+    orders = await db.orders.find(
+        {"$or": [{"tx_hash": _prefix_regex(candidates)}, {"wallet_address": _prefix_regex(candidates)}]},
+        {"_id": 0, "id": 1, "user_id": 1, "asset": 1, "order_type": 1, "status": 1,
+         "total_inr": 1, "tx_hash": 1, "wallet_address": 1, "created_at": 1}
+    ).limit(limit).to_list(limit)
+    hits = []
+    for order in orders:
+        field = "tx_hash" if (order.get("tx_hash") or "").lower().startswith(query.lower()) else "wallet_address"
+        hits.append({
+            "type": "order", "score": _prefix_score(query.lower(), (order.get(field) or "").lower()),
+            "matched": field, **order
+        })
+    return hits
+
+async def _wallet_hits(query: str, limit: int) -> List[Dict]:
+    if len(query) < MIN_HASH_LENGTH or " " in query:
+        return []
+    wallets = await db.saved_wallets.find(
+        {"normalized_address": _prefix_regex(address_lookup_candidates(query))},
+        {"_id": 0, "id": 1, "user_id": 1, "asset": 1, "network": 1, "label": 1,
+         "wallet_address": 1, "normalized_address": 1, "verification_status": 1}
+    ).limit(limit).to_list(limit)
+    return [
+        {
+            "type": "wallet", "score": _prefix_score(query.lower(), (wallet.pop("normalized_address", "") or "").lower()),
+            "matched": "wallet_address", **wallet
+        }
+        for wallet in wallets
+    ]
+
+async def search(query: str, limit: int = 20) -> Dict:
+    """Ranked users, orders and wallets matching query, best first"""
+    started = datetime.utcnow()
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return {"query": query, "results": [], "elapsed_ms": 0}
+    
+    groups = await asyncio.gather(
+        _directory_hits(query, limit),
+        _email_hits(query, limit),
+        _name_hits(query, limit),
+        _order_hits(query, limit),
+        _wallet_hits(query, limit)
+    )
+    
+    # A user can match on several fields; keep the best-scoring hit
+    best: Dict[Tuple[str, str], Dict] = {}
+    for hit in (hit for group in groups for hit in group):
+        key = (hit["type"], hit["id"])
+        if key not in best or hit["score"] > best[key]["score"]:
+            best[key] = hit
+    results = sorted(best.values(), key=lambda hit: -hit["score"])[:limit]
+    
+    owner_ids = list({hit["user_id"] for hit in results if hit["type"] != "user"})
+    if owner_ids:
+        owners = await db.users.find(
+            {"id": {"$in": owner_ids}}, {"_id": 0, "id": 1, "email": 1, "client_uid": 1, "full_name": 1}
+        ).to_list(len(owner_ids))
+        owner_map = {u["id"]: u for u in owners}
+        for hit in results:
+            if hit["type"] != "user":
+                owner = owner_map.get(hit["user_id"], {})
+                hit["user_email"] = owner.get("email")
+                hit["client_uid"] = owner.get("client_uid")
+                hit["user_name"] = owner.get("full_name")
+    
+    elapsed = (datetime.utcnow() - started).total_seconds() * 1000
+    return {"query": query, "results": results, "elapsed_ms": round(elapsed, 2)}
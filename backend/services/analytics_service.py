@@ -0,0 +1,323 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+# Admin dashboard analytics, read from the daily_stats rollups (see
+# services.daily_stats) rather than the raw users and orders. The rollups
+# hold one document per day and bucket, so the dashboard cost depends on
+# the number of days and assets, not the number of orders. The pending KYC
+# and wallet counts are live work-queue sizes and stay indexed counts.
+
+DAILY_ORDER_DAYS = 7
+NEW_USER_DAYS = 7
+
+# The trading desk reads charts in its own timezone
+ANALYTICS_TIMEZONE = os.getenv('ANALYTICS_TIMEZONE', 'Asia/Kolkata')
+
+TIMESERIES_GRANULARITIES = ("hour", "day", "week", "month")
+TIMESERIES_GROUPS = ("asset", "order_type")
+TIMESERIES_DEFAULT_DAYS = 30
+# Longer ranges are better served by a coarser granularity
+MAX_TIMESERIES_BUCKETS = 2000
+
+async def _user_stats(database, week_start: datetime) -> Dict:
+    rows = await database.daily_stats.aggregate([
+        {"$match": {"metric": "users"}},
+        {"$group": {
+            "_id": {"role": "$role", "kyc_status": "$kyc_status"},
+            "count": {"$sum": "$count"},
+            "new_this_week": {"$sum": {"$cond": [{"$gte": ["$date", week_start]}, "$count", 0]}}
+        }}
+    ]).to_list(None)
+    clients = [row for row in rows if row["_id"].get("role") == "user"]
+    kyc_status = {}
+    for row in rows:
+        status = row["_id"].get("kyc_status")
+        kyc_status[status] = kyc_status.get(status, 0) + row["count"]
+    return {
+        "total": sum(row["count"] for row in clients),
+        "verified": sum(row["count"] for row in clients if row["_id"].get("kyc_status") == "approved"),
+        "new_this_week": sum(row["new_this_week"] for row in clients),
+        "kyc_status": kyc_status
+    }
+
+async def _order_stats(database, first_day: datetime) -> Dict:
+    result = await database.daily_stats.aggregate([
+        {"$match": {"metric": "orders"}},
+        {"$facet": {
+            "by_status": [
+                {"$group": {"_id": "$status", "count": {"$sum": "$count"}}}
+            ],
+            "completed": [
+                {"$match": {"status": "completed", "count": {"$gt": 0}}},
+                {"$group": {
+                    "_id": {"asset": "$asset", "order_type": "$order_type"},
+                    "count": {"$sum": "$count"},
+                    "volume": {"$sum": "$volume"},
+                    "first_seen": {"$min": "$date"}
+                }},
+                {"$sort": {"first_seen": 1, "_id.asset": 1}}
+            ],
+            "daily": [
+                {"$match": {"date": {"$gte": first_day}}},
+                {"$group": {
+                    "_id": "$date",
+                    "count": {"$sum": "$count"},
+                    "volume": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, "$volume", 0]}}
+                }}
+            ]
+        }}
+    ]).to_list(1)
+    return result[0]
+
+async def get_rm_book_stats(rm_id: str, days: int = DAILY_ORDER_DAYS, database=db, now: Optional[datetime] = None) -> Dict:
+    """Order counts and volumes for one relationship manager's clients, from the rm_orders rollups"""
+    now = now or datetime.utcnow()
+    first_day = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    
+    result, clients = await asyncio.gather(
+        database.daily_stats.aggregate([
+            {"$match": {"metric": "rm_orders", "rm_id": rm_id}},
+            {"$facet": {
+                "by_status": [
+                    {"$group": {"_id": "$status", "count": {"$sum": "$count"}, "volume": {"$sum": "$volume"}}}
+                ],
+                "by_asset": [
+                    {"$match": {"status": "completed", "count": {"$gt": 0}}},
+                    {"$group": {
+                        "_id": {"asset": "$asset", "order_type": "$order_type"},
+                        "count": {"$sum": "$count"},
+                        "volume": {"$sum": "$volume"}
+                    }},
+                    {"$sort": {"volume": -1}}
+                ],
+                "daily": [
+                    {"$match": {"date": {"$gte": first_day}}},
+                    {"$group": {
+                        "_id": "$date",
+                        "count": {"$sum": "$count"},
+                        "volume": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, "$volume", 0]}}
+                    }}
+                ]
+            }}
+        ]).to_list(1),
+        database.users.count_documents({"rm_id": rm_id, "role": "user"})
+    )
+    orders = result[0]
+    status_counts = {row["_id"]: row for row in orders["by_status"]}
+    completed = status_counts.get("completed", {})
+    days_seen = {row["_id"]: row for row in orders["daily"]}
+    
+    daily = []
+    for i in range(days):
+        start = first_day + timedelta(days=i)
+        day = days_seen.get(start, {})
+        daily.append({"date": start.strftime("%Y-%m-%d"), "count": day.get("count", 0), "volume": day.get("volume", 0)})
+    
+    return {
+        "rm_id": rm_id,
+        "clients": clients,
+        "total_orders": sum(row["count"] for row in status_counts.values()),
+        "completed_orders": completed.get("count", 0),
+        "completed_volume": completed.get("volume", 0),
+        "orders_by_status": {status: row["count"] for status, row in status_counts.items()},
+        "volume_by_asset": [
+            {"asset": row["_id"]["asset"], "order_type": row["_id"].get("order_type"), "count": row["count"], "volume": row["volume"]}
+            for row in orders["by_asset"]
+        ],
+        "daily_orders": daily
+    }
+
+async def get_dashboard_analytics(database=db, now: Optional[datetime] = None) -> Dict:
+    """The /admin/analytics payload"""
+    now = now or datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = today - timedelta(days=DAILY_ORDER_DAYS - 1)
+    
+    users, orders, pending_kyc, pending_wallets = await asyncio.gather(
+        _user_stats(database, today - timedelta(days=NEW_USER_DAYS - 1)),
+        _order_stats(database, first_day),
+        database.kyc_documents.count_documents({"status": {"$in": ["pending", "under_review"]}}),
+        database.saved_wallets.count_documents({"verification_status": "pending"})
+    )
+    
+    status_counts = {row["_id"]: row["count"] for row in orders["by_status"]}
+    days = {row["_id"]: row for row in orders["daily"]}
+    
+    total_buy_volume = 0
+    total_sell_volume = 0
+    asset_breakdown = {}
+    for row in orders["completed"]:
+        asset, order_type = row["_id"]["asset"], row["_id"].get("order_type")
+        if order_type == "buy":
+            total_buy_volume += row["volume"]
+        elif order_type == "sell":
+            total_sell_volume += row["volume"]
+        breakdown = asset_breakdown.setdefault(asset, {"count": 0, "volume": 0})
+        breakdown["count"] += row["count"]
+        breakdown["volume"] += row["volume"]
+    
+    daily_orders = []
+    for i in range(DAILY_ORDER_DAYS):
+        start = first_day + timedelta(days=i)
+        day = days.get(start, {})
+        daily_orders.append({
+            "date": start.strftime("%Y-%m-%d"),
+            "day": start.strftime("%a"),
+            "count": day.get("count", 0),
+            "volume": day.get("volume", 0)
+        })
+    
+    kyc_status = users["kyc_status"]
+    return {
+        "overview": {
+            "total_users": users["total"],
+            "verified_users": users["verified"],
+            "pending_kyc": pending_kyc,
+            "total_orders": sum(status_counts.values()),
+            "completed_orders": status_counts.get("completed", 0),
+            "pending_orders": status_counts.get("awaiting_payment", 0) + status_counts.get("processing", 0),
+            "pending_wallets": pending_wallets,
+            "new_users_this_week": users["new_this_week"]
+        },
+        "volume": {
+            "total_buy_volume": total_buy_volume,
+            "total_sell_volume": total_sell_volume,
+            "total_volume": total_buy_volume + total_sell_volume
+        },
+        "charts": {
+            "asset_breakdown": [
+                {"asset": k, "count": v["count"], "volume": v["volume"]}
+                for k, v in asset_breakdown.items()
+            ],
+            "daily_orders": daily_orders,
+            "kyc_status": {
+                "approved": kyc_status.get("approved", 0),
+                "pending": kyc_status.get("pending", 0),
+                "rejected": kyc_status.get("rejected", 0),
+                "under_review": kyc_status.get("under_review", 0)
+            }
+        }
+    }
+
+def _zone(tz: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {tz}")
+
+def _local(moment: datetime, zone: ZoneInfo) -> datetime:
+    """A wall-clock time in zone; naive input is taken to already be in zone"""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(zone).replace(tzinfo=None)
+
+def _utc(local: datetime, zone: ZoneInfo) -> datetime:
+    return local.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+def _truncate(local: datetime, granularity: str) -> datetime:
+    """Local bucket start, matching $dateTrunc (weeks start on Monday)"""
+    if granularity == "hour":
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def _next_bucket(local: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return local + timedelta(hours=1)
+    if granularity == "day":
+        return local + timedelta(days=1)
+    if granularity == "week":
+        return local + timedelta(weeks=1)
+    return local.replace(year=local.year + local.month // 12, month=local.month % 12 + 1)
+
+def _bucket_starts(start: datetime, end: datetime, granularity: str) -> List[datetime]:
+    buckets = []
+    bucket = _truncate(start, granularity)
+    while bucket < end:
+        buckets.append(bucket)
+        if len(buckets) > MAX_TIMESERIES_BUCKETS:
+            raise ValueError(f"Range spans more than {MAX_TIMESERIES_BUCKETS} {granularity} buckets; use a coarser granularity")
+        bucket = _next_bucket(bucket, granularity)
+    return buckets
+
+async def get_order_timeseries(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "day",
+    tz: str = ANALYTICS_TIMEZONE,
+    group_by: Optional[str] = None,
+    database=db
+) -> Dict:
+    """
+    Order count and volume per time bucket, bucketed in tz, as chart series.
+    
+    Naive start/end are read as wall-clock times in tz; the range defaults
+    to the last TIMESERIES_DEFAULT_DAYS days. Every bucket in the range is
+    present in every series, zero-filled. Raises ValueError for an unknown
+    timezone, an empty range or too many buckets.
+    """
+    zone = _zone(tz)
+    end_local = _local(end, zone) if end else _local(datetime.now(timezone.utc), zone)
+    start_local = _local(start, zone) if start else end_local - timedelta(days=TIMESERIES_DEFAULT_DAYS)
+    if start_local >= end_local:
+        raise ValueError("from must be before to")
+    buckets = _bucket_starts(start_local, end_local, granularity)
+    positions = {_utc(bucket, zone): i for i, bucket in enumerate(buckets)}
+    
+    truncate = {"date": "$created_at", "unit": granularity, "timezone": tz}
+    if granularity == "week":
+        truncate["startOfWeek"] = "monday"
+    group_id = {"bucket": {"$dateTrunc": truncate}}
+    if group_by:
+        group_id["key"] = {"$ifNull": [f"${group_by}", "Unknown"]}
+    
+    # One pass over the created_at index range; buckets come back as the
+    # UTC instant of each local bucket start
+    rows = await database.orders.aggregate([
+        {"$match": {"created_at": {"$gte": _utc(start_local, zone), "$lt": _utc(end_local, zone)}}},
+        {"$group": {
+            "_id": group_id,
+            "count": {"$sum": 1},
+            "volume": {"$sum": "$total_inr"},
+            "completed_volume": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, "$total_inr", 0]}}
+        }}
+    ]).to_list(None)
+    
+    metrics = ("count", "volume", "completed_volume")
+    series: Dict[str, Dict] = {}
+    for row in rows:
+        position = positions.get(row["_id"]["bucket"])
+        if position is None:
+            continue
+        key = row["_id"].get("key", "all")
+        line = series.setdefault(key, {"key": key, **{metric: [0] * len(buckets) for metric in metrics}})
+        for metric in metrics:
+            line[metric][position] += row[metric]
+    
+    lines = sorted(series.values(), key=lambda line: -sum(line["volume"]))
+    for line in lines:
+        line["volume"] = [round(value, 2) for value in line["volume"]]
+        line["completed_volume"] = [round(value, 2) for value in line["completed_volume"]]
+    
+    return {
+        "from": start_local.replace(tzinfo=zone),
+        "to": end_local.replace(tzinfo=zone),
+        "granularity": granularity,
+        "tz": tz,
+        "group_by": group_by,
+        "buckets": [bucket.replace(tzinfo=zone) for bucket in buckets],
+        "series": lines,
+        "totals": {metric: round(sum(sum(line[metric]) for line in lines), 2) for metric in metrics}
+    }
@@ -0,0 +1,184 @@
+import base64
+import binascii
+import hashlib
+import logging
+import re
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed blob store on GridFS: each blob is stored once under its
+# SHA-256 hex digest and split into BLOB_CHUNK_SIZE chunks, so reads can be
+# streamed chunk by chunk instead of loading whole images into documents.
+# Holds KYC images as well as wallet and payment proofs.
+BLOB_BUCKET = "blobs"
+BLOB_CHUNK_SIZE = 255 * 1024
+
+# Clients refer to an uploaded blob in JSON bodies as "blob:<sha256>"
+BLOB_REFERENCE_PREFIX = "blob:"
+
+class BlobTooLarge(ValueError):
+    pass
+
+bucket = AsyncIOMotorGridFSBucket(db, bucket_name=BLOB_BUCKET, chunk_size_bytes=BLOB_CHUNK_SIZE)
+blob_files = db[f"{BLOB_BUCKET}.files"]
+blob_chunks = db[f"{BLOB_BUCKET}.chunks"]
+
+_DATA_URL = re.compile(r"^data:(?P<type>[\w.+-]+/[\w.+-]+)?(;[\w-]+=[\w.-]+)*;base64,", re.IGNORECASE)
+
+def decode_data_url(value: str) -> Tuple[bytes, str]:
+    """Decode a data URL (or bare base64 string) into (bytes, content type)"""
+    content_type = "application/octet-stream"
+    match = _DATA_URL.match(value)
+    if match:
+        content_type = match.group("type") or content_type
+        value = value[match.end():]
+    try:
+        return base64.b64decode(value, validate=True), content_type
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid base64 image data")
+
+def to_data_url(data: bytes, content_type: str) -> str:
+    return f"data:{content_type};base64,{base64.b64encode(data).decode()}"
+
+def blob_ref(sha256: str, size: int, content_type: str) -> Dict:
+    """What a referencing document stores instead of the bytes"""
+    return {"sha256": sha256, "size": size, "content_type": content_type}
+
+async def blob_exists(sha256: str) -> bool:
+    return await blob_files.find_one({"filename": sha256}, {"_id": 1}) is not None
+
+async def put_bytes(data: bytes, content_type: str) -> Dict:
+    """Store bytes once per distinct content and return their reference"""
+    sha256 = hashlib.sha256(data).hexdigest()
+    if not await blob_exists(sha256):
+        await bucket.upload_from_stream(
+            sha256, data, metadata={"content_type": content_type, "sha256": sha256}
+        )
+    return blob_ref(sha256, len(data), content_type)
+
+async def add_blob_owner(sha256: str, owner_id: str):
+    """Record that a user uploaded this content, allowing them to reference it"""
+    await blob_files.update_many({"filename": sha256}, {"$addToSet": {"metadata.owners": owner_id}})
+
+def _reference_queries(sha256: str) -> List[Tuple[str, Dict]]:
+    """Where wallet and payment proofs reference blobs (KYC callers add their own)"""
+    return [
+        ("saved_wallets", {"proof_document.sha256": sha256}),
+        ("orders", {"payment_proof_document.sha256": sha256}),
+    ]
+
+async def release_blob(sha256: str, owner_id: Optional[str] = None, references: List[Tuple[str, Dict]] = ()) -> bool:
+    """
+    Drop a blob the caller no longer needs (e.g. a raw upload replaced by
+    its re-encoded copy). Content is shared, so it is only deleted when no
+    document references it and no other user has uploaded it; otherwise
+    only owner_id's claim is dropped. Returns whether the blob was deleted.
+    """
+    for collection, query in [*_reference_queries(sha256), *references]:
+        if await db[collection].find_one(query, {"_id": 1}):
+            return False
+    if owner_id:
+        await blob_files.update_many({"filename": sha256}, {"$pull": {"metadata.owners": owner_id}})
+    
+    # Conditional on still being unowned, so an upload of the same content
+    # that lands meanwhile keeps it
+    deleted = False
+    unowned = {"$or": [{"metadata.owners": {"$exists": False}}, {"metadata.owners": {"$size": 0}}]}
+    while True:
+        blob = await blob_files.find_one_and_delete({"filename": sha256, **unowned}, projection={"_id": 1})
+        if not blob:
+            return deleted
+        await blob_chunks.delete_many({"files_id": blob["_id"]})
+        deleted = True
+
+async def put_stream(chunks: AsyncIterator[bytes], content_type: str, max_bytes: Optional[int] = None) -> Dict:
+    """
+    Store a stream of chunks, hashing as it goes.
+    
+    The content is written under a temporary name and renamed to its digest
+    once complete (or dropped if that content is already stored), so memory
+    use is bounded by the chunk size rather than the blob size.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    grid_in = bucket.open_upload_stream(f"pending-{uuid.uuid4()}", metadata={"content_type": content_type})
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise BlobTooLarge(f"Upload exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            await grid_in.write(chunk)
+    except BaseException:
+        await grid_in.abort()
+        raise
+    await grid_in.close()
+    
+    sha256 = digest.hexdigest()
+    if await blob_exists(sha256):
+        await bucket.delete(grid_in._id)
+    else:
+        await blob_files.update_one(
+            {"_id": grid_in._id},
+            {"$set": {"filename": sha256, "metadata.sha256": sha256}}
+        )
+    return blob_ref(sha256, size, content_type)
+
+async def resolve_blob_reference(value: str, owner_id: str) -> Dict:
+    """Turn a "blob:<sha256>" string from a JSON body into a reference the user may use"""
+    sha256 = value[len(BLOB_REFERENCE_PREFIX):]
+    blob = await blob_files.find_one(
+        {"filename": sha256, "metadata.owners": owner_id},
+        {"length": 1, "metadata.content_type": 1}
+    )
+    if not blob:
+        raise HTTPException(status_code=400, detail="Unknown upload reference")
+    return blob_ref(sha256, blob["length"], blob.get("metadata", {}).get("content_type", "application/octet-stream"))
+
+def is_blob_reference(value) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REFERENCE_PREFIX)
+
+async def open_blob(sha256: str):
+    """GridOut for a blob (exposes .length and .metadata), or None if missing"""
+    try:
+        return await bucket.open_download_stream_by_name(sha256)
+    except NoFile:
+        return None
+
+async def iter_blob(grid_out) -> AsyncIterator[bytes]:
+    """Yield a blob chunk by chunk; memory is bounded by BLOB_CHUNK_SIZE"""
+    while True:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        yield chunk
+
+async def read_blob(sha256: str) -> Optional[bytes]:
+    grid_out = await open_blob(sha256)
+    if grid_out is None:
+        return None
+    return await grid_out.read()
+
+async def blob_response(ref: Dict) -> StreamingResponse:
+    """Stream a referenced blob to the client chunk by chunk"""
+    grid_out = await open_blob(ref["sha256"])
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Document data missing")
+    
+    return StreamingResponse(
+        iter_blob(grid_out),
+        media_type=ref.get("content_type", "application/octet-stream"),
+        headers={
+            "Content-Length": str(grid_out.length),
+            "ETag": f'"{ref["sha256"]}"',
+            "Cache-Control": "private, max-age=86400, immutable"
+        }
+    )
@@ -0,0 +1,308 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from core.database import db, INDEXES
+
+logger = logging.getLogger(__name__)
+
+# Daily rollups behind the admin dashboard. Each document counts one bucket:
+#   orders: (date, asset, order_type, status) -> count, volume (sum of total_inr)
+#   users:  (date, role, kyc_status)          -> count
+#   rm_orders: (rm_id, date, asset, order_type, status) -> count, volume
+# where date is the UTC day the order or user was created. rm_orders repeats
+# the order buckets per relationship manager for orders stamped with rm_id. Writers keep the
+# buckets current with $inc: creating an order or user adds to its bucket,
+# and a status change moves the record from the old bucket to the new one on
+# the same day. The _id encodes the bucket key, so an upsert of a bucket that
+# does not exist yet cannot race into a duplicate.
+daily_stats = db.daily_stats
+
+REBUILD_COLLECTION = "daily_stats_rebuild"
+
+# Marker documents (metric "meta", ignored by the dashboard queries): BUILT
+# is written by every rebuild, and BUILD_CLAIM lets one process at a time
+# run the first build on startup. A claim older than REBUILD_CLAIM_MINUTES
+# was left by a crashed process and may be taken over.
+BUILT_MARKER = "meta|built"
+BUILD_CLAIM = "meta|building"
+REBUILD_CLAIM_MINUTES = 60
+
+def _value(value) -> str:
+    return getattr(value, "value", value)
+
+def _day(moment: Optional[datetime]) -> datetime:
+    moment = moment or datetime.utcnow()
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _order_bucket(order: Dict, status) -> Dict:
+    bucket = {
+        "metric": "orders",
+        "date": _day(order.get("created_at")),
+        "asset": order.get("asset") or "Unknown",
+        "order_type": _value(order.get("order_type")),
+        "status": _value(status)
+    }
+    bucket["_id"] = f"orders|{bucket['date']:%Y-%m-%d}|{bucket['asset']}|{bucket['order_type']}|{bucket['status']}"
+    return bucket
+
+def _rm_order_bucket(order: Dict, status) -> Dict:
+    bucket = _order_bucket(order, status)
+    bucket["metric"] = "rm_orders"
+    bucket["rm_id"] = order["rm_id"]
+    bucket["_id"] = f"rm_orders|{order['rm_id']}|{bucket['_id'].split('|', 1)[1]}"
+    return bucket
+
+def _user_bucket(user: Dict, kyc_status) -> Dict:
+    bucket = {
+        "metric": "users",
+        "date": _day(user.get("created_at")),
+        "role": _value(user.get("role")),
+        "kyc_status": _value(kyc_status)
+    }
+    bucket["_id"] = f"users|{bucket['date']:%Y-%m-%d}|{bucket['role']}|{bucket['kyc_status']}"
+    return bucket
+
+async def _increment(bucket: Dict, counters: Dict, session=None):
+    await daily_stats.update_one(
+        {"_id": bucket["_id"]},
+        {"$inc": counters, "$setOnInsert": {k: v for k, v in bucket.items() if k != "_id"}},
+        upsert=True,
+        session=session
+    )
+
+async def record_order_created(order: Dict, session=None):
+    counters = {"count": 1, "volume": order.get("total_inr", 0)}
+    await _increment(_order_bucket(order, order.get("status")), counters, session)
+    if order.get("rm_id"):
+        await _increment(_rm_order_bucket(order, order.get("status")), counters, session)
+
+async def record_order_status_change(order: Dict, old_status, new_status, session=None):
+    """Move an order between status buckets; `order` is the document before the change"""
+    if _value(old_status) == _value(new_status):
+        return
+    volume = order.get("total_inr", 0)
+    buckets = [_order_bucket] + ([_rm_order_bucket] if order.get("rm_id") else [])
+    for bucket in buckets:
+        await _increment(bucket(order, old_status), {"count": -1, "volume": -volume}, session)
+        await _increment(bucket(order, new_status), {"count": 1, "volume": volume}, session)
+
+async def move_rm_orders(user_id: str, old_rm_id: Optional[str], new_rm_id: Optional[str], session=None):
+    """
+    Move a client's rm_orders buckets from one RM's book to another's. Call
+    after re-stamping the client's orders with new_rm_id, in the same session.
+    """
+    if old_rm_id == new_rm_id:
+        return
+    rows = await db.orders.aggregate([
+        {"$match": {"user_id": user_id, "created_at": {"$type": "date"}}},
+        {"$group": {
+            "_id": {
+                "created_at": {"$dateTrunc": {"date": "$created_at", "unit": "day", "timezone": "UTC"}},
+                "asset": "$asset",
+                "order_type": "$order_type",
+                "status": "$status"
+            },
+            "count": {"$sum": 1},
+            "volume": {"$sum": "$total_inr"}
+        }}
+    ], session=session).to_list(None)
+    
+    operations = []
+    for row in rows:
+        for rm_id, sign in ((old_rm_id, -1), (new_rm_id, 1)):
+            if not rm_id:
+                continue
+            bucket = _rm_order_bucket({**row["_id"], "rm_id": rm_id}, row["_id"]["status"])
+            operations.append(UpdateOne(
+                {"_id": bucket["_id"]},
+                {
+                    "$inc": {"count": sign * row["count"], "volume": sign * row["volume"]},
+                    "$setOnInsert": {k: v for k, v in bucket.items() if k != "_id"}
+                },
+                upsert=True
+            ))
+    if operations:
+        await daily_stats.bulk_write(operations, ordered=False, session=session)
+
+async def record_user_registered(user: Dict, session=None):
+    await _increment(_user_bucket(user, user.get("kyc_status")), {"count": 1}, session)
+
+async def record_kyc_status_change(user: Dict, old_status, new_status, session=None):
+    """Move a user between KYC status buckets; `user` needs role and created_at"""
+    if _value(old_status) == _value(new_status):
+        return
+    await _increment(_user_bucket(user, old_status), {"count": -1}, session)
+    await _increment(_user_bucket(user, new_status), {"count": 1}, session)
+
+async def record_kyc_status_changes(changes: List[Tuple[Dict, str, str]], session=None):
+    """record_kyc_status_change for many (user, old_status, new_status) at once, in one bulk write"""
+    buckets, counts = {}, {}
+    for user, old_status, new_status in changes:
+        if _value(old_status) == _value(new_status):
+            continue
+        for status, delta in ((old_status, -1), (new_status, 1)):
+            bucket = _user_bucket(user, status)
+            buckets[bucket["_id"]] = bucket
+            counts[bucket["_id"]] = counts.get(bucket["_id"], 0) + delta
+    operations = [
+        UpdateOne(
+            {"_id": key},
+            {"$inc": {"count": count}, "$setOnInsert": {k: v for k, v in buckets[key].items() if k != "_id"}},
+            upsert=True
+        )
+        for key, count in counts.items() if count
+    ]
+    if operations:
+        await daily_stats.bulk_write(operations, ordered=False, session=session)
+
+def _id_part(field: str) -> Dict:
+    # A null or missing value would make the whole $concat null; the Python
+    # helpers format it as "None", so the rebuild must too
+    return {"$ifNull": [{"$toString": f"$_id.{field}"}, "None"]}
+
+def _bucket_id(prefix: str, fields: List[str], leading: Optional[str] = None) -> Dict:
+    """The aggregation counterpart of the _id built by the _*_bucket helpers"""
+    parts = [f"{prefix}|"]
+    if leading:
+        parts += [_id_part(leading), "|"]
+    parts.append({"$dateToString": {"date": "$_id.date", "format": "%Y-%m-%d"}})
+    for field in fields:
+        parts += ["|", _id_part(field)]
+    return {"$concat": parts}
+
+async def rebuild_daily_stats(database=db) -> int:
+    """
+    Recompute every rollup from the raw orders and users collections.
+    
+    The buckets are built in a scratch collection and swapped in with a
+    rename, so the dashboard never sees a partial rebuild. Writes made while
+    the rebuild runs may be missed; run it when order and KYC traffic is quiet.
+    """
+    day = {"$dateTrunc": {"date": "$created_at", "unit": "day", "timezone": "UTC"}}
+    await database[REBUILD_COLLECTION].drop()
+    
+    await database.orders.aggregate([
+        {"$match": {"created_at": {"$type": "date"}}},
+        {"$group": {
+            "_id": {
+                "date": day,
+                "asset": {"$ifNull": ["$asset", "Unknown"]},
+                "order_type": "$order_type",
+                "status": "$status"
+            },
+            "count": {"$sum": 1},
+            "volume": {"$sum": "$total_inr"}
+        }},
+        {"$project": {
+            "_id": _bucket_id("orders", ["asset", "order_type", "status"]),
+            "metric": "orders",
+            "date": "$_id.date",
+            "asset": "$_id.asset",
+            "order_type": "$_id.order_type",
+            "status": "$_id.status",
+            "count": 1,
+            "volume": 1
+        }},
+        {"$out": REBUILD_COLLECTION}
+    ]).to_list(None)
+    
+    await database.users.aggregate([
+        {"$match": {"created_at": {"$type": "date"}}},
+        {"$group": {
+            "_id": {
+                "date": day,
+                "role": "$role",
+                "kyc_status": "$kyc_status"
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": _bucket_id("users", ["role", "kyc_status"]),
+            "metric": "users",
+            "date": "$_id.date",
+            "role": "$_id.role",
+            "kyc_status": "$_id.kyc_status",
+            "count": 1
+        }},
+        {"$merge": {"into": REBUILD_COLLECTION, "whenMatched": "replace"}}
+    ]).to_list(None)
+    
+    await database.orders.aggregate([
+        {"$match": {"created_at": {"$type": "date"}, "rm_id": {"$type": "string"}}},
+        {"$group": {
+            "_id": {
+                "rm_id": "$rm_id",
+                "date": day,
+                "asset": {"$ifNull": ["$asset", "Unknown"]},
+                "order_type": "$order_type",
+                "status": "$status"
+            },
+            "count": {"$sum": 1},
+            "volume": {"$sum": "$total_inr"}
+        }},
+        {"$project": {
+            "_id": _bucket_id("rm_orders", ["asset", "order_type", "status"], leading="rm_id"),
+            "metric": "rm_orders",
+            "rm_id": "$_id.rm_id",
+            "date": "$_id.date",
+            "asset": "$_id.asset",
+            "order_type": "$_id.order_type",
+            "status": "$_id.status",
+            "count": 1,
+            "volume": 1
+        }},
+        {"$merge": {"into": REBUILD_COLLECTION, "whenMatched": "replace"}}
+    ]).to_list(None)
+    
+    rebuilt = database[REBUILD_COLLECTION]
+    await rebuilt.insert_one({"_id": BUILT_MARKER, "metric": "meta", "built_at": datetime.utcnow()})
+    for collection, keys, options in INDEXES:
+        if collection == daily_stats.name:
+            await rebuilt.create_index(keys, **options)
+    buckets = await rebuilt.count_documents({"metric": {"$ne": "meta"}})
+    await rebuilt.rename(daily_stats.name, dropTarget=True)
+    
+    logger.info(f"Rebuilt {buckets} daily_stats buckets")
+    return buckets
+
+async def ensure_daily_stats(database=db) -> bool:
+    """
+    Build the rollups if they have never been built (e.g. the first start
+    after upgrading an existing deployment), so the dashboard does not show
+    zeros and status changes do not decrement unseeded buckets. Returns
+    whether this call ran the build.
+    """
+    stats = database[daily_stats.name]
+    if await stats.find_one({"_id": BUILT_MARKER}, {"_id": 1}):
+        return False
+    
+    now = datetime.utcnow()
+    try:
+        await stats.insert_one({"_id": BUILD_CLAIM, "metric": "meta", "started_at": now})
+    except DuplicateKeyError:
+        # Another process is building; only take over an abandoned claim
+        taken = await stats.find_one_and_update(
+            {"_id": BUILD_CLAIM, "started_at": {"$lt": now - timedelta(minutes=REBUILD_CLAIM_MINUTES)}},
+            {"$set": {"started_at": now}}
+        )
+        if not taken:
+            return False
+    
+    logger.info("daily_stats rollups not built yet; rebuilding from orders and users")
+    # The rebuilt collection replaces daily_stats, claim included
+    try:
+        await rebuild_daily_stats(database)
+    except Exception as e:
+        logger.error(f"Failed to build daily_stats rollups: {e}")
+        await stats.delete_one({"_id": BUILD_CLAIM})
+        return False
+    return True
+
+if __name__ == "__main__":
+    # Backfill or repair: python -m services.daily_stats
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(rebuild_daily_stats())
@@ -0,0 +1,168 @@
+import os
+import hmac
+import asyncio
+import hashlib
+import logging
+import re
+from typing import Dict, List, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from core.config import SECRET_KEY
+from core.database import db, ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+# Keyed fingerprints of KYC identity numbers. Each number is normalized and
+# HMAC-SHA256'd under IDENTITY_HASH_KEY, and the digests are stored on the
+# KYC document under "fingerprints". Duplicate checks and the collisions
+# report then use indexed equality lookups on the digests, so raw numbers are
+# never scanned or returned. PAN and Aadhaar fingerprints are unique across
+# KYC documents; a bank account may legitimately be shared (joint or company
+# accounts), so bank collisions are reported rather than rejected.
+#
+# The same digests are also kept under "collision_fingerprints", which has no
+# unique index. Lookups and the report use that copy, so documents that
+# already shared a number before the unique indexes existed (and so cannot
+# hold "fingerprints") are still found and listed.
+IDENTITY_HASH_KEY = os.getenv('IDENTITY_HASH_KEY', SECRET_KEY)
+
+UNIQUE_FINGERPRINTS = ("pan", "aadhaar")
+FINGERPRINT_KINDS = ("pan", "aadhaar", "bank")
+
+FINGERPRINT_LABELS = {"pan": "PAN", "aadhaar": "Aadhaar number", "bank": "bank account"}
+
+def _alphanumeric(value: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]", "", value or "").upper()
+
+def fingerprint(kind: str, value: str) -> str:
+    message = f"{kind}:{value}".encode()
+    return hmac.new(IDENTITY_HASH_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+def kyc_fingerprints(fields: Dict) -> Dict[str, str]:
+    """Fingerprints of the identity numbers present in a KYC field dict"""
+    fingerprints = {}
+    pan = _alphanumeric(fields.get("pan_number"))
+    if pan:
+        fingerprints["pan"] = fingerprint("pan", pan)
+    aadhaar = re.sub(r"\D", "", fields.get("aadhaar_number") or "")
+    if aadhaar:
+        fingerprints["aadhaar"] = fingerprint("aadhaar", aadhaar)
+    account = _alphanumeric(fields.get("bank_account_number"))
+    if account:
+        # Account numbers are only unique within a bank (first 4 IFSC characters)
+        bank_code = _alphanumeric(fields.get("bank_ifsc"))[:4]
+        fingerprints["bank"] = fingerprint("bank", f"{bank_code}:{account}")
+    return fingerprints
+
+async def find_collisions(fingerprints: Dict[str, str], user_id: str) -> Dict[str, List[Dict]]:
+    """Other users' KYC documents sharing any of these fingerprints, by kind"""
+    async def lookup(kind, value):
+        return await db.kyc_documents.find(
+            {f"collision_fingerprints.{kind}": value, "user_id": {"$ne": user_id}},
+            {"_id": 0, "id": 1, "user_id": 1, "status": 1}
+        ).to_list(100)
+    
+    kinds = list(fingerprints)
+    results = await asyncio.gather(*[lookup(kind, fingerprints[kind]) for kind in kinds])
+    return {kind: docs for kind, docs in zip(kinds, results) if docs}
+
+async def collision_report() -> List[Dict]:
+    """Every fingerprint shared by more than one KYC document"""
+    report = []
+    for kind in FINGERPRINT_KINDS:
+        field = f"$collision_fingerprints.{kind}"
+        groups = await db.kyc_documents.aggregate([
+            {"$match": {f"collision_fingerprints.{kind}": {"$type": "string"}}},
+            {"$group": {
+                "_id": field,
+                "count": {"$sum": 1},
+                "kyc_documents": {"$push": {"kyc_id": "$id", "user_id": "$user_id", "status": "$status"}}
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$sort": {"count": -1}}
+        ]).to_list(None)
+        for group in groups:
+            report.append({
+                "kind": kind,
+                # A short prefix identifies the group without exposing a usable digest
+                "fingerprint": group["_id"][:12],
+                "count": group["count"],
+                "kyc_documents": group["kyc_documents"]
+            })
+    
+    user_ids = list({doc["user_id"] for entry in report for doc in entry["kyc_documents"]})
+    users = await db.users.find(
+        {"id": {"$in": user_ids}}, {"_id": 0, "id": 1, "email": 1, "client_uid": 1}
+    ).to_list(len(user_ids))
+    user_map = {u["id"]: u for u in users}
+    for entry in report:
+        for doc in entry["kyc_documents"]:
+            user = user_map.get(doc["user_id"], {})
+            doc["user_email"] = user.get("email")
+            doc["client_uid"] = user.get("client_uid")
+    return report
+
+async def _apply(batch: List[Tuple[str, Dict]], duplicates: List[str]) -> int:
+    """Fingerprint one batch of (kyc id, fingerprints); documents that would duplicate another's PAN/Aadhaar are recorded"""
+    try:
+        result = await db.kyc_documents.bulk_write([
+            UpdateOne({"id": kyc_id}, {"$set": {"fingerprints": prints, "collision_fingerprints": prints}})
+            for kyc_id, prints in batch
+        ], ordered=False)
+        return result.modified_count
+    except BulkWriteError as e:
+        failed = []
+        for error in e.details.get("writeErrors", []):
+            if error.get("code") != 11000:
+                raise
+            failed.append(batch[error["index"]])
+        duplicates += [kyc_id for kyc_id, _ in failed]
+        
+        # Without "fingerprints" these still need the report copy
+        await db.kyc_documents.bulk_write([
+            UpdateOne({"id": kyc_id}, {"$set": {"collision_fingerprints": prints}})
+            for kyc_id, prints in failed
+        ], ordered=False)
+        return e.details.get("nModified", 0)
+
+async def backfill_fingerprints(batch_size: int = 500) -> Dict:
+    """
+    Fingerprint existing KYC documents.
+    
+    The unique indexes are built first, so a document sharing a PAN or
+    Aadhaar number with an earlier one gets only its collision_fingerprints;
+    those are returned under "duplicates" and listed by the collisions report.
+    """
+    await ensure_indexes()
+    
+    projection = {"_id": 0, "id": 1, "pan_number": 1, "aadhaar_number": 1, "bank_account_number": 1, "bank_ifsc": 1}
+    last_id = ""
+    updated = 0
+    duplicates: List[str] = []
+    
+    while True:
+        batch = await db.kyc_documents.find(
+            {"id": {"$gt": last_id}}, projection
+        ).sort("id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["id"]
+        
+        updated += await _apply([(doc["id"], kyc_fingerprints(doc)) for doc in batch], duplicates)
+    
+    logger.info(f"Fingerprinted {updated} KYC documents")
+    if duplicates:
+        logger.warning(
+            f"{len(duplicates)} KYC documents share a PAN or Aadhaar number with another; "
+            f"see GET /api/admin/kyc/collisions: {duplicates[:100]}"
+        )
+    return {"updated": updated, "duplicates": duplicates}
+
+if __name__ == "__main__":
+    # One-off backfill: python -m services.identity_fingerprints
+    # Safe to run before or after the API has started: it builds the unique
+    # indexes itself, and documents that collide with them are skipped and
+    # listed by GET /api/admin/kyc/collisions.
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(backfill_fingerprints())
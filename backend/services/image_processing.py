@@ -0,0 +1,143 @@
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Try to import Pillow, fall back to storing images untouched if not available
+try:
+    from PIL import Image, ImageOps
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+    logger.warning("Pillow not installed. KYC images will be stored unprocessed.")
+
+# KYC image normalization: phone-camera uploads are decoded, rotated upright
+# from their EXIF orientation, stripped of all metadata (EXIF, GPS, ICC),
+# downscaled and re-encoded as JPEG, plus a small thumbnail for admin lists.
+# Decoding and encoding are CPU-bound, so they run in a process pool.
+IMAGE_MAX_DIMENSION = int(os.getenv("KYC_IMAGE_MAX_DIMENSION", 2000))
+IMAGE_QUALITY = int(os.getenv("KYC_IMAGE_QUALITY", 82))
+THUMBNAIL_DIMENSION = int(os.getenv("KYC_THUMBNAIL_DIMENSION", 320))
+THUMBNAIL_QUALITY = int(os.getenv("KYC_THUMBNAIL_QUALITY", 70))
+IMAGE_WORKERS = int(os.getenv("KYC_IMAGE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Refuse to decode anything larger than this (decompression bombs)
+MAX_IMAGE_PIXELS = 50_000_000
+
+PROCESSED_CONTENT_TYPE = "image/jpeg"
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _flatten(image):
+    """RGB copy of an image, with any transparency composited onto white"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+def _encode_jpeg(image, quality: int) -> bytes:
+    # No exif/icc_profile arguments: the output carries no metadata
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+def _dct_matrix(size: int):
+    k = np.arange(size).reshape(-1, 1)
+    n = np.arange(size).reshape(1, -1)
+    return np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+
+_DCT_32 = _dct_matrix(32) if PILLOW_AVAILABLE else None
+
+def perceptual_hash(image) -> int:
+    """
+    64-bit pHash: low-frequency DCT coefficients of a 32x32 greyscale copy,
+    each set when above the median. Re-encoding, rescaling and mild edits
+    change only a few bits, so reused scans stay within a small Hamming
+    distance of each other.
+    """
+    pixels = np.asarray(image.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    dct = _DCT_32 @ pixels @ _DCT_32.T
+    low = dct[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def phash_image(data: bytes) -> Optional[str]:
+    """Hex pHash of encoded image bytes, or None if they cannot be decoded. Runs in a worker process."""
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            source.draft("RGB", (256, 256))
+            image = _flatten(ImageOps.exif_transpose(source))
+    except (OSError, ValueError, Image.DecompressionBombError, SyntaxError):
+        return None
+    return f"{perceptual_hash(image):016x}"
+
+def process_image(data: bytes) -> Optional[Dict]:
+    """
+    Normalize one image. Runs in a worker process.
+    
+    Returns {"image", "thumbnail", "width", "height", "phash"} with JPEG
+    bytes and a hex perceptual hash, or
+    None if the data is not an image Pillow can decode (PDFs, HEIC without
+    a plugin, corrupt files), in which case the caller keeps the original.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            # Draft mode lets JPEG decode straight at a reduced scale
+            source.draft("RGB", (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+            image = _flatten(ImageOps.exif_transpose(source))
+    except (OSError, ValueError, Image.DecompressionBombError, SyntaxError):
+        return None
+    
+    image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+    thumbnail = image.copy()
+    thumbnail.thumbnail((THUMBNAIL_DIMENSION, THUMBNAIL_DIMENSION), Image.LANCZOS)
+    
+    return {
+        "image": _encode_jpeg(image, IMAGE_QUALITY),
+        "thumbnail": _encode_jpeg(thumbnail, THUMBNAIL_QUALITY),
+        "width": image.width,
+        "height": image.height,
+        "phash": f"{perceptual_hash(image):016x}"
+    }
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+async def _run_in_pool(function, data: bytes):
+    if not PILLOW_AVAILABLE:
+        return None
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), function, data)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        logger.error("Image worker pool crashed, skipping image processing")
+        shutdown_image_pool()
+        return None
+
+async def process_image_async(data: bytes) -> Optional[Dict]:
+    """process_image in the worker pool; None when Pillow is unavailable"""
+    return await _run_in_pool(process_image, data)
+
+async def phash_image_async(data: bytes) -> Optional[str]:
+    """phash_image in the worker pool; None when Pillow is unavailable"""
+    return await _run_in_pool(phash_image, data)
+
+def shutdown_image_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,245 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+
+from core.database import db
+from services.blob_store import read_blob
+from services.image_processing import phash_image_async
+
+logger = logging.getLogger(__name__)
+
+# Near-duplicate detection for KYC images. Every stored image gets a 64-bit
+# perceptual hash (see image_processing.perceptual_hash), recorded in
+# kyc_image_hashes. Lookups go through an in-memory multi-index hash: the
+# 64 bits are split into 4 segments of 16 bits, and by the pigeonhole
+# principle any hash within distance r of the query matches it to within
+# r // 4 bits on at least one segment. Each segment is kept as a sorted
+# array, so a search is a few hundred binary searches plus an exact
+# Hamming check of the candidates, independent of corpus size.
+PHASH_MATCH_DISTANCE = int(os.getenv('PHASH_MATCH_DISTANCE', 8))
+
+SEGMENTS = 4
+SEGMENT_BITS = 64 // SEGMENTS
+SEGMENT_MASK = (1 << SEGMENT_BITS) - 1
+
+# New hashes wait in a small unsorted buffer until it is merged in
+REBUILD_THRESHOLD = 5000
+LOAD_BATCH_SIZE = 10000
+
+# Entries written by other workers are picked up on the next search; the
+# overlap covers clock skew and inserts committed out of order.
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+image_hashes = db.kyc_image_hashes
+
+def hamming_distances(hashes: np.ndarray, query: int) -> np.ndarray:
+    xor = np.bitwise_xor(hashes, np.uint64(query))
+    return _POPCOUNT8[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def _flip_masks(max_bits: int) -> np.ndarray:
+    """All SEGMENT_BITS-bit values with at most max_bits bits set"""
+    values = np.arange(1 << SEGMENT_BITS, dtype=np.uint32)
+    counts = _POPCOUNT8[values & 0xFF] + _POPCOUNT8[values >> 8]
+    return values[counts <= max_bits]
+
+class PerceptualHashIndex:
+    def __init__(self):
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._segment_values: List[np.ndarray] = []
+        self._segment_order: List[np.ndarray] = []
+        self._pending: set = set()
+        self._watermark: Optional[datetime] = None
+        self._masks: Dict[int, np.ndarray] = {}
+        self._lock = asyncio.Lock()
+        self._build(self._hashes)
+    
+    def __len__(self):
+        return len(self._hashes) + len(self._pending)
+    
+    def _build(self, hashes: np.ndarray):
+        self._hashes = hashes
+        self._segment_values, self._segment_order = [], []
+        for k in range(SEGMENTS):
+            segment = ((hashes >> np.uint64(k * SEGMENT_BITS)) & np.uint64(SEGMENT_MASK)).astype(np.uint16)
+            order = np.argsort(segment, kind="stable")
+            self._segment_values.append(segment[order])
+            self._segment_order.append(order.astype(np.int64))
+    
+    def _merge_pending(self):
+        merged = np.union1d(self._hashes, np.fromiter(self._pending, dtype=np.uint64, count=len(self._pending)))
+        self._pending = set()
+        self._build(merged)
+    
+    def __contains__(self, phash: int) -> bool:
+        position = np.searchsorted(self._hashes, np.uint64(phash))
+        return phash in self._pending or (position < len(self._hashes) and int(self._hashes[position]) == phash)
+    
+    def add(self, phash: int):
+        if phash in self:
+            return
+        self._pending.add(phash)
+        if len(self._pending) >= REBUILD_THRESHOLD:
+            self._merge_pending()
+    
+    def search(self, phash: int, radius: int = PHASH_MATCH_DISTANCE) -> Dict[int, int]:
+        """{hash: distance} for every indexed hash within radius of phash"""
+        sub_radius = radius // SEGMENTS
+        if sub_radius not in self._masks:
+            self._masks[sub_radius] = _flip_masks(sub_radius)
+        masks = self._masks[sub_radius]
+        
+        candidates = []
+        for k in range(SEGMENTS):
+            variants = np.uint32((phash >> (k * SEGMENT_BITS)) & SEGMENT_MASK) ^ masks
+            values = self._segment_values[k]
+            starts = np.searchsorted(values, variants, side="left")
+            ends = np.searchsorted(values, variants, side="right")
+            for start, end in zip(starts[starts < ends], ends[starts < ends]):
+                candidates.append(self._segment_order[k][start:end])
+        
+        matches = {}
+        if candidates:
+            positions = np.unique(np.concatenate(candidates))
+            found = self._hashes[positions]
+            distances = hamming_distances(found, phash)
+            for value, distance in zip(found[distances <= radius], distances[distances <= radius]):
+                matches[int(value)] = int(distance)
+        
+        for value in self._pending:
+            distance = bin(value ^ phash).count("1")
+            if distance <= radius:
+                matches[value] = distance
+        return matches
+    
+    async def load(self):
+        """Build the index from kyc_image_hashes"""
+        async with self._lock:
+            started = datetime.utcnow()
+            chunks = []
+            cursor = image_hashes.find({}, {"_id": 0, "phash": 1}).batch_size(LOAD_BATCH_SIZE)
+            batch = []
+            async for entry in cursor:
+                batch.append(int(entry["phash"], 16))
+                if len(batch) >= LOAD_BATCH_SIZE:
+                    chunks.append(np.array(batch, dtype=np.uint64))
+                    batch = []
+            chunks.append(np.array(batch, dtype=np.uint64))
+            
+            hashes = np.unique(np.concatenate(chunks))
+            await asyncio.to_thread(self._build, hashes)
+            self._pending = set()
+            self._watermark = started
+            logger.info(f"Perceptual hash index loaded with {len(hashes)} hashes")
+    
+    async def refresh(self):
+        """Load the index on first use, then pick up hashes recorded since"""
+        if self._watermark is None:
+            await self.load()
+            return
+        async with self._lock:
+            started = datetime.utcnow()
+            async for entry in image_hashes.find(
+                {"created_at": {"$gte": self._watermark - REFRESH_OVERLAP}},
+                {"_id": 0, "phash": 1}
+            ):
+                self.add(int(entry["phash"], 16))
+            self._watermark = started
+
+phash_index = PerceptualHashIndex()
+
+async def record_kyc_image_hashes(kyc_id: str, user_id: str, documents: Dict):
+    """Replace the hash entries of a KYC document with those of its current images"""
+    entries = [
+        {
+            "kyc_id": kyc_id,
+            "user_id": user_id,
+            "field": field,
+            "phash": ref["phash"],
+            "created_at": datetime.utcnow()
+        }
+        for field, ref in documents.items() if ref.get("phash")
+    ]
+    await image_hashes.delete_many({"kyc_id": kyc_id})
+    if entries:
+        await image_hashes.insert_many(entries)
+    for entry in entries:
+        phash_index.add(int(entry["phash"], 16))
+
+async def find_similar_images(kyc_doc: Dict, radius: int = PHASH_MATCH_DISTANCE) -> Dict[str, List[Dict]]:
+    """
+    Images of other users within radius of each image of a KYC document.
+    
+    Returns {field: [{"kyc_id", "user_id", "field", "distance"}]}, closest first.
+    """
+    await phash_index.refresh()
+    
+    matches_by_field = {}
+    for field, ref in (kyc_doc.get("documents") or {}).items():
+        if ref.get("phash"):
+            matches_by_field[field] = phash_index.search(int(ref["phash"], 16), radius)
+    
+    wanted = {f"{value:016x}" for matches in matches_by_field.values() for value in matches}
+    if not wanted:
+        return {}
+    
+    entries = await image_hashes.find(
+        {"phash": {"$in": list(wanted)}, "user_id": {"$ne": kyc_doc["user_id"]}},
+        {"_id": 0, "kyc_id": 1, "user_id": 1, "field": 1, "phash": 1}
+    ).to_list(None)
+    
+    similar = {}
+    for field, matches in matches_by_field.items():
+        found = [
+            {
+                "kyc_id": entry["kyc_id"],
+                "user_id": entry["user_id"],
+                "field": entry["field"],
+                "distance": matches[int(entry["phash"], 16)]
+            }
+            for entry in entries if int(entry["phash"], 16) in matches
+        ]
+        if found:
+            similar[field] = sorted(found, key=lambda match: match["distance"])
+    return similar
+
+async def backfill_image_hashes(batch_size: int = 50) -> int:
+    """Hash stored KYC images that predate perceptual hashing and record them"""
+    last_id = ""
+    hashed = 0
+    
+    while True:
+        batch = await db.kyc_documents.find(
+            {"id": {"$gt": last_id}}, {"_id": 0, "id": 1, "user_id": 1, "documents": 1}
+        ).sort("id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["id"]
+        
+        for doc in batch:
+            documents = doc.get("documents") or {}
+            updates = {}
+            for field, ref in documents.items():
+                if ref.get("phash"):
+                    continue
+                data = await read_blob(ref["sha256"])
+                phash = await phash_image_async(data) if data is not None else None
+                if phash:
+                    ref["phash"] = phash
+                    updates[f"documents.{field}.phash"] = phash
+            if updates:
+                await db.kyc_documents.update_one({"id": doc["id"]}, {"$set": updates})
+                hashed += 1
+            await record_kyc_image_hashes(doc["id"], doc["user_id"], documents)
+    
+    logger.info(f"Hashed images of {hashed} KYC documents")
+    return hashed
+
+if __name__ == "__main__":
+    # One-off backfill: python -m services.image_similarity
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(backfill_image_hashes())
@@ -1,10 +1,114 @@
 import os
-import requests
-from typing import Optional, Dict
+import re
+import hmac
+import asyncio
+import hashlib
+import logging
+import httpx
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Tuple
+
+from core.config import SECRET_KEY
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+# Provider calls share one pooled client; each provider gets its own cap on
+# in-flight requests so a slow provider cannot exhaust the pool.
+KYC_CONNECT_TIMEOUT = float(os.getenv('KYC_CONNECT_TIMEOUT', 5.0))
+KYC_READ_TIMEOUT = float(os.getenv('KYC_READ_TIMEOUT', 20.0))
+KYC_PROVIDER_CONCURRENCY = int(os.getenv('KYC_PROVIDER_CONCURRENCY', 10))
+
+# Verification results are cached under a salted hash of the document number
+# so that re-submissions do not repeat paid provider calls. Cache keys never
+# contain the numbers, and identifiers echoed in a result (including inside
+# the provider's response payload) are dropped before it is cached.
+# Keys include the provider, so answers from one provider are never served
+# after switching to another; the mock provider's answers are never cached.
+KYC_CACHE_TTL_HOURS = float(os.getenv('KYC_CACHE_TTL_HOURS', 24 * 7))
+KYC_CACHE_SALT = os.getenv('KYC_CACHE_SALT', SECRET_KEY)
+
+verification_cache = db.kyc_verification_cache
+
+# Echoed identifiers, stripped before caching and restored on a hit
+_IDENTIFIER_FIELDS = ("pan_number", "aadhaar_number", "account_number", "account_holder_name")
+
+# Keys a provider payload may echo numbers or names under, compared
+# lower-case without separators (panNumber, account_number, nameAsPerBank...)
+_PAYLOAD_IDENTIFIER_KEYS = {
+    "pan", "pannumber", "aadhaar", "aadhaarnumber", "maskedaadhaar", "uid",
+    "accountnumber", "bankaccountnumber", "ifsc",
+    "name", "fullname", "nameasperbank", "nameatbank", "accountholdername", "beneficiaryname", "registeredname",
+}
+
+def _normalize(value: str) -> str:
+    return "".join((value or "").split()).upper()
+
+def _without_identifiers(value):
+    """A provider payload with identifier keys removed at any depth"""
+    if isinstance(value, dict):
+        return {
+            k: _without_identifiers(v) for k, v in value.items()
+            if re.sub(r"[^a-z]", "", str(k).lower()) not in _PAYLOAD_IDENTIFIER_KEYS
+        }
+    if isinstance(value, list):
+        return [_without_identifiers(v) for v in value]
+    return value
+
+def cache_key(provider: str, check: str, *identifiers: str) -> str:
+    message = "|".join([provider, check, *(_normalize(i) for i in identifiers)])
+    return hmac.new(KYC_CACHE_SALT.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+# ==================== STUB PROVIDER ====================
+# KYC_PROVIDER=stub answers locally from the format and checksum rules of each
+# document, after KYC_STUB_LATENCY_MS, so verification flows can be exercised
+# offline with both passing and failing inputs.
+
+KYC_STUB_LATENCY_MS = int(os.getenv('KYC_STUB_LATENCY_MS', 200))
+
+_PAN_PATTERN = re.compile(r"^[A-Z]{3}[ABCFGHLJPT][A-Z][0-9]{4}[A-Z]$")
+_IFSC_PATTERN = re.compile(r"^[A-Z]{4}0[A-Z0-9]{6}$")
+
+_VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3, 4, 0, 6, 7, 8, 9, 5],
+    [2, 3, 4, 0, 1, 7, 8, 9, 5, 6], [3, 4, 0, 1, 2, 8, 9, 5, 6, 7],
+    [4, 0, 1, 2, 3, 9, 5, 6, 7, 8], [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2], [7, 6, 5, 9, 8, 2, 1, 0, 4, 3],
+    [8, 7, 6, 5, 9, 3, 2, 1, 0, 4], [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+]
+_VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 5, 7, 6, 2, 8, 3, 0, 9, 4],
+    [5, 8, 0, 3, 7, 9, 6, 1, 4, 2], [8, 9, 1, 6, 0, 4, 3, 5, 2, 7],
+    [9, 4, 5, 3, 1, 2, 6, 8, 7, 0], [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5], [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+]
+
+def verhoeff_valid(number: str) -> bool:
+    """Aadhaar numbers carry a Verhoeff check digit"""
+    checksum = 0
+    for i, digit in enumerate(reversed(number)):
+        checksum = _VERHOEFF_D[checksum][_VERHOEFF_P[i % 8][int(digit)]]
+    return checksum == 0
+
+def stub_check(check: str, number: str, ifsc: str = "") -> Optional[str]:
+    """Reason the stub provider rejects a document, or None if it passes"""
+    number = _normalize(number)
+    if check == "pan" and not _PAN_PATTERN.match(number):
+        return "PAN format invalid"
+    if check == "aadhaar" and not (len(number) == 12 and number.isdigit() and number[0] not in "01" and verhoeff_valid(number)):
+        return "Aadhaar number invalid"
+    if check == "bank":
+        if not (9 <= len(number) <= 18 and number.isdigit()):
+            return "Account number invalid"
+        if not _IFSC_PATTERN.match(_normalize(ifsc)):
+            return "IFSC invalid"
+    return None
 
 class KYCService:
     def __init__(self):
         self.provider = os.getenv('KYC_PROVIDER', 'mock')
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
         
         if self.provider == 'signzy':
             self.api_key = os.getenv('SIGNZY_API_KEY')
@@ -14,41 +118,119 @@ class KYCService:
                 'Content-Type': 'application/json'
             }
     
-    async def verify_pan(self, pan_number: str) -> Dict:
-        """Verify PAN card"""
-        
-        # Mock verification
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(KYC_READ_TIMEOUT, connect=KYC_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=KYC_PROVIDER_CONCURRENCY * 2,
+                    max_keepalive_connections=KYC_PROVIDER_CONCURRENCY
+                )
+            )
+        return self._client
+    
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(KYC_PROVIDER_CONCURRENCY)
+        return self._semaphores[provider]
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _cached(self, check: str, numbers: Tuple[str, ...], identifiers: Dict, verify) -> Dict:
+        """Return a cached result for the check, or run verify() and cache a definitive answer"""
         if self.provider == 'mock':
-            print(f"[MOCK KYC] Verifying PAN: {pan_number}")
+            result = await verify()
+            result.pop("definitive", None)
+            return result
+        
+        key = cache_key(self.provider, check, *numbers)
+        entry = await verification_cache.find_one(
+            {"key": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"_id": 0, "result": 1}
+        )
+        if entry:
+            return {**entry["result"], **identifiers, "cached": True}
+        
+        result = await verify()
+        # Errors and timeouts are retried next time; answers from the provider are kept
+        if result.pop("definitive", result.get("success", False)):
+            await verification_cache.update_one(
+                {"key": key},
+                {"$set": {
+                    "result": {k: _without_identifiers(v) for k, v in result.items() if k not in _IDENTIFIER_FIELDS},
+                    "provider": self.provider,
+                    "created_at": datetime.utcnow(),
+                    "expires_at": datetime.utcnow() + timedelta(hours=KYC_CACHE_TTL_HOURS)
+                }},
+                upsert=True
+            )
+        return result
+    
+    async def _signzy_post(self, path: str, payload: Dict, label: str) -> Dict:
+        """POST to Signzy under the provider's concurrency cap"""
+        try:
+            async with self._semaphore('signzy'):
+                response = await self.client.post(f"{self.base_url}{path}", json=payload, headers=self.headers)
+        except httpx.TimeoutException:
+            logger.error(f"Signzy {label} Verification timed out")
+            return {"success": False, "error": "Request timeout"}
+        except httpx.HTTPError as e:
+            logger.error(f"Signzy {label} Verification Error: {str(e)}")
+            return {"success": False, "error": str(e)}
+        
+        if response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                return {"success": False, "error": "Invalid response from provider"}
             return {
                 "success": True,
-                "provider": "mock",
-                "pan_number": pan_number,
-                "name": "Test User",
-                "status": "valid"
+                "provider": "signzy",
+                "data": data
             }
+        # A 4xx other than rate limiting is the provider's answer about the document
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            return {"success": False, "status": "invalid", "error": response.text, "definitive": True}
+        return {"success": False, "error": response.text}
+    
+    async def _stub_verify(self, check: str, number: str, ifsc: str = "") -> Dict:
+        async with self._semaphore('stub'):
+            await asyncio.sleep(KYC_STUB_LATENCY_MS / 1000)
+        reason = stub_check(check, number, ifsc)
+        if reason:
+            return {"success": False, "provider": "stub", "status": "invalid", "error": reason, "definitive": True}
+        return {"success": True, "provider": "stub", "status": "valid"}
+    
+    async def verify_pan(self, pan_number: str) -> Dict:
+        """Verify PAN card"""
         
-        # Signzy PAN verification
-        if self.provider == 'signzy':
-            try:
-                url = f"{self.base_url}/api/v3/patrons/pan"
-                payload = {"panNumber": pan_number}
-                response = requests.post(url, json=payload, headers=self.headers)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "provider": "signzy",
-                        "data": data
-                    }
-                else:
-                    return {"success": False, "error": response.text}
-            except Exception as e:
-                print(f"Signzy PAN Verification Error: {str(e)}")
-                return {"success": False, "error": str(e)}
+        async def verify():
+            # Mock verification
+            if self.provider == 'mock':
+                logger.info(f"[MOCK KYC] Verifying PAN: {pan_number}")
+                return {
+                    "success": True,
+                    "provider": "mock",
+                    "pan_number": pan_number,
+                    "name": "Test User",
+                    "status": "valid"
+                }
+            
+            if self.provider == 'stub':
+                return await self._stub_verify("pan", pan_number)
+            
+            # Signzy PAN verification
+            if self.provider == 'signzy':
+                return await self._signzy_post("/api/v3/patrons/pan", {"panNumber": pan_number}, "PAN")
+            
+            return {"success": False, "error": "No KYC provider configured"}
         
-        return {"success": False, "error": "No KYC provider configured"}
+        identifiers = {"pan_number": pan_number} if self.provider == 'mock' else {}
+        return await self._cached("pan", (pan_number,), identifiers, verify)
     
     async def verify_aadhaar(self, aadhaar_number: str, consent: bool = True) -> Dict:
         """Verify Aadhaar (requires user consent)"""
@@ -56,80 +238,64 @@ class KYCService:
         if not consent:
             return {"success": False, "error": "User consent required for Aadhaar verification"}
         
-        # Mock verification
-        if self.provider == 'mock':
-            print(f"[MOCK KYC] Verifying Aadhaar: {aadhaar_number}")
-            return {
-                "success": True,
-                "provider": "mock",
-                "aadhaar_number": aadhaar_number,
-                "status": "valid"
-            }
-        
-        # Signzy Aadhaar verification
-        if self.provider == 'signzy':
-            try:
-                url = f"{self.base_url}/api/v3/patrons/aadhaar"
+        async def verify():
+            # Mock verification
+            if self.provider == 'mock':
+                logger.info(f"[MOCK KYC] Verifying Aadhaar: XXXXXXXX{_normalize(aadhaar_number)[-4:]}")
+                return {
+                    "success": True,
+                    "provider": "mock",
+                    "aadhaar_number": aadhaar_number,
+                    "status": "valid"
+                }
+            
+            if self.provider == 'stub':
+                return await self._stub_verify("aadhaar", aadhaar_number)
+            
+            # Signzy Aadhaar verification
+            if self.provider == 'signzy':
                 payload = {
                     "aadhaarNumber": aadhaar_number,
                     "consent": "Y"
                 }
-                response = requests.post(url, json=payload, headers=self.headers)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "provider": "signzy",
-                        "data": data
-                    }
-                else:
-                    return {"success": False, "error": response.text}
-            except Exception as e:
-                print(f"Signzy Aadhaar Verification Error: {str(e)}")
-                return {"success": False, "error": str(e)}
+                return await self._signzy_post("/api/v3/patrons/aadhaar", payload, "Aadhaar")
+            
+            return {"success": False, "error": "No KYC provider configured"}
         
-        return {"success": False, "error": "No KYC provider configured"}
+        identifiers = {"aadhaar_number": aadhaar_number} if self.provider == 'mock' else {}
+        return await self._cached("aadhaar", (aadhaar_number,), identifiers, verify)
     
     async def verify_bank_account(self, account_number: str, ifsc: str, name: str) -> Dict:
         """Verify bank account via penny drop"""
         
-        # Mock verification
-        if self.provider == 'mock':
-            print(f"[MOCK KYC] Verifying Bank: {account_number}")
-            return {
-                "success": True,
-                "provider": "mock",
-                "account_number": account_number,
-                "account_holder_name": name,
-                "status": "valid"
-            }
-        
-        # Signzy Bank Account verification
-        if self.provider == 'signzy':
-            try:
-                url = f"{self.base_url}/api/v3/patrons/bankaccount"
+        async def verify():
+            # Mock verification
+            if self.provider == 'mock':
+                logger.info(f"[MOCK KYC] Verifying Bank: XXXX{_normalize(account_number)[-4:]}")
+                return {
+                    "success": True,
+                    "provider": "mock",
+                    "account_number": account_number,
+                    "account_holder_name": name,
+                    "status": "valid"
+                }
+            
+            if self.provider == 'stub':
+                return await self._stub_verify("bank", account_number, ifsc)
+            
+            # Signzy Bank Account verification
+            if self.provider == 'signzy':
                 payload = {
                     "accountNumber": account_number,
                     "ifsc": ifsc,
                     "nameAsPerBank": name
                 }
-                response = requests.post(url, json=payload, headers=self.headers)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "provider": "signzy",
-                        "data": data
-                    }
-                else:
-                    return {"success": False, "error": response.text}
-            except Exception as e:
-                print(f"Signzy Bank Verification Error: {str(e)}")
-                return {"success": False, "error": str(e)}
+                return await self._signzy_post("/api/v3/patrons/bankaccount", payload, "Bank")
+            
+            return {"success": False, "error": "No KYC provider configured"}
         
-        return {"success": False, "error": "No KYC provider configured"}
+        identifiers = {"account_number": account_number, "account_holder_name": name} if self.provider == 'mock' else {}
+        return await self._cached("bank", (account_number, ifsc, name), identifiers, verify)
 
 # Global instance
 kyc_service = KYCService()
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+
+from core.database import db
+from services.blob_store import (
+    decode_data_url, put_bytes, read_blob, release_blob, is_blob_reference, resolve_blob_reference
+)
+from services.image_processing import PROCESSED_CONTENT_TYPE, process_image_async
+
+logger = logging.getLogger(__name__)
+
+# Fields of KYCSubmitRequest that carry base64 images. In kyc_documents they
+# are stored as blob references under "documents.<field>" and left empty.
+KYC_IMAGE_FIELDS = [
+    "pan_image",
+    "aadhaar_front",
+    "aadhaar_back",
+    "selfie_image",
+    "address_proof",
+    "passport_image",
+    "company_registration_cert",
+    "gst_certificate",
+    "board_resolution",
+    "authorized_signatory_id",
+]
+
+# authorized_signatory_id holds either a scan or a plain ID number, and ID
+# numbers are kept inline (see _is_image_payload). Reads keep the number and
+# drop an inline scan.
+TEXT_OR_IMAGE_FIELDS = ["authorized_signatory_id"]
+
+# Projection that leaves any inline (not yet migrated) images and the
+# identity fingerprints out of a read; pass the result through
+# drop_inline_images for the fields that may be text
+KYC_WITHOUT_IMAGES = {
+    "_id": 0, "fingerprints": 0, "collision_fingerprints": 0,
+    **{field: 0 for field in KYC_IMAGE_FIELDS if field not in TEXT_OR_IMAGE_FIELDS}
+}
+
+def _text_only(field: str) -> Dict:
+    """Inclusion-projection expression: the field if it is a short non-data-URL string"""
+    value = f"${field}"
+    return {"$cond": [
+        {"$and": [
+            {"$eq": [{"$type": value}, "string"]},
+            {"$lte": [{"$strLenCP": value}, 256]},
+            {"$ne": [{"$substrCP": [value, 0, 5]}, "data:"]}
+        ]},
+        value,
+        "$$REMOVE"
+    ]}
+
+# Just what the admin review queue shows per row
+KYC_QUEUE_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "user_id": 1,
+    "status": 1,
+    "submitted_at": 1,
+    "account_holder_name": 1,
+    "authorized_signatory_name": 1,
+    **{field: _text_only(field) for field in TEXT_OR_IMAGE_FIELDS},
+    "documents": 1,
+    "auto_verification.status": 1,
+    "auto_verification.checks": 1,
+}
+
+MIGRATION_BATCH_SIZE = 20
+
+def _is_image_payload(value) -> bool:
+    # authorized_signatory_id may be a plain ID number rather than a scan
+    return isinstance(value, str) and (value.startswith("data:") or len(value) > 256)
+
+def drop_inline_images(kyc_doc: Dict) -> Dict:
+    """Remove inline scans from the text-or-image fields read with KYC_WITHOUT_IMAGES"""
+    for field in TEXT_OR_IMAGE_FIELDS:
+        if _is_image_payload(kyc_doc.get(field)):
+            kyc_doc.pop(field)
+    return kyc_doc
+
+def _may_be_image(content_type: str) -> bool:
+    # Bare base64 without a data: prefix arrives as application/octet-stream
+    return content_type.startswith("image/") or content_type == "application/octet-stream"
+
+async def store_image(data: bytes, content_type: str) -> Dict:
+    """
+    Normalize an image in the worker pool and store it with its thumbnail.
+    
+    Anything that cannot be decoded as an image (e.g. a PDF) is stored as is.
+    """
+    processed = await process_image_async(data) if _may_be_image(content_type) else None
+    if processed is None:
+        return await put_bytes(data, content_type)
+    
+    ref = await put_bytes(processed["image"], PROCESSED_CONTENT_TYPE)
+    ref["thumbnail"] = await put_bytes(processed["thumbnail"], PROCESSED_CONTENT_TYPE)
+    ref["width"] = processed["width"]
+    ref["height"] = processed["height"]
+    ref["original_size"] = len(data)
+    ref["phash"] = processed["phash"]
+    return ref
+
+def _kyc_references(sha256: str) -> List[Tuple[str, Dict]]:
+    return [("kyc_documents", {"$or": [
+        {f"documents.{field}.{path}": sha256} for field in KYC_IMAGE_FIELDS for path in ("sha256", "thumbnail.sha256")
+    ]})]
+
+async def release_original(ref: Dict, new_ref: Dict, owner_id: Optional[str]):
+    """
+    Delete a raw image (with its EXIF/GPS metadata) once the KYC document
+    points at its re-encoded copy, unless something else still uses it.
+    """
+    if new_ref["sha256"] == ref["sha256"]:
+        return
+    if await release_blob(ref["sha256"], owner_id, _kyc_references(ref["sha256"])):
+        logger.info(f"Deleted original {ref['sha256']} after re-encoding")
+
+async def _store_field(field: str, value: str, owner_id: Optional[str]) -> Tuple[Dict, Optional[Dict]]:
+    """(reference to store, raw upload it replaces if any)"""
+    if owner_id and is_blob_reference(value):
+        ref = await resolve_blob_reference(value, owner_id)
+        if not _may_be_image(ref["content_type"]):
+            return ref, None
+        data = await read_blob(ref["sha256"])
+        return await store_image(data, ref["content_type"]), ref
+    try:
+        data, content_type = decode_data_url(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid image data for {field}")
+    return await store_image(data, content_type), None
+
+async def store_kyc_images(fields: Dict, owner_id: Optional[str] = None) -> Tuple[Dict, Dict, Dict]:
+    """
+    Move image payloads out of a KYC field dict into the blob store.
+    
+    Fields may hold base64 data or a "blob:<sha256>" reference to a file the
+    owner already uploaded through /kyc/upload. Images are processed in
+    parallel.
+    Returns (fields with images cleared, {field: blob reference},
+    {field: raw upload replaced by its re-encoded copy}). Once the new
+    references are saved, pass the last two to release_originals.
+    """
+    fields = dict(fields)
+    pending = [
+        field for field in KYC_IMAGE_FIELDS
+        if (owner_id and is_blob_reference(fields.get(field))) or _is_image_payload(fields.get(field))
+    ]
+    results = await asyncio.gather(*[_store_field(field, fields[field], owner_id) for field in pending])
+    
+    for field in pending:
+        fields[field] = None
+    refs = {field: ref for field, (ref, _) in zip(pending, results)}
+    originals = {field: original for field, (_, original) in zip(pending, results) if original}
+    return fields, refs, originals
+
+async def release_originals(refs: Dict, originals: Dict, owner_id: Optional[str]):
+    for field, original in originals.items():
+        await release_original(original, refs[field], owner_id)
+
+async def release_kyc_images(refs: Dict, owner_id: Optional[str] = None):
+    """
+    Delete stored KYC images and thumbnails that no document references any
+    more (a failed or superseded submission). Without owner_id, blobs the
+    user uploaded themselves are kept so the upload can be referenced again.
+    """
+    for ref in refs.values():
+        for sha256 in {ref.get("sha256"), (ref.get("thumbnail") or {}).get("sha256")} - {None}:
+            await release_blob(sha256, owner_id, _kyc_references(sha256))
+
+def document_links(kyc_id: str, documents: Dict) -> Dict:
+    """
+    Per-field metadata and download paths for a KYC document's images, so
+    list views can fetch each image (or its thumbnail) only when shown.
+    """
+    links = {}
+    for field, ref in documents.items():
+        url = f"/api/admin/kyc/{kyc_id}/documents/{field}"
+        links[field] = {
+            "content_type": ref.get("content_type"),
+            "size": ref.get("size"),
+            "url": url,
+            "thumbnail_url": f"{url}?variant=thumbnail" if ref.get("thumbnail") else None
+        }
+    return links
+
+async def migrate_inline_images(batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """Move base64 images embedded in existing kyc_documents into the blob store"""
+    has_inline = {"$or": [{field: {"$type": "string"}} for field in KYC_IMAGE_FIELDS]}
+    projection = {"_id": 0, "id": 1, **{field: 1 for field in KYC_IMAGE_FIELDS}}
+    migrated = 0
+    last_id = ""
+    
+    while True:
+        # Keyset over id, a few documents at a time: each may be megabytes
+        batch = await db.kyc_documents.find(
+            {**has_inline, "id": {"$gt": last_id}}, projection
+        ).sort("id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["id"]
+        
+        for doc in batch:
+            try:
+                _, documents, _ = await store_kyc_images(doc)
+            except HTTPException:
+                logger.error(f"KYC {doc['id']}: undecodable image data, left in place")
+                continue
+            # Short non-image strings (e.g. signatory ID numbers) stay as they are
+            if not documents:
+                continue
+            await db.kyc_documents.update_one(
+                {"id": doc["id"]},
+                {
+                    "$set": {f"documents.{field}": ref for field, ref in documents.items()},
+                    "$unset": {field: "" for field in documents}
+                }
+            )
+            migrated += 1
+    
+    logger.info(f"Migrated inline images of {migrated} KYC documents")
+    return migrated
+
+async def process_stored_images(batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """Run already-stored KYC images without a thumbnail through the image pipeline"""
+    unprocessed = {"$or": [
+        {f"documents.{field}": {"$exists": True}, f"documents.{field}.thumbnail": {"$exists": False}}
+        for field in KYC_IMAGE_FIELDS
+    ]}
+    processed = 0
+    last_id = ""
+    
+    while True:
+        batch = await db.kyc_documents.find(
+            {**unprocessed, "id": {"$gt": last_id}}, {"_id": 0, "id": 1, "user_id": 1, "documents": 1}
+        ).sort("id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["id"]
+        
+        for doc in batch:
+            updates, replaced = {}, []
+            for field, ref in doc["documents"].items():
+                if ref.get("thumbnail") or not _may_be_image(ref.get("content_type", "")):
+                    continue
+                data = await read_blob(ref["sha256"])
+                if data is None:
+                    logger.error(f"KYC {doc['id']}: blob for {field} is missing")
+                    continue
+                new_ref = await store_image(data, ref["content_type"])
+                if new_ref.get("thumbnail"):
+                    updates[f"documents.{field}"] = new_ref
+                    replaced.append((ref, new_ref))
+            if updates:
+                await db.kyc_documents.update_one({"id": doc["id"]}, {"$set": updates})
+                for ref, new_ref in replaced:
+                    await release_original(ref, new_ref, doc.get("user_id"))
+                processed += 1
+    
+    logger.info(f"Processed stored images of {processed} KYC documents")
+    return processed
+
+if __name__ == "__main__":
+    # One-off migrations:
+    #   python -m services.kyc_storage             inline base64 -> blob store
+    #   python -m services.kyc_storage thumbnails  re-encode stored images, add thumbnails
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] == ["thumbnails"]:
+        asyncio.run(process_stored_images())
+    else:
+        asyncio.run(migrate_inline_images())
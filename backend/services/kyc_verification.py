@@ -0,0 +1,133 @@
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from core.database import db
+from services.kyc_service import kyc_service
+
+logger = logging.getLogger(__name__)
+
+# Automated KYC checks. Submitting KYC queues a job that runs the PAN, Aadhaar
+# and bank checks concurrently under one overall deadline and records the
+# outcome on the KYC document as "auto_verification":
+#   {"status", "checks": {check: {"status", "provider", "cached", "error"}},
+#    "queued_at", "started_at", "completed_at"}
+# Overall status: queued -> running -> passed | failed | review. "review"
+# means some check errored or missed the deadline and needs a human.
+KYC_VERIFICATION_DEADLINE_SECONDS = float(os.getenv('KYC_VERIFICATION_DEADLINE_SECONDS', 30))
+
+AUTO_VERIFICATION_STATUSES = ["queued", "running", "passed", "failed", "review"]
+
+# Strong references to in-flight jobs so they are not garbage collected
+_jobs: Set[asyncio.Task] = set()
+
+def _check_outcome(result: Dict) -> Dict:
+    if result.get("success"):
+        status = "failed" if result.get("status") not in (None, "valid") else "passed"
+    elif result.get("status") == "invalid":
+        status = "failed"
+    else:
+        status = "error"
+    return {
+        "status": status,
+        "provider": result.get("provider"),
+        "cached": bool(result.get("cached")),
+        "error": result.get("error")
+    }
+
+def _overall_status(checks: Dict) -> str:
+    statuses = {check["status"] for check in checks.values()}
+    if "failed" in statuses:
+        return "failed"
+    if statuses - {"passed", "skipped"}:
+        return "review"
+    return "passed"
+
+async def verify_kyc(kyc_id: str) -> Optional[Dict]:
+    """Run the automated checks for one KYC document and store the result"""
+    kyc_doc = await db.kyc_documents.find_one(
+        {"id": kyc_id},
+        {"_id": 0, "submitted_at": 1, "pan_number": 1, "aadhaar_number": 1,
+         "bank_account_number": 1, "bank_ifsc": 1, "account_holder_name": 1}
+    )
+    if not kyc_doc:
+        return None
+    
+    # Only the submission this job was queued for may be updated
+    match = {"id": kyc_id, "submitted_at": kyc_doc.get("submitted_at")}
+    started_at = datetime.utcnow()
+    await db.kyc_documents.update_one(match, {"$set": {
+        "auto_verification.status": "running",
+        "auto_verification.started_at": started_at
+    }})
+    
+    calls = {
+        "bank": kyc_service.verify_bank_account(
+            kyc_doc["bank_account_number"], kyc_doc["bank_ifsc"], kyc_doc["account_holder_name"]
+        )
+    }
+    if kyc_doc.get("pan_number"):
+        calls["pan"] = kyc_service.verify_pan(kyc_doc["pan_number"])
+    if kyc_doc.get("aadhaar_number"):
+        calls["aadhaar"] = kyc_service.verify_aadhaar(kyc_doc["aadhaar_number"])
+    
+    tasks = {name: asyncio.create_task(call) for name, call in calls.items()}
+    await asyncio.wait(tasks.values(), timeout=KYC_VERIFICATION_DEADLINE_SECONDS)
+    
+    checks = {}
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            checks[name] = {"status": "timeout", "provider": kyc_service.provider, "cached": False, "error": "Deadline exceeded"}
+        elif task.exception():
+            logger.error(f"KYC {kyc_id}: {name} check raised {task.exception()!r}")
+            checks[name] = {"status": "error", "provider": kyc_service.provider, "cached": False, "error": str(task.exception())}
+        else:
+            checks[name] = _check_outcome(task.result())
+    for name in ("pan", "aadhaar"):
+        checks.setdefault(name, {"status": "skipped", "provider": None, "cached": False, "error": None})
+    
+    result = {
+        "status": _overall_status(checks),
+        "checks": checks,
+        "started_at": started_at,
+        "completed_at": datetime.utcnow()
+    }
+    await db.kyc_documents.update_one(match, {"$set": {
+        f"auto_verification.{key}": value for key, value in result.items()
+    }})
+    logger.info(f"KYC {kyc_id}: automated verification {result['status']}")
+    return result
+
+async def _run_job(kyc_id: str):
+    try:
+        await verify_kyc(kyc_id)
+    except Exception as e:
+        logger.error(f"KYC {kyc_id}: automated verification failed: {e}")
+        await db.kyc_documents.update_one(
+            {"id": kyc_id, "auto_verification.status": {"$in": ["queued", "running"]}},
+            {"$set": {"auto_verification.status": "review", "auto_verification.error": str(e)}}
+        )
+
+def enqueue_kyc_verification(kyc_id: str):
+    """Start verification in the background; the caller does not wait for it"""
+    task = asyncio.create_task(_run_job(kyc_id))
+    _jobs.add(task)
+    task.add_done_callback(_jobs.discard)
+
+async def resume_pending_verifications():
+    """Re-queue jobs that were queued or running when the server last stopped"""
+    pending = await db.kyc_documents.find(
+        {"auto_verification.status": {"$in": ["queued", "running"]}},
+        {"_id": 0, "id": 1}
+    ).to_list(None)
+    for doc in pending:
+        enqueue_kyc_verification(doc["id"])
+    if pending:
+        logger.info(f"Resumed automated verification for {len(pending)} KYC documents")
+
+def cancel_verification_jobs():
+    for task in list(_jobs):
+        task.cancel()
@@ -0,0 +1,135 @@
+import os
+import sys
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from pymongo import UpdateOne
+
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+# Checkpoints are written a little after midnight UTC so that entries created
+# right before the boundary have landed before the day is sealed.
+CHECKPOINTS_ENABLED = os.getenv('LEDGER_CHECKPOINTS_ENABLED', 'true').lower() == 'true'
+CHECKPOINT_DELAY = timedelta(minutes=int(os.getenv('LEDGER_CHECKPOINT_DELAY_MINUTES', '15')))
+CHECKPOINT_BATCH_SIZE = 500
+
+# Credits add to the balance, debits subtract
+SIGNED_AMOUNT = {
+    "$cond": [
+        {"$eq": ["$transaction_type", "credit"]},
+        "$amount",
+        {"$multiply": ["$amount", -1]}
+    ]
+}
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalize a datetime to naive UTC, the way it is stored in Mongo"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def day_boundary(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+async def _sum_entries(user_id: str, start: Optional[datetime], end: datetime, include_end: bool) -> Dict[str, float]:
+    """Net amount per asset for a user's entries in [start, end) or [start, end]"""
+    created_at = {"$lte" if include_end else "$lt": end}
+    if start:
+        created_at["$gte"] = start
+    
+    pipeline = [
+        {"$match": {"user_id": user_id, "created_at": created_at}},
+        {"$group": {"_id": "$asset", "balance": {"$sum": SIGNED_AMOUNT}}}
+    ]
+    return {row["_id"]: row["balance"] async for row in db.wallet_ledger.aggregate(pipeline)}
+
+async def _nearest_checkpoint(user_id: str, as_of: datetime, inclusive: bool = True) -> Optional[dict]:
+    return await db.ledger_checkpoints.find_one(
+        {"user_id": user_id, "as_of": {"$lte" if inclusive else "$lt": as_of}},
+        sort=[("as_of", -1)]
+    )
+
+async def get_balances(user_id: str, as_of: Optional[datetime] = None) -> Dict[str, float]:
+    """
+    Balance per asset as of a point in time (inclusive).
+    
+    Starts from the nearest checkpoint at or before `as_of` and only scans the
+    ledger entries written since, so the cost follows recent activity rather
+    than the age of the account.
+    """
+    as_of = to_utc_naive(as_of) if as_of else datetime.utcnow()
+    
+    checkpoint = await _nearest_checkpoint(user_id, as_of)
+    balances = dict(checkpoint["balances"]) if checkpoint else {}
+    start = checkpoint["as_of"] if checkpoint else None
+    
+    delta = await _sum_entries(user_id, start, as_of, include_end=True)
+    for asset, amount in delta.items():
+        balances[asset] = balances.get(asset, 0) + amount
+    
+    return balances
+
+async def _checkpoint_user(user_id: str, boundary: datetime) -> UpdateOne:
+    """Build the checkpoint upsert for one user: everything strictly before `boundary`"""
+    previous = await _nearest_checkpoint(user_id, boundary, inclusive=False)
+    balances = dict(previous["balances"]) if previous else {}
+    start = previous["as_of"] if previous else None
+    
+    delta = await _sum_entries(user_id, start, boundary, include_end=False)
+    for asset, amount in delta.items():
+        balances[asset] = balances.get(asset, 0) + amount
+    
+    return UpdateOne(
+        {"user_id": user_id, "as_of": boundary},
+        {"$set": {"balances": balances, "created_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def write_daily_checkpoints(boundary: Optional[datetime] = None) -> int:
+    """
+    Write a checkpoint at the given UTC day boundary (default: today 00:00 UTC)
+    for every user with ledger activity since the previous run.
+    
+    Users without new entries keep their older checkpoint as the nearest one,
+    so only active accounts are touched. Safe to re-run for the same boundary.
+    """
+    boundary = day_boundary(to_utc_naive(boundary) if boundary else datetime.utcnow())
+    
+    last_run = await db.ledger_checkpoints.find_one({"as_of": {"$lt": boundary}}, sort=[("as_of", -1)])
+    window = {"$lt": boundary}
+    if last_run:
+        window["$gte"] = last_run["as_of"]
+    
+    user_ids = await db.wallet_ledger.distinct("user_id", {"created_at": window})
+    
+    written = 0
+    for i in range(0, len(user_ids), CHECKPOINT_BATCH_SIZE):
+        batch = user_ids[i:i + CHECKPOINT_BATCH_SIZE]
+        operations = await asyncio.gather(*[_checkpoint_user(uid, boundary) for uid in batch])
+        if operations:
+            await db.ledger_checkpoints.bulk_write(operations, ordered=False)
+            written += len(operations)
+    
+    logger.info(f"Ledger checkpoints written for {boundary.date()}: {written} users")
+    return written
+
+async def run_checkpoint_scheduler():
+    """Background loop: catch up once on startup, then checkpoint every day after midnight UTC"""
+    while True:
+        try:
+            await write_daily_checkpoints()
+        except Exception as e:
+            logger.error(f"Ledger checkpoint job failed: {e}")
+        
+        now = datetime.utcnow()
+        next_run = day_boundary(now) + timedelta(days=1) + CHECKPOINT_DELAY
+        await asyncio.sleep((next_run - now).total_seconds())
+
+if __name__ == "__main__":
+    # Manual/cron run: python -m services.ledger_service [YYYY-MM-DD]
+    logging.basicConfig(level=logging.INFO)
+    target = datetime.strptime(sys.argv[1], "%Y-%m-%d") if len(sys.argv) > 1 else None
+    asyncio.run(write_daily_checkpoints(target))
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+# In-process columnar snapshot of orders for ad-hoc admin analytics. Each
+# order is one row across parallel NumPy arrays (created_at as epoch
+# milliseconds, dictionary-encoded asset/side/status, quantity, rate and
+# total_inr), so group-by and time-bucket questions are a boolean mask plus
+# np.unique/np.bincount over the matching rows instead of a collection scan.
+# The snapshot loads once and then tails orders whose created_at or
+# updated_at moved past the last refresh, which covers both new orders and
+# status changes (every order write sets updated_at).
+
+LOAD_BATCH_SIZE = 10000
+INITIAL_CAPACITY = 1024
+
+# Picks up writes committed slightly out of order or under clock skew
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+ORDER_PROJECTION = {
+    "_id": 0, "id": 1, "created_at": 1, "asset": 1, "order_type": 1,
+    "status": 1, "quantity": 1, "rate": 1, "total_inr": 1
+}
+
+DIMENSIONS = ("asset", "order_type", "status")
+METRICS = ("count", "quantity", "volume", "avg_ticket", "avg_rate", "buy_volume", "sell_volume", "net_volume")
+BUCKETS = ("hour", "day", "week", "month")
+
+# Larger results are better served by a coarser bucket or fewer dimensions
+MAX_QUERY_GROUPS = 10000
+
+_EPOCH = datetime(1970, 1, 1)
+_HOUR_MS = 3_600_000
+_DAY_MS = 24 * _HOUR_MS
+# Unix day 0 was a Thursday; shifting by 3 days starts weeks on Monday
+_WEEK_OFFSET_DAYS = 3
+
+def _to_ms(moment: datetime) -> int:
+    return int((moment - _EPOCH).total_seconds() * 1000)
+
+def _bucket_numbers(created_ms: np.ndarray, bucket: str) -> np.ndarray:
+    if bucket == "hour":
+        return created_ms // _HOUR_MS
+    if bucket == "day":
+        return created_ms // _DAY_MS
+    if bucket == "week":
+        return (created_ms // _DAY_MS + _WEEK_OFFSET_DAYS) // 7
+    return created_ms.astype("datetime64[ms]").astype("datetime64[M]").astype(np.int64)
+
+def _bucket_start(number: int, bucket: str) -> datetime:
+    if bucket == "hour":
+        return _EPOCH + timedelta(hours=number)
+    if bucket == "day":
+        return _EPOCH + timedelta(days=number)
+    if bucket == "week":
+        return _EPOCH + timedelta(days=number * 7 - _WEEK_OFFSET_DAYS)
+    return datetime(1970 + number // 12, number % 12 + 1, 1)
+
+class _Codes:
+    """Dictionary encoding of a string column"""
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+    
+    def encode(self, value) -> int:
+        value = getattr(value, "value", value) or "Unknown"
+        if value not in self._codes:
+            self._codes[value] = len(self.values)
+            self.values.append(value)
+        return self._codes[value]
+    
+    def code(self, value: str) -> int:
+        return self._codes.get(value, -1)
+    
+    def lookup(self, values: List[str]) -> List[int]:
+        return [self._codes[v] for v in values if v in self._codes]
+    
+    @property
+    def bits(self) -> int:
+        return max(1, (len(self.values) - 1).bit_length())
+
+class OrderColumns:
+    def __init__(self):
+        self._size = 0
+        self._rows: Dict[str, int] = {}
+        self._columns = {
+            "created_at": np.empty(INITIAL_CAPACITY, dtype=np.int64),
+            "asset": np.empty(INITIAL_CAPACITY, dtype=np.int16),
+            "order_type": np.empty(INITIAL_CAPACITY, dtype=np.int8),
+            "status": np.empty(INITIAL_CAPACITY, dtype=np.int8),
+            "quantity": np.empty(INITIAL_CAPACITY, dtype=np.float64),
+            "rate": np.empty(INITIAL_CAPACITY, dtype=np.float64),
+            "total_inr": np.empty(INITIAL_CAPACITY, dtype=np.float64),
+        }
+        self.codes = {dimension: _Codes() for dimension in DIMENSIONS}
+        self._watermark: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+    
+    def __len__(self):
+        return self._size
+    
+    def _column(self, name: str) -> np.ndarray:
+        return self._columns[name][:self._size]
+    
+    def _grow(self):
+        capacity = len(self._columns["created_at"]) * 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+    
+    def upsert(self, order: Dict):
+        """Add an order, or overwrite its row if it is already loaded"""
+        row = self._rows.get(order["id"])
+        if row is None:
+            if self._size == len(self._columns["created_at"]):
+                self._grow()
+            row = self._size
+            self._rows[order["id"]] = row
+            self._size += 1
+        
+        columns = self._columns
+        columns["created_at"][row] = _to_ms(order["created_at"])
+        for dimension in DIMENSIONS:
+            columns[dimension][row] = self.codes[dimension].encode(order.get(dimension))
+        columns["quantity"][row] = order.get("quantity") or 0
+        columns["rate"][row] = order.get("rate") or 0
+        columns["total_inr"][row] = order.get("total_inr") or 0
+    
+    async def _tail(self, query: Dict) -> int:
+        seen = 0
+        async for order in db.orders.find(query, ORDER_PROJECTION).batch_size(LOAD_BATCH_SIZE):
+            if isinstance(order.get("created_at"), datetime):
+                self.upsert(order)
+                seen += 1
+        return seen
+    
+    async def load(self):
+        """Read every order into the snapshot"""
+        async with self._lock:
+            started = datetime.utcnow()
+            loaded = await self._tail({})
+            self._watermark = started
+            logger.info(f"Order cache loaded with {loaded} orders")
+    
+    async def refresh(self):
+        """Load on first use, then apply orders created or updated since the last refresh"""
+        if self._watermark is None:
+            await self.load()
+            return
+        async with self._lock:
+            started = datetime.utcnow()
+            since = self._watermark - REFRESH_OVERLAP
+            await self._tail({"$or": [
+                {"created_at": {"$gte": since}},
+                {"updated_at": {"$gte": since}}
+            ]})
+            self._watermark = started
+    
+    def _mask(self, start: Optional[datetime], end: Optional[datetime], filters: Dict[str, List[str]]) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        created = self._column("created_at")
+        if start:
+            mask &= created >= _to_ms(start)
+        if end:
+            mask &= created < _to_ms(end)
+        for dimension, values in filters.items():
+            if values:
+                mask &= np.isin(self._column(dimension), self.codes[dimension].lookup(values))
+        return mask
+    
+    def _query(
+        self,
+        group_by: List[str],
+        bucket: Optional[str],
+        metrics: List[str],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        filters: Dict[str, List[str]]
+    ) -> Dict:
+        mask = self._mask(start, end, filters)
+        matched = int(mask.sum())
+        
+        # Each group is identified by one int64 key: the bucket number in the
+        # high bits, then each dimension's code in just enough bits for it
+        keys = np.zeros(matched, dtype=np.int64)
+        if bucket:
+            keys = _bucket_numbers(self._column("created_at")[mask], bucket)
+        widths = [self.codes[dimension].bits for dimension in group_by]
+        for dimension, width in zip(group_by, widths):
+            keys = (keys << width) | self._column(dimension)[mask].astype(np.int64)
+        
+        groups, inverse = np.unique(keys, return_inverse=True)
+        if len(groups) > MAX_QUERY_GROUPS:
+            raise ValueError(f"Query produces {len(groups)} groups (limit {MAX_QUERY_GROUPS}); use a coarser bucket or fewer group_by fields")
+        
+        def total(values: np.ndarray) -> np.ndarray:
+            return np.bincount(inverse, weights=values, minlength=len(groups))
+        
+        count = np.bincount(inverse, minlength=len(groups))
+        volume = total(self._column("total_inr")[mask])
+        quantity = total(self._column("quantity")[mask])
+        sides = self._column("order_type")[mask]
+        buy_code, sell_code = self.codes["order_type"].code("buy"), self.codes["order_type"].code("sell")
+        values = {
+            "count": count,
+            "quantity": quantity,
+            "volume": volume,
+            "avg_ticket": np.divide(volume, count, out=np.zeros(len(groups)), where=count > 0),
+            "avg_rate": np.divide(volume, quantity, out=np.zeros(len(groups)), where=quantity > 0),
+        }
+        if {"buy_volume", "sell_volume", "net_volume"} & set(metrics):
+            values["buy_volume"] = total(np.where(sides == buy_code, self._column("total_inr")[mask], 0))
+            values["sell_volume"] = total(np.where(sides == sell_code, self._column("total_inr")[mask], 0))
+            values["net_volume"] = values["buy_volume"] - values["sell_volume"]
+        
+        rows = []
+        for i, key in enumerate(groups.tolist()):
+            row = {}
+            for dimension, width in reversed(list(zip(group_by, widths))):
+                row[dimension] = self.codes[dimension].values[key & ((1 << width) - 1)]
+                key >>= width
+            if bucket:
+                row["bucket"] = _bucket_start(key, bucket)
+            for metric in metrics:
+                value = values[metric][i]
+                row[metric] = int(value) if metric == "count" else round(float(value), 2)
+            rows.append(row)
+        return {"orders_matched": matched, "rows": rows}
+    
+    async def query(
+        self,
+        group_by: List[str],
+        bucket: Optional[str] = None,
+        metrics: List[str] = ("count", "volume"),
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        filters: Optional[Dict[str, List[str]]] = None
+    ) -> Dict:
+        """
+        Aggregate orders by time bucket and/or dimensions.
+        
+        Rows are ordered by bucket, then by group_by fields in first-seen
+        order. Raises ValueError when the result would be too large.
+        """
+        await self.refresh()
+        async with self._lock:
+            started = datetime.utcnow()
+            result = await asyncio.to_thread(self._query, group_by, bucket, list(metrics), start, end, filters or {})
+            result["orders_cached"] = self._size
+            result["as_of"] = self._watermark
+            result["elapsed_ms"] = round((datetime.utcnow() - started).total_seconds() * 1000, 2)
+        return result
+
+order_columns = OrderColumns()
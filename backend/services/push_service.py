@@ -1,7 +1,9 @@
 import os
+import asyncio
 import logging
+import time
 import httpx
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Dict
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,6 +13,29 @@ logger = logging.getLogger(__name__)
 # Expo Push Notification endpoint
 EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
 
+# Expo accepts at most 100 messages per request
+EXPO_BATCH_SIZE = 100
+
+# Fan-out limits for streamed sends: requests in flight at once, and
+# requests started per second (Expo throttles a project at ~600 messages/s)
+PUSH_MAX_CONCURRENT_REQUESTS = int(os.getenv('PUSH_MAX_CONCURRENT_REQUESTS', 4))
+PUSH_MAX_REQUESTS_PER_SECOND = float(os.getenv('PUSH_MAX_REQUESTS_PER_SECOND', 6))
+
+def is_expo_token(token: Optional[str]) -> bool:
+    return bool(token) and token.startswith("ExponentPushToken")
+
+def push_message(token: str, title: str, body: str, data: Optional[dict] = None) -> dict:
+    message = {
+        "to": token,
+        "sound": "default",
+        "title": title,
+        "body": body,
+        "priority": "high"
+    }
+    if data:
+        message["data"] = data
+    return message
+
 class PushNotificationService:
     """
     Expo Push Notification Service
@@ -48,24 +73,13 @@ class PushNotificationService:
             return {"success": False, "error": "No push tokens provided"}
         
         # Filter valid Expo push tokens
-        valid_tokens = [t for t in push_tokens if t and t.startswith("ExponentPushToken")]
+        valid_tokens = [t for t in push_tokens if is_expo_token(t)]
         
         if not valid_tokens:
             logger.warning("No valid Expo push tokens found")
             return {"success": False, "error": "No valid push tokens"}
         
-        messages = []
-        for token in valid_tokens:
-            message = {
-                "to": token,
-                "sound": "default",
-                "title": title,
-                "body": body,
-                "priority": "high"
-            }
-            if data:
-                message["data"] = data
-            messages.append(message)
+        messages = [push_message(token, title, body, data) for token in valid_tokens]
         
         try:
             async with httpx.AsyncClient() as client:
@@ -90,29 +104,173 @@ class PushNotificationService:
         except Exception as e:
             logger.error(f"Push notification error: {str(e)}")
             return {"success": False, "error": str(e)}
+    
+    async def send_push_messages(self, messages: List[dict]) -> List[dict]:
+        """
+        Send individually addressed messages (see push_message) in batches
+        of EXPO_BATCH_SIZE, concurrently over one connection pool.
+        
+        Returns one Expo ticket per message, in order:
+        {"status": "ok", "id": ...} or {"status": "error", "message": ...}
+        """
+        if not self.enabled:
+            for message in messages:
+                logger.info(f"[MOCK PUSH] To: {message['to']}, Title: {message['title']}, Body: {message['body']}")
+            return [{"status": "ok", "provider": "mock"} for _ in messages]
+        
+        tickets: List[Dict] = [{"status": "error", "message": "Invalid push token"} for _ in messages]
+        valid = [i for i, message in enumerate(messages) if is_expo_token(message.get("to"))]
+        batches = [valid[i:i + EXPO_BATCH_SIZE] for i in range(0, len(valid), EXPO_BATCH_SIZE)]
+        
+        async def send(client: httpx.AsyncClient, batch: List[int]):
+            batch_tickets = await self._send_batch(client, [messages[i] for i in batch])
+            for i, ticket in zip(batch, batch_tickets):
+                tickets[i] = ticket
+        
+        if batches:
+            async with httpx.AsyncClient() as client:
+                await asyncio.gather(*[send(client, batch) for batch in batches])
+            logger.info(f"Sent {len(valid)} push messages in {len(batches)} requests")
+        return tickets
+    
+    async def _send_batch(self, client: httpx.AsyncClient, batch: List[dict]) -> List[dict]:
+        """One Expo request; returns a ticket per message, errors included"""
+        try:
+            response = await client.post(
+                EXPO_PUSH_URL,
+                json=batch,
+                headers={
+                    "Accept": "application/json",
+                    "Content-Type": "application/json"
+                },
+                timeout=30.0
+            )
+            if response.status_code != 200:
+                raise RuntimeError(response.text)
+            tickets = response.json().get("data", [])
+            return tickets + [{"status": "error", "message": "No ticket returned"}] * (len(batch) - len(tickets))
+        except Exception as e:
+            logger.error(f"Push batch of {len(batch)} failed: {str(e)}")
+            return [{"status": "error", "message": str(e)} for _ in batch]
+    
+    async def send_push_stream(
+        self,
+        messages: AsyncIterator[dict],
+        max_concurrency: int = PUSH_MAX_CONCURRENT_REQUESTS,
+        max_requests_per_second: float = PUSH_MAX_REQUESTS_PER_SECOND
+    ) -> Dict[str, int]:
+        """
+        Send messages as they are produced, EXPO_BATCH_SIZE per request, with
+        at most max_concurrency requests in flight and requests started no
+        faster than max_requests_per_second. The producer is only read ahead
+        of the sends by one batch, so memory stays flat for any audience size.
+        
+        Returns {"sent", "delivered", "failed", "batches"}, counting invalid
+        tokens as failed.
+        """
+        counts = {"sent": 0, "delivered": 0, "failed": 0, "batches": 0}
+        
+        def tally(tickets: List[dict]):
+            for ticket in tickets:
+                counts["delivered" if ticket.get("status") == "ok" else "failed"] += 1
+        
+        slots = asyncio.Semaphore(max_concurrency)
+        interval = 1 / max_requests_per_second if max_requests_per_second > 0 else 0
+        next_start = time.monotonic()
+        pending = set()
+        
+        async def send(client: Optional[httpx.AsyncClient], batch: List[dict]):
+            try:
+                if client is None:
+                    tally(await self.send_push_messages(batch))
+                else:
+                    tally(await self._send_batch(client, batch))
+            finally:
+                slots.release()
+        
+        async def flush(client: Optional[httpx.AsyncClient], batch: List[dict]):
+            nonlocal next_start
+            await slots.acquire()
+            delay = next_start - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_start = max(next_start, time.monotonic()) + interval
+            counts["sent"] += len(batch)
+            counts["batches"] += 1
+            task = asyncio.create_task(send(client, batch))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        
+        async with httpx.AsyncClient() as http:
+            # Mock mode goes through send_push_messages, which only logs
+            client = http if self.enabled else None
+            batch: List[dict] = []
+            try:
+                async for message in messages:
+                    if not is_expo_token(message.get("to")):
+                        counts["sent"] += 1
+                        counts["failed"] += 1
+                        continue
+                    batch.append(message)
+                    if len(batch) == EXPO_BATCH_SIZE:
+                        await flush(client, batch)
+                        batch = []
+                if batch:
+                    await flush(client, batch)
+                await asyncio.gather(*pending)
+            finally:
+                for task in pending:
+                    task.cancel()
+        
+        logger.info(f"Streamed {counts['sent']} push messages in {counts['batches']} requests: {counts['delivered']} delivered, {counts['failed']} failed")
+        return counts
 
 # Global instance
 push_service = PushNotificationService()
 
 # ==================== NOTIFICATION HELPERS ====================
 
+def kyc_approved_content(user_name: str = "User") -> dict:
+    return {
+        "title": "KYC Approved! 🎉",
+        "body": f"Congratulations {user_name}! Your KYC has been approved. You can now start trading.",
+        "data": {"type": "kyc_approved", "screen": "dashboard"}
+    }
+
+def kyc_rejected_content(reason: str = "") -> dict:
+    return {
+        "title": "KYC Requires Attention",
+        "body": "Your KYC needs additional information. Please check the app for details.",
+        "data": {"type": "kyc_rejected", "screen": "kyc", "reason": reason}
+    }
+
+def wallet_decision_content(label: str, approved: bool, notes: Optional[str] = None) -> dict:
+    if approved:
+        return {
+            "title": "Wallet Verified",
+            "body": f"Your wallet \"{label}\" has been verified and can now receive orders.",
+            "data": {"type": "wallet_verified", "screen": "wallets"}
+        }
+    return {
+        "title": "Wallet Requires Attention",
+        "body": f"Your wallet \"{label}\" could not be verified. Please check the app for details.",
+        "data": {"type": "wallet_rejected", "screen": "wallets", "notes": notes or ""}
+    }
+
+def rate_update_content(asset: str, rate: float) -> dict:
+    return {
+        "title": f"{asset} Rate Updated",
+        "body": f"New {asset} rate available: ₹{rate:,.2f}",
+        "data": {"type": "rate_update", "asset": asset, "screen": "dashboard"}
+    }
+
 async def notify_kyc_approved(push_tokens: List[str], user_name: str = "User") -> dict:
     """Send push notification when KYC is approved"""
-    return await push_service.send_push_notification(
-        push_tokens=push_tokens,
-        title="KYC Approved! 🎉",
-        body=f"Congratulations {user_name}! Your KYC has been approved. You can now start trading.",
-        data={"type": "kyc_approved", "screen": "dashboard"}
-    )
+    return await push_service.send_push_notification(push_tokens=push_tokens, **kyc_approved_content(user_name))
 
 async def notify_kyc_rejected(push_tokens: List[str], reason: str = "") -> dict:
     """Send push notification when KYC is rejected"""
-    return await push_service.send_push_notification(
-        push_tokens=push_tokens,
-        title="KYC Requires Attention",
-        body=f"Your KYC needs additional information. Please check the app for details.",
-        data={"type": "kyc_rejected", "screen": "kyc", "reason": reason}
-    )
+    return await push_service.send_push_notification(push_tokens=push_tokens, **kyc_rejected_content(reason))
 
 async def notify_order_status_update(
     push_tokens: List[str],
@@ -140,10 +298,5 @@ async def notify_order_status_update(
     )
 
 async def notify_new_rate_available(push_tokens: List[str], asset: str, rate: float) -> dict:
-    """Send push notification for rate updates (optional feature)"""
-    return await push_service.send_push_notification(
-        push_tokens=push_tokens,
-        title=f"{asset} Rate Updated",
-        body=f"New {asset} rate available: ₹{rate:,.2f}",
-        data={"type": "rate_update", "asset": asset, "screen": "dashboard"}
-    )
+    """Send push notification for rate updates to a few devices (see services.rate_notifications for all users)"""
+    return await push_service.send_push_notification(push_tokens=push_tokens, **rate_update_content(asset, rate))
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+from core.database import db
+from services.push_service import push_service, push_message, rate_update_content
+
+logger = logging.getLogger(__name__)
+
+# Rate-change push fan-out. Recipients' tokens are streamed from MongoDB and
+# handed to push_service.send_push_stream, which sends them in Expo-sized
+# batches under its concurrency and request-rate caps. Each run is recorded
+# in push_fanouts so admins can follow its delivered/failed counts. A run cut
+# short by a shutdown is marked "interrupted" rather than resumed, since its
+# recipients so far cannot be told apart and would be notified twice.
+
+# "all": every client with a push token; "asset": clients who have traded or
+# hold the asset (an order or ledger entry in it)
+RATE_NOTIFY_AUDIENCES = ("all", "asset")
+
+READ_BATCH_SIZE = 1000
+
+_jobs = set()
+
+UNFINISHED_STATUSES = ["queued", "running"]
+
+def _token_filter() -> Dict:
+    return {
+        "role": "user",
+        "is_frozen": {"$ne": True},
+        "push_token": {"$regex": "^ExponentPushToken"}
+    }
+
+async def _tokens(audience: str, asset: str, user_id: Optional[str]) -> AsyncIterator[str]:
+    projection = {"_id": 0, "push_token": 1}
+    if user_id:
+        cursor = db.users.find({**_token_filter(), "id": user_id}, projection)
+    elif audience == "asset":
+        # Distinct client ids from orders and the ledger, then their tokens
+        cursor = db.orders.aggregate([
+            {"$match": {"asset": asset}},
+            {"$group": {"_id": "$user_id"}},
+            {"$unionWith": {"coll": "wallet_ledger", "pipeline": [
+                {"$match": {"asset": asset}},
+                {"$group": {"_id": "$user_id"}}
+            ]}},
+            {"$group": {"_id": "$_id"}},
+            {"$lookup": {
+                "from": "users",
+                "localField": "_id",
+                "foreignField": "id",
+                "pipeline": [{"$match": _token_filter()}, {"$project": projection}],
+                "as": "user"
+            }},
+            {"$unwind": "$user"},
+            {"$replaceWith": "$user"}
+        ], allowDiskUse=True, batchSize=READ_BATCH_SIZE)
+    else:
+        cursor = db.users.find(_token_filter(), projection).batch_size(READ_BATCH_SIZE)
+    
+    async for user in cursor:
+        yield user["push_token"]
+
+async def notify_rate_update(
+    asset: str,
+    rate: float,
+    audience: str = "all",
+    user_id: Optional[str] = None,
+    fanout_id: Optional[str] = None
+) -> Dict:
+    """Push the new rate to every recipient; user_id limits it to one client (user-specific rates)"""
+    fanout_id = fanout_id or str(uuid.uuid4())
+    started_at = datetime.utcnow()
+    await db.push_fanouts.update_one(
+        {"id": fanout_id},
+        {"$set": {"type": "rate_update", "asset": asset, "rate": rate, "audience": audience,
+                  "user_id": user_id, "status": "running", "started_at": started_at}},
+        upsert=True
+    )
+    content = rate_update_content(asset, rate)
+    
+    async def messages():
+        async for token in _tokens(audience, asset, user_id):
+            yield push_message(token, **content)
+    
+    try:
+        counts = await push_service.send_push_stream(messages())
+        status = "completed"
+    except asyncio.CancelledError:
+        await _mark_interrupted({"id": fanout_id})
+        raise
+    except Exception as e:
+        logger.error(f"Rate fan-out {fanout_id} for {asset} failed: {e}")
+        counts, status = {"error": str(e)}, "failed"
+    
+    completed_at = datetime.utcnow()
+    result = {
+        **counts,
+        "status": status,
+        "completed_at": completed_at,
+        "elapsed_ms": round((completed_at - started_at).total_seconds() * 1000, 2)
+    }
+    await db.push_fanouts.update_one({"id": fanout_id}, {"$set": result})
+    return {"id": fanout_id, **result}
+
+async def enqueue_rate_notification(asset: str, rate: float, audience: str = "all", user_id: Optional[str] = None) -> str:
+    """Record a queued fan-out, start it in the background and return its push_fanouts id"""
+    fanout_id = str(uuid.uuid4())
+    await db.push_fanouts.insert_one({
+        "id": fanout_id, "type": "rate_update", "asset": asset, "rate": rate,
+        "audience": audience, "user_id": user_id, "status": "queued", "queued_at": datetime.utcnow()
+    })
+    task = asyncio.create_task(notify_rate_update(asset, rate, audience, user_id, fanout_id))
+    _jobs.add(task)
+    task.add_done_callback(_jobs.discard)
+    return fanout_id
+
+async def _mark_interrupted(query: Dict) -> int:
+    result = await db.push_fanouts.update_many(
+        {**query, "status": {"$in": UNFINISHED_STATUSES}},
+        {"$set": {"status": "interrupted", "completed_at": datetime.utcnow()}}
+    )
+    return result.modified_count
+
+async def interrupt_stale_rate_notifications():
+    """Mark fan-outs left queued or running when the server last stopped as interrupted"""
+    interrupted = await _mark_interrupted({})
+    if interrupted:
+        logger.warning(f"Marked {interrupted} unfinished rate fan-outs as interrupted")
+
+def cancel_rate_notifications():
+    for task in list(_jobs):
+        task.cancel()
@@ -0,0 +1,246 @@
+import sys
+import uuid
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+# Ledger amounts are asset quantities; orders carry both quantity and INR.
+# Everything is compared in integer minor units so float noise cannot hide
+# (or invent) a discrepancy.
+QUANTITY_SCALE = 10 ** 8   # satoshi-scale
+INR_SCALE = 100            # paise
+
+RECONCILE_BATCH_SIZE = 10000
+SAMPLE_LIMIT = 100
+
+def _key_bytes(value: str, originals: Dict[bytes, str]) -> bytes:
+    """
+    16-byte join key: the raw UUID, or a digest for legacy non-UUID ids.
+    Digested ids are remembered in `originals` so reports can name them.
+    """
+    try:
+        key = uuid.UUID(value).bytes
+        if str(uuid.UUID(bytes=key)) == value:
+            return key
+    except (ValueError, AttributeError, TypeError):
+        pass
+    key = hashlib.blake2b(str(value).encode(), digest_size=16).digest()
+    # NumPy "S16" values drop trailing NUL bytes, so index by the stripped form
+    originals[key.rstrip(b"\0")] = str(value)
+    return key
+
+def _to_minor_units(values: List[float], scale: int) -> np.ndarray:
+    return np.rint(np.asarray(values, dtype=np.float64) * scale).astype(np.int64)
+
+def _key_to_str(key: bytes, originals: Dict[bytes, str]) -> str:
+    if key in originals:
+        return originals[key]
+    return str(uuid.UUID(bytes=key.ljust(16, b"\0")))
+
+class _Columns:
+    """Accumulates one batch of columns at a time and concatenates at the end"""
+    
+    def __init__(self):
+        self.keys, self.amounts, self.assets, self.extra = [], [], [], []
+    
+    def add(self, keys: List[bytes], amounts: np.ndarray, assets: List[int], extra: np.ndarray = None):
+        self.keys.append(np.frombuffer(b"".join(keys), dtype="S16"))
+        self.amounts.append(amounts)
+        self.assets.append(np.asarray(assets, dtype=np.int32))
+        if extra is not None:
+            self.extra.append(extra)
+    
+    def finish(self):
+        def cat(parts, dtype):
+            return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        return cat(self.keys, "S16"), cat(self.amounts, np.int64), cat(self.assets, np.int32), cat(self.extra, np.int64)
+
+async def _load_orders(asset_codes: Dict[str, int], originals: Dict[bytes, str]):
+    columns = _Columns()
+    cursor = db.orders.find(
+        {"status": "completed"},
+        {"_id": 0, "id": 1, "asset": 1, "order_type": 1, "quantity": 1, "total_inr": 1}
+    ).batch_size(RECONCILE_BATCH_SIZE)
+    
+    batch = []
+    async for order in cursor:
+        batch.append(order)
+        if len(batch) >= RECONCILE_BATCH_SIZE:
+            _add_orders(columns, batch, asset_codes, originals)
+            batch = []
+    if batch:
+        _add_orders(columns, batch, asset_codes, originals)
+    return columns.finish()
+
+def _add_orders(columns: _Columns, batch: List[dict], asset_codes: Dict[str, int], originals: Dict[bytes, str]):
+    # Buys are credited to the client, sells debited
+    sign = np.array([1 if o.get("order_type") == "buy" else -1 for o in batch], dtype=np.int64)
+    quantity = _to_minor_units([o.get("quantity", 0) for o in batch], QUANTITY_SCALE)
+    columns.add(
+        [_key_bytes(o["id"], originals) for o in batch],
+        sign * quantity,
+        [asset_codes.setdefault(o.get("asset"), len(asset_codes)) for o in batch],
+        _to_minor_units([o.get("total_inr", 0) for o in batch], INR_SCALE)
+    )
+
+async def _load_ledger(asset_codes: Dict[str, int], originals: Dict[bytes, str]):
+    columns = _Columns()
+    cursor = db.wallet_ledger.find(
+        {"order_id": {"$ne": None}},
+        {"_id": 0, "order_id": 1, "asset": 1, "transaction_type": 1, "amount": 1}
+    ).batch_size(RECONCILE_BATCH_SIZE)
+    
+    batch = []
+    async for entry in cursor:
+        batch.append(entry)
+        if len(batch) >= RECONCILE_BATCH_SIZE:
+            _add_ledger(columns, batch, asset_codes, originals)
+            batch = []
+    if batch:
+        _add_ledger(columns, batch, asset_codes, originals)
+    return columns.finish()
+
+def _add_ledger(columns: _Columns, batch: List[dict], asset_codes: Dict[str, int], originals: Dict[bytes, str]):
+    sign = np.array([1 if e.get("transaction_type") == "credit" else -1 for e in batch], dtype=np.int64)
+    amount = _to_minor_units([e.get("amount", 0) for e in batch], QUANTITY_SCALE)
+    columns.add(
+        [_key_bytes(e["order_id"], originals) for e in batch],
+        sign * amount,
+        [asset_codes.setdefault(e.get("asset"), len(asset_codes)) for e in batch]
+    )
+
+def _sample(keys: np.ndarray, originals: Dict[bytes, str]) -> List[str]:
+    return [_key_to_str(k, originals) for k in keys[:SAMPLE_LIMIT]]
+
+def _lookup(sorted_keys: np.ndarray, keys: np.ndarray):
+    """Position of each key in `sorted_keys` and whether it is actually there"""
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return pos, sorted_keys[pos] == keys
+
+def reconcile_arrays(order_keys, order_amounts, order_assets, order_inr,
+                     ledger_keys, ledger_amounts, ledger_assets,
+                     originals: Optional[Dict[bytes, str]] = None) -> dict:
+    """
+    Vectorized join of completed orders against order-linked ledger entries.
+    
+    Every completed order should have exactly one ledger entry for the same
+    asset with the same signed quantity. Returns counts plus a sample of ids
+    for each kind of break; `originals` maps digested keys back to their ids.
+    """
+    originals = originals or {}
+    # Group ledger entries by order key, keeping the first entry of each group
+    by_key = np.argsort(ledger_keys, kind="stable")
+    sorted_keys = ledger_keys[by_key]
+    first_index = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(sorted_keys) else np.empty(0, dtype=np.int64)
+    unique_keys = sorted_keys[first_index]
+    counts = np.diff(np.r_[first_index, len(sorted_keys)])
+    first_amounts = ledger_amounts[by_key][first_index]
+    first_assets = ledger_assets[by_key][first_index]
+    
+    # Look up each completed order among the ledger groups
+    pos, found = _lookup(unique_keys, order_keys)
+    if not len(unique_keys):
+        # Nothing to compare against; give the gathers below a row to index
+        counts = np.zeros(1, dtype=np.int64)
+        first_amounts = np.zeros(1, dtype=np.int64)
+        first_assets = np.full(1, -1, dtype=np.int32)
+    
+    entry_counts = np.where(found, counts[pos], 0)
+    missing = ~found
+    duplicated = entry_counts > 1
+    single = entry_counts == 1
+    mismatched = single & ((first_amounts[pos] != order_amounts) | (first_assets[pos] != order_assets))
+    
+    # Ledger entries pointing at orders that are not completed (or do not exist)
+    _, linked = _lookup(np.sort(order_keys), unique_keys)
+    orphaned = ~linked
+    
+    return {
+        "completed_orders": int(len(order_keys)),
+        "order_ledger_entries": int(len(ledger_keys)),
+        "matched": int((single & ~mismatched).sum()),
+        "missing": {
+            "count": int(missing.sum()),
+            "total_inr": int(order_inr[missing].sum()) / INR_SCALE,
+            "order_ids": _sample(order_keys[missing], originals)
+        },
+        "duplicate": {
+            "count": int(duplicated.sum()),
+            "extra_entries": int((entry_counts[duplicated] - 1).sum()),
+            "order_ids": _sample(order_keys[duplicated], originals)
+        },
+        "mismatched": {
+            "count": int(mismatched.sum()),
+            "order_ids": _sample(order_keys[mismatched], originals)
+        },
+        "orphaned": {
+            "count": int(orphaned.sum()),
+            "order_ids": _sample(unique_keys[orphaned], originals)
+        }
+    }
+
+async def run_reconciliation(save: bool = True) -> dict:
+    """Stream completed orders and ledger entries, reconcile them and store the report"""
+    started_at = datetime.utcnow()
+    asset_codes: Dict[str, int] = {}
+    originals: Dict[bytes, str] = {}
+    
+    order_keys, order_amounts, order_assets, order_inr = await _load_orders(asset_codes, originals)
+    ledger_keys, ledger_amounts, ledger_assets, _ = await _load_ledger(asset_codes, originals)
+    
+    # The join is pure CPU work; keep it off the event loop
+    report = await asyncio.to_thread(
+        reconcile_arrays,
+        order_keys, order_amounts, order_assets, order_inr,
+        ledger_keys, ledger_amounts, ledger_assets, originals
+    )
+    report["started_at"] = started_at
+    report["finished_at"] = datetime.utcnow()
+    report["duration_seconds"] = (report["finished_at"] - started_at).total_seconds()
+    
+    if save:
+        await db.reconciliation_reports.insert_one(dict(report))
+    
+    logger.info(
+        f"Reconciliation: {report['completed_orders']} orders, "
+        f"{report['missing']['count']} missing, {report['duplicate']['count']} duplicate, "
+        f"{report['mismatched']['count']} mismatched, {report['orphaned']['count']} orphaned"
+    )
+    return report
+
+_job: Optional[asyncio.Task] = None
+
+def start_reconciliation() -> bool:
+    """Run a reconciliation in the background; False if one is already running"""
+    global _job
+    if _job is not None and not _job.done():
+        return False
+    _job = asyncio.create_task(_run_job())
+    return True
+
+async def _run_job():
+    try:
+        await run_reconciliation()
+    except Exception as e:
+        logger.error(f"Reconciliation failed: {e}")
+
+def cancel_reconciliation():
+    if _job is not None:
+        _job.cancel()
+
+if __name__ == "__main__":
+    # Manual/cron run: python -m services.reconciliation_service
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(run_reconciliation())
+    print({k: v for k, v in result.items() if k not in ("started_at", "finished_at")})
+    sys.exit(1 if result["missing"]["count"] or result["duplicate"]["count"] or result["mismatched"]["count"] else 0)
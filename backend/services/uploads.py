@@ -0,0 +1,161 @@
+import logging
+from typing import Dict, Tuple
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from core.config import UPLOAD_MAX_BYTES
+from services.blob_store import BlobTooLarge, add_blob_owner, put_stream
+
+logger = logging.getLogger(__name__)
+
+# Streaming multipart uploads. The request body is fed to python-multipart's
+# push parser as it arrives and the file part is written straight into the
+# blob store, so neither the body nor the file is ever held in memory and an
+# oversized file is cut off as soon as it crosses the limit.
+
+ALLOWED_UPLOAD_TYPES = {
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "image/heic",
+    "image/heif",
+    "application/pdf",
+}
+
+# Multipart framing and form fields on top of the file itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+MAX_FORM_FIELD_BYTES = 1024
+
+class _MultipartState:
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self.headers: Dict[bytes, bytes] = {}
+        self.header_field = b""
+        self.header_value = b""
+        self.part = None  # ("field" | "file", form name)
+        self.field_value = bytearray()
+        self.file_content_type = None
+        self.file_started = False
+        self.file_done = False
+        self.pending = bytearray()  # file bytes parsed but not yet stored
+        self.body_done = False
+
+def _build_parser(boundary: bytes, state: _MultipartState) -> MultipartParser:
+    def on_part_begin():
+        state.headers = {}
+
+    def on_header_field(data, start, end):
+        state.header_field += data[start:end]
+
+    def on_header_value(data, start, end):
+        state.header_value += data[start:end]
+
+    def on_header_end():
+        state.headers[state.header_field.lower()] = state.header_value
+        state.header_field = b""
+        state.header_value = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state.headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        if b"filename" in options:
+            if state.file_started:
+                raise HTTPException(status_code=400, detail="Only one file per upload")
+            state.part = ("file", name)
+            state.file_started = True
+            state.file_content_type = state.headers.get(b"content-type", b"").decode("latin-1").lower()
+        else:
+            state.part = ("field", name)
+            state.field_value = bytearray()
+
+    def on_part_data(data, start, end):
+        if state.part[0] == "file":
+            state.pending += data[start:end]
+        else:
+            state.field_value += data[start:end]
+            if len(state.field_value) > MAX_FORM_FIELD_BYTES:
+                raise HTTPException(status_code=413, detail="Form field too large")
+
+    def on_part_end():
+        if state.part[0] == "file":
+            state.file_done = True
+        else:
+            state.fields[state.part[1]] = state.field_value.decode("utf-8", errors="replace")
+        state.part = None
+
+    return MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+async def receive_upload(request: Request, owner_id: str, max_bytes: int = UPLOAD_MAX_BYTES) -> Tuple[Dict[str, str], Dict]:
+    """
+    Stream a single-file multipart/form-data request into the blob store.
+
+    Returns (form fields, blob reference). Form fields may come before or
+    after the file part. The uploader is recorded as an owner of the blob.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes + UPLOAD_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload too large (max {max_bytes // (1024 * 1024)} MB)")
+
+    state = _MultipartState()
+    parser = _build_parser(options[b"boundary"], state)
+    body = request.stream().__aiter__()
+
+    async def pump() -> bool:
+        """Feed the next piece of the body to the parser; False once it is exhausted"""
+        if state.body_done:
+            return False
+        try:
+            chunk = await body.__anext__()
+        except StopAsyncIteration:
+            parser.finalize()
+            state.body_done = True
+            return False
+        if chunk:
+            parser.write(chunk)
+        return True
+
+    # Read up to the file part so its content type is known before storing
+    while not state.file_started:
+        if not await pump():
+            raise HTTPException(status_code=400, detail="No file in upload")
+
+    if state.file_content_type not in ALLOWED_UPLOAD_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {state.file_content_type or 'unknown'}")
+
+    async def file_chunks():
+        while True:
+            if state.pending:
+                chunk = bytes(state.pending)
+                state.pending.clear()
+                yield chunk
+            if state.file_done:
+                return
+            if not await pump() and not state.file_done:
+                raise HTTPException(status_code=400, detail="Upload ended before the file was complete")
+
+    try:
+        ref = await put_stream(file_chunks(), state.file_content_type, max_bytes)
+    except BlobTooLarge:
+        raise HTTPException(status_code=413, detail=f"File too large (max {max_bytes // (1024 * 1024)} MB)")
+
+    if ref["size"] == 0:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+    # Collect any form fields sent after the file
+    while await pump():
+        pass
+
+    await add_blob_owner(ref["sha256"], owner_id)
+    return state.fields, ref
@@ -0,0 +1,143 @@
+import re
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+# Network names as sent by the apps (e.g. "TRC20", "ERC20", "Bitcoin") mapped
+# to the address family that decides how an address is normalized.
+NETWORK_FAMILIES = {
+    "ERC20": "evm",
+    "ETHEREUM": "evm",
+    "ETH": "evm",
+    "BEP20": "evm",
+    "BSC": "evm",
+    "BNB": "evm",
+    "POLYGON": "evm",
+    "MATIC": "evm",
+    "ARBITRUM": "evm",
+    "OPTIMISM": "evm",
+    "TRC20": "tron",
+    "TRON": "tron",
+    "TRX": "tron",
+    "BITCOIN": "bitcoin",
+    "BTC": "bitcoin",
+    "SOLANA": "solana",
+    "SOL": "solana",
+    "XRP": "xrp",
+    "RIPPLE": "xrp",
+    "DOGECOIN": "dogecoin",
+    "DOGE": "dogecoin",
+    "CARDANO": "cardano",
+    "ADA": "cardano",
+}
+
+# Spellings of the same chain, mapped to one key so an address saved as
+# "ERC20" and again as "Ethereum" is recognized as the same wallet
+NETWORK_ALIASES = {
+    "ETHEREUM": "ERC20",
+    "ETH": "ERC20",
+    "BSC": "BEP20",
+    "BNB": "BEP20",
+    "BNBSMARTCHAIN": "BEP20",
+    "MATIC": "POLYGON",
+    "TRON": "TRC20",
+    "TRX": "TRC20",
+    "BTC": "BITCOIN",
+    "SOL": "SOLANA",
+    "RIPPLE": "XRP",
+    "DOGE": "DOGECOIN",
+    "ADA": "CARDANO",
+}
+
+def network_key(network: str) -> str:
+    """Canonical name of a network (e.g. "Ethereum", "erc-20" -> "ERC20"), used for indexing"""
+    key = re.sub(r"[\s_-]", "", network or "").upper()
+    return NETWORK_ALIASES.get(key, key)
+
+def network_family(network: str) -> Optional[str]:
+    return NETWORK_FAMILIES.get(network_key(network))
+
+def normalize_address(network: str, address: str) -> str:
+    """
+    Canonical form of an address for duplicate detection.
+    
+    EVM hex addresses and bech32 addresses are case-insensitive, so they are
+    folded to lowercase. Base58 addresses (Tron, Solana, XRP, legacy Bitcoin)
+    are case-sensitive and only trimmed.
+    """
+    address = address.strip()
+    family = network_family(network)
+    
+    if family == "evm":
+        return address.lower()
+    if family == "bitcoin" and address[:3].lower() in ("bc1", "tb1"):
+        return address.lower()
+    if family == "cardano" and address[:4].lower() == "addr":
+        return address.lower()
+    return address
+
+def address_lookup_candidates(address: str) -> list:
+    """Normalized forms an address could be stored under when the network is unknown"""
+    address = address.strip()
+    return list({address, address.lower()})
+
+async def _apply(operations: List[UpdateOne], wallet_ids: List, skipped: List) -> int:
+    """Run one batch; wallets that would duplicate another are skipped and recorded"""
+    try:
+        result = await db.saved_wallets.bulk_write(operations, ordered=False)
+        return result.modified_count
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            if error.get("code") != 11000:
+                raise
+            skipped.append(wallet_ids[error["index"]])
+        return e.details.get("nModified", 0)
+
+async def backfill_normalized_addresses(batch_size: int = 1000) -> Dict:
+    """
+    Fill normalized_address/network_key on wallets saved before they existed,
+    and re-key wallets whose network was stored under an alias.
+    
+    Wallets that duplicate another wallet of the same user are left as they
+    are and returned under "skipped", for review via /admin/wallets/by-address.
+    """
+    updated = 0
+    skipped: List = []
+    operations, wallet_ids = [], []
+    cursor = db.saved_wallets.find(
+        {}, {"_id": 1, "id": 1, "network": 1, "wallet_address": 1, "normalized_address": 1, "network_key": 1}
+    )
+    async for wallet in cursor:
+        fields = {
+            "normalized_address": normalize_address(wallet.get("network", ""), wallet.get("wallet_address", "")),
+            "network_key": network_key(wallet.get("network", ""))
+        }
+        if all(wallet.get(field) == value for field, value in fields.items()):
+            continue
+        operations.append(UpdateOne({"_id": wallet["_id"]}, {"$set": fields}))
+        wallet_ids.append(wallet.get("id", str(wallet["_id"])))
+        if len(operations) >= batch_size:
+            updated += await _apply(operations, wallet_ids, skipped)
+            operations, wallet_ids = [], []
+    
+    if operations:
+        updated += await _apply(operations, wallet_ids, skipped)
+    
+    logger.info(f"Backfilled normalized addresses on {updated} saved wallets")
+    if skipped:
+        logger.warning(f"Skipped {len(skipped)} wallets that duplicate another saved wallet: {skipped[:100]}")
+    return {"updated": updated, "skipped": skipped}
+
+if __name__ == "__main__":
+    # One-off migration: python -m services.wallet_address
+    # Safe to run with the unique index in place: wallets that would collide
+    # with another of the same user's wallets are skipped and listed, and can
+    # be reviewed with the admin /wallets/by-address endpoint.
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(backfill_normalized_addresses())
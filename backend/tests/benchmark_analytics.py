@@ -0,0 +1,229 @@
+"""
+Admin Analytics Benchmark
+=========================
+
+Compares the original sequential /admin/analytics queries with the
+rollup-based services.analytics_service against a synthetic dataset.
+
+Seeds a throwaway database (<DB_NAME>_analytics_benchmark on MONGO_URL),
+builds its daily_stats rollups, times both implementations and reports any
+differences between their results. The original implementation only summed
+the first 1000 completed orders, so its volumes differ once the dataset is
+larger than that, and it counted new users over the last 7x24 hours where
+the rollups count the last 7 calendar days.
+
+Usage (from backend/):
+    python tests/benchmark_analytics.py --users 20000 --orders 200000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import client  # noqa: E402
+from core.config import DB_NAME  # noqa: E402
+from services.analytics_service import get_dashboard_analytics  # noqa: E402
+from services.daily_stats import rebuild_daily_stats  # noqa: E402
+
+ASSETS = ["USDT", "BTC", "ETH", "SOL", "XRP"]
+ORDER_STATUSES = ["awaiting_payment", "processing", "completed", "completed", "completed", "cancelled"]
+KYC_STATUSES = ["pending", "under_review", "approved", "approved", "rejected"]
+
+
+async def legacy_analytics(db):
+    """The handler as it was before the aggregation rewrite"""
+    total_users = await db.users.count_documents({"role": "user"})
+    verified_users = await db.users.count_documents({"role": "user", "kyc_status": "approved"})
+    pending_kyc = await db.kyc_documents.count_documents({"status": {"$in": ["pending", "under_review"]}})
+    total_orders = await db.orders.count_documents({})
+    completed_orders = await db.orders.count_documents({"status": "completed"})
+    pending_orders = await db.orders.count_documents({"status": {"$in": ["awaiting_payment", "processing"]}})
+    pending_wallets = await db.saved_wallets.count_documents({"verification_status": "pending"})
+    
+    orders = await db.orders.find({"status": "completed"}).to_list(1000)
+    total_buy_volume = sum(o.get("total_inr", 0) for o in orders if o.get("order_type") == "buy")
+    total_sell_volume = sum(o.get("total_inr", 0) for o in orders if o.get("order_type") == "sell")
+    
+    asset_breakdown = {}
+    for order in orders:
+        asset = order.get("asset", "Unknown")
+        if asset not in asset_breakdown:
+            asset_breakdown[asset] = {"count": 0, "volume": 0}
+        asset_breakdown[asset]["count"] += 1
+        asset_breakdown[asset]["volume"] += order.get("total_inr", 0)
+    
+    daily_orders = []
+    for i in range(7):
+        date = datetime.utcnow() - timedelta(days=i)
+        start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = start + timedelta(days=1)
+        count = await db.orders.count_documents({"created_at": {"$gte": start, "$lt": end}})
+        day_orders = await db.orders.find({
+            "created_at": {"$gte": start, "$lt": end},
+            "status": "completed"
+        }).to_list(1000)
+        daily_orders.append({
+            "date": start.strftime("%Y-%m-%d"),
+            "day": start.strftime("%a"),
+            "count": count,
+            "volume": sum(o.get("total_inr", 0) for o in day_orders)
+        })
+    daily_orders.reverse()
+    
+    kyc_approved = await db.users.count_documents({"kyc_status": "approved"})
+    kyc_pending = await db.users.count_documents({"kyc_status": "pending"})
+    kyc_rejected = await db.users.count_documents({"kyc_status": "rejected"})
+    kyc_under_review = await db.users.count_documents({"kyc_status": "under_review"})
+    
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    new_users_this_week = await db.users.count_documents({"role": "user", "created_at": {"$gte": week_ago}})
+    
+    return {
+        "overview": {
+            "total_users": total_users,
+            "verified_users": verified_users,
+            "pending_kyc": pending_kyc,
+            "total_orders": total_orders,
+            "completed_orders": completed_orders,
+            "pending_orders": pending_orders,
+            "pending_wallets": pending_wallets,
+            "new_users_this_week": new_users_this_week
+        },
+        "volume": {
+            "total_buy_volume": total_buy_volume,
+            "total_sell_volume": total_sell_volume,
+            "total_volume": total_buy_volume + total_sell_volume
+        },
+        "charts": {
+            "asset_breakdown": [{"asset": k, "count": v["count"], "volume": v["volume"]} for k, v in asset_breakdown.items()],
+            "daily_orders": daily_orders,
+            "kyc_status": {
+                "approved": kyc_approved,
+                "pending": kyc_pending,
+                "rejected": kyc_rejected,
+                "under_review": kyc_under_review
+            }
+        }
+    }
+
+
+async def seed(db, users, orders, batch_size=10000):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    user_ids = []
+    for offset in range(0, users, batch_size):
+        batch = []
+        for _ in range(min(batch_size, users - offset)):
+            user_id = str(uuid.uuid4())
+            user_ids.append(user_id)
+            batch.append({
+                "id": user_id,
+                "role": "user",
+                "kyc_status": rng.choice(KYC_STATUSES),
+                "created_at": now - timedelta(days=rng.uniform(0, 365))
+            })
+        await db.users.insert_many(batch)
+    
+    for offset in range(0, orders, batch_size):
+        batch = []
+        for _ in range(min(batch_size, orders - offset)):
+            quantity = rng.uniform(0.01, 5)
+            rate = rng.uniform(80, 8_000_000)
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "user_id": rng.choice(user_ids),
+                "asset": rng.choice(ASSETS),
+                "order_type": rng.choice(["buy", "sell"]),
+                "status": rng.choice(ORDER_STATUSES),
+                "total_inr": round(quantity * rate, 2),
+                "created_at": now - timedelta(days=rng.uniform(0, 90))
+            })
+        await db.orders.insert_many(batch)
+    
+    await db.kyc_documents.insert_many([
+        {"id": str(uuid.uuid4()), "user_id": user_id, "status": rng.choice(KYC_STATUSES)}
+        for user_id in user_ids[:max(1, users // 2)]
+    ])
+    await db.saved_wallets.insert_many([
+        {"id": str(uuid.uuid4()), "user_id": user_id, "verification_status": rng.choice(["pending", "verified"])}
+        for user_id in user_ids[:max(1, users // 4)]
+    ])
+    await db.orders.create_index("status")
+    await db.orders.create_index("created_at")
+
+
+def differences(old, new, path=""):
+    """Paths where the two results disagree (volumes compared to the paisa)"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        found = []
+        for key in sorted(set(old) | set(new)):
+            found += differences(old.get(key), new.get(key), f"{path}.{key}")
+        return found
+    if isinstance(old, list) and isinstance(new, list):
+        if path.endswith("asset_breakdown"):
+            old, new = sorted(old, key=lambda r: r["asset"]), sorted(new, key=lambda r: r["asset"])
+        if len(old) != len(new):
+            return [f"{path}: {len(old)} vs {len(new)} items"]
+        found = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            found += differences(a, b, f"{path}[{i}]")
+        return found
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return [] if round(old, 2) == round(new, 2) else [f"{path}: {old} vs {new}"]
+    return [] if old == new else [f"{path}: {old!r} vs {new!r}"]
+
+
+async def timed(label, function, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await function()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"{label:<12} median {timings[len(timings) // 2] * 1000:9.1f} ms   best {timings[0] * 1000:9.1f} ms")
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark database afterwards")
+    args = parser.parse_args()
+    
+    db = client[f"{DB_NAME}_analytics_benchmark"]
+    await client.drop_database(db.name)
+    print(f"Seeding {args.users} users and {args.orders} orders into {db.name}...")
+    await seed(db, args.users, args.orders)
+    
+    try:
+        started = time.perf_counter()
+        buckets = await rebuild_daily_stats(db)
+        print(f"Built {buckets} rollup buckets in {(time.perf_counter() - started) * 1000:.1f} ms")
+        
+        legacy = await timed("sequential", lambda: legacy_analytics(db), args.runs)
+        current = await timed("rollups", lambda: get_dashboard_analytics(db), args.runs)
+        
+        found = differences(legacy, current)
+        if not found:
+            print("✓ Results identical")
+        else:
+            print(f"{len(found)} differences (expected for volumes once completed orders exceed 1000, and new users):")
+            for line in found:
+                print(f"  {line}")
+    finally:
+        if not args.keep:
+            await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
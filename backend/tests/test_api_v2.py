@@ -302,6 +302,261 @@ class TestAdminAuth:
         print(f"  - KYC status breakdown: approved={kyc_status['approved']}, pending={kyc_status['pending']}")
         
         return data
+    
+    def test_admin_analytics_query_groups_orders(self, admin_token):
+        """Test GET /api/admin/analytics/query aggregates orders by bucket and dimension"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/query", headers=headers, params={
+            "group_by": "asset,order_type",
+            "bucket": "day",
+            "metrics": "count,volume,avg_ticket"
+        }, timeout=30)
+        
+        assert response.status_code == 200, f"Analytics query failed: {response.text}"
+        data = response.json()
+        assert "rows" in data
+        assert "orders_matched" in data
+        for row in data["rows"]:
+            assert {"bucket", "asset", "order_type", "count", "volume", "avg_ticket"} <= set(row)
+        assert sum(row["count"] for row in data["rows"]) == data["orders_matched"]
+        
+        # Unknown metrics are rejected
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/query", headers=headers, params={
+            "metrics": "median"
+        }, timeout=30)
+        assert response.status_code == 400
+        
+        print(f"✓ Analytics query returned {len(data['rows'])} rows in {data['elapsed_ms']} ms")
+    
+    def test_admin_analytics_timeseries_buckets_in_timezone(self, admin_token):
+        """Test GET /api/admin/analytics/timeseries returns zero-filled series bucketed in tz"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/timeseries", headers=headers, params={
+            "from": "2026-01-01T00:00:00",
+            "to": "2026-01-08T00:00:00",
+            "granularity": "day",
+            "tz": "Asia/Kolkata",
+            "group_by": "asset"
+        }, timeout=30)
+        
+        assert response.status_code == 200, f"Timeseries failed: {response.text}"
+        data = response.json()
+        assert len(data["buckets"]) == 7
+        assert data["buckets"][0].startswith("2026-01-01T00:00:00+05:30")
+        for line in data["series"]:
+            assert len(line["count"]) == len(line["volume"]) == 7
+        assert data["totals"]["count"] == sum(sum(line["count"]) for line in data["series"])
+        
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/timeseries", headers=headers, params={
+            "tz": "Mars/Olympus_Mons"
+        }, timeout=30)
+        assert response.status_code == 400
+        
+        print(f"✓ Timeseries returned {len(data['series'])} series over {len(data['buckets'])} buckets")
+    
+    def test_admin_orders_paginate_with_cursor(self, admin_token):
+        """Test GET /api/admin/orders pages with X-Next-Cursor and joins user fields"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        first = requests.get(f"{BASE_URL}/api/admin/orders", headers=headers, params={"limit": 2}, timeout=30)
+        assert first.status_code == 200, f"Orders failed: {first.text}"
+        orders = first.json()
+        assert len(orders) <= 2
+        for order in orders:
+            assert "_id" not in order
+            assert "user_email" in order
+        
+        cursor = first.headers.get("X-Next-Cursor")
+        if cursor:
+            second = requests.get(f"{BASE_URL}/api/admin/orders", headers=headers, params={
+                "limit": 2, "cursor": cursor
+            }, timeout=30)
+            assert second.status_code == 200
+            assert not {o["id"] for o in orders} & {o["id"] for o in second.json()}
+            
+            # A cursor is tied to the sort it was issued for
+            mismatched = requests.get(f"{BASE_URL}/api/admin/orders", headers=headers, params={
+                "limit": 2, "cursor": cursor, "sort": "total_inr"
+            }, timeout=30)
+            assert mismatched.status_code == 400
+        
+        filtered = requests.get(f"{BASE_URL}/api/admin/orders", headers=headers, params={
+            "status": "completed", "sort": "total_inr", "order": "asc"
+        }, timeout=30)
+        assert filtered.status_code == 200
+        totals = [o["total_inr"] for o in filtered.json()]
+        assert all(o["status"] == "completed" for o in filtered.json())
+        assert totals == sorted(totals)
+        
+        print(f"✓ Admin orders paginated ({len(orders)} on first page)")
+    
+    def test_admin_search_finds_users_by_email_prefix(self, admin_token):
+        """Test GET /api/admin/search ranks an email prefix match"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        response = requests.get(f"{BASE_URL}/api/admin/search", headers=headers, params={"q": "admin@bharat"}, timeout=30)
+        assert response.status_code == 200, f"Search failed: {response.text}"
+        data = response.json()
+        
+        users = [r for r in data["results"] if r["type"] == "user"]
+        assert any(r["email"] == "admin@bharatbit.com" and r["matched"] == "email" for r in users)
+        scores = [r["score"] for r in data["results"]]
+        assert scores == sorted(scores, reverse=True)
+        
+        # Client ID lookups go through the in-memory prefix index
+        admin_user = next(r for r in users if r["email"] == "admin@bharatbit.com")
+        by_uid = requests.get(f"{BASE_URL}/api/admin/search", headers=headers, params={"q": admin_user["client_uid"]}, timeout=30)
+        assert by_uid.status_code == 200
+        top = by_uid.json()["results"][0]
+        assert top["id"] == admin_user["id"] and top["score"] == 100
+        
+        too_short = requests.get(f"{BASE_URL}/api/admin/search", headers=headers, params={"q": "a"}, timeout=30)
+        assert too_short.status_code == 422
+        
+        print(f"✓ Admin search returned {len(data['results'])} results in {data['elapsed_ms']} ms")
+    
+    def test_admin_exports_stream_csv_and_xlsx(self, admin_token):
+        """Test GET /api/admin/export/* streams full registers as attachments"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        response = requests.get(f"{BASE_URL}/api/admin/export/orders", headers=headers, params={"format": "csv"}, timeout=60)
+        assert response.status_code == 200, f"Export failed: {response.text}"
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment" in response.headers["content-disposition"]
+        assert response.text.splitlines()[0].startswith("id,created_at,client_uid,user_email")
+        
+        response = requests.get(f"{BASE_URL}/api/admin/export/users", headers=headers, params={"format": "xlsx"}, timeout=60)
+        assert response.status_code == 200
+        assert response.content[:2] == b"PK"
+        
+        response = requests.get(f"{BASE_URL}/api/admin/export/kyc", headers=headers, params={"format": "ndjson"}, timeout=60)
+        assert response.status_code == 200
+        
+        response = requests.get(f"{BASE_URL}/api/admin/export/ledger", headers=headers, params={"format": "pdf"}, timeout=60)
+        assert response.status_code == 422
+        
+        print("✓ Admin exports streamed")
+    
+    def test_admin_rm_book_views(self, admin_token):
+        """Test GET /api/admin/rm/me/* scopes clients, orders and volume to the calling RM"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        response = requests.get(f"{BASE_URL}/api/admin/rm/me/clients", headers=headers, params={"limit": 5}, timeout=30)
+        assert response.status_code == 200, f"RM clients failed: {response.text}"
+        assert isinstance(response.json(), list)
+        
+        response = requests.get(f"{BASE_URL}/api/admin/rm/me/orders", headers=headers, timeout=30)
+        assert response.status_code == 200
+        
+        response = requests.get(f"{BASE_URL}/api/admin/rm/me/kyc-pending", headers=headers, params={"limit": 1}, timeout=30)
+        assert response.status_code == 200
+        pending = response.json()
+        assert len(pending) <= 1
+        if "X-Next-Cursor" in response.headers:
+            second = requests.get(f"{BASE_URL}/api/admin/rm/me/kyc-pending", headers=headers, params={
+                "limit": 1, "cursor": response.headers["X-Next-Cursor"]
+            }, timeout=30)
+            assert second.status_code == 200
+            assert all(row["id"] != pending[0]["id"] for row in second.json())
+        
+        response = requests.get(f"{BASE_URL}/api/admin/rm/me/volume", headers=headers, params={"days": 7}, timeout=30)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["daily_orders"]) == 7
+        assert data["total_orders"] == sum(data["orders_by_status"].values())
+        
+        response = requests.get(f"{BASE_URL}/api/admin/rm", headers=headers, timeout=30)
+        assert response.status_code == 200
+        
+        print(f"✓ RM book: {data['clients']} clients, {data['total_orders']} orders")
+    
+    def test_admin_assign_rm_keeps_book_on_contact_edit(self, admin_token):
+        """Test PUT /api/admin/users/{id}/assign-rm only moves the client when rm_id is sent"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        unique_id = str(uuid.uuid4())[:8]
+        registered = requests.post(f"{BASE_URL}/api/auth/register", json={
+            "mobile": f"+919444{unique_id[:6]}",
+            "email": f"rm_client_{unique_id}@testmail.com",
+            "password": "TestPassword123!"
+        }, timeout=30)
+        assert registered.status_code == 200, f"Registration failed: {registered.text}"
+        user_id = registered.json()["user_id"]
+        admin_id = requests.get(f"{BASE_URL}/api/auth/me", headers=headers, timeout=30).json()["id"]
+        
+        def in_book():
+            clients = requests.get(f"{BASE_URL}/api/admin/rm/me/clients", headers=headers, params={"limit": 100}, timeout=30)
+            assert clients.status_code == 200
+            return any(client["id"] == user_id for client in clients.json())
+        
+        response = requests.put(f"{BASE_URL}/api/admin/users/{user_id}/assign-rm", headers=headers, json={
+            "rm_name": "Test RM", "rm_phone": "+919000000001", "rm_id": admin_id
+        }, timeout=30)
+        assert response.status_code == 200, f"Assign RM failed: {response.text}"
+        assert in_book()
+        
+        # Editing the RM's phone without rm_id leaves the client in the book
+        response = requests.put(f"{BASE_URL}/api/admin/users/{user_id}/assign-rm", headers=headers, json={
+            "rm_name": "Test RM", "rm_phone": "+919000000002"
+        }, timeout=30)
+        assert response.status_code == 200
+        assert in_book()
+        
+        # An explicit null takes the client out
+        response = requests.put(f"{BASE_URL}/api/admin/users/{user_id}/assign-rm", headers=headers, json={
+            "rm_name": "Test RM", "rm_phone": "+919000000002", "rm_id": None
+        }, timeout=30)
+        assert response.status_code == 200
+        assert not in_book()
+        
+        print("✓ RM contact edits keep the client's book")
+    
+    def test_admin_rate_update_fans_out_push(self, admin_token):
+        """Test POST /api/admin/rates/update with notify queues a push fan-out that reports counts"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        # A rate specific to a throwaway client, so live rates are untouched
+        unique_id = str(uuid.uuid4())[:8]
+        registered = requests.post(f"{BASE_URL}/api/auth/register", json={
+            "mobile": f"+919555{unique_id[:6]}",
+            "email": f"fanout_{unique_id}@testmail.com",
+            "password": "TestPassword123!"
+        }, timeout=30)
+        assert registered.status_code == 200, f"Registration failed: {registered.text}"
+        
+        response = requests.post(f"{BASE_URL}/api/admin/rates/update", headers=headers, json={
+            "asset": "USDT", "buy_rate": 100.0, "sell_rate": 99.0,
+            "user_specific": registered.json()["user_id"], "notify": "asset"
+        }, timeout=30)
+        assert response.status_code == 200, f"Rate update failed: {response.text}"
+        notification_id = response.json()["notification_id"]
+        
+        for _ in range(20):
+            response = requests.get(f"{BASE_URL}/api/admin/rates/notifications/{notification_id}", headers=headers, timeout=30)
+            assert response.status_code == 200
+            fanout = response.json()
+            if fanout["status"] not in ["queued", "running"]:
+                break
+            time.sleep(0.5)
+        assert fanout["status"] == "completed"
+        assert fanout["sent"] == fanout["delivered"] + fanout["failed"]
+        
+        print(f"✓ Rate fan-out: {fanout['delivered']} delivered, {fanout['failed']} failed")
+    
+    def test_admin_events_stream_opens(self, admin_token):
+        """Test GET /api/admin/events opens a server-sent event stream for admins only"""
+        response = requests.get(f"{BASE_URL}/api/admin/events", timeout=10)
+        assert response.status_code in [401, 403]
+        
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        with requests.get(f"{BASE_URL}/api/admin/events", headers=headers, stream=True, timeout=10) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            first_line = next(response.iter_lines(decode_unicode=True))
+            assert first_line.startswith("retry:")
+        
+        print("✓ Admin event stream opened")
 
 
 class TestCryptoPrices:
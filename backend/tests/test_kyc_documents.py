@@ -0,0 +1,345 @@
+"""
+KYC Document Storage Test Suite
+===============================
+
+Tests for:
+- Multipart upload - POST /api/kyc/upload
+- Submitting KYC with upload references - POST /api/kyc/submit
+- Admin review queue summaries - GET /api/admin/kyc-pending
+- On-demand document streaming - GET /api/admin/kyc/{kyc_id}/documents/{field}
+- Duplicate PAN rejected across accounts - POST /api/kyc/submit
+- Automated verification recorded on submit - auto_verification on GET /api/admin/kyc/{kyc_id}
+"""
+
+import pytest
+import requests
+import os
+import uuid
+import base64
+import time
+import random
+import string
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://crypto-trading-desk.preview.emergentagent.com').rstrip('/')
+
+# 1x1 PNG
+PNG_BYTES = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+
+def register_user(prefix):
+    """Register and verify a fresh user, return auth token"""
+    unique_id = str(uuid.uuid4())[:8]
+    test_email = f"{prefix}_{unique_id}@testmail.com"
+    test_mobile = f"+919444{random.randint(100000, 999999)}"
+    
+    reg_resp = requests.post(f"{BASE_URL}/api/auth/register", json={
+        "mobile": test_mobile,
+        "email": test_email,
+        "password": "TestPassword123!"
+    }, timeout=30)
+    
+    if reg_resp.status_code != 200:
+        pytest.skip(f"Registration failed: {reg_resp.text}")
+    
+    verify_resp = requests.post(f"{BASE_URL}/api/auth/verify-otp", json={
+        "mobile": test_email,
+        "otp": reg_resp.json()["mock_otp"],
+        "purpose": "registration"
+    }, timeout=30)
+    
+    if verify_resp.status_code != 200:
+        pytest.skip(f"OTP verification failed: {verify_resp.text}")
+    
+    return verify_resp.json()["token"]
+
+
+def random_pan():
+    """Well-formed individual PAN that no earlier run has used"""
+    letters = "".join(random.choice(string.ascii_uppercase) for _ in range(3))
+    return f"{letters}P{random.choice(string.ascii_uppercase)}{random.randint(1000, 9999)}{random.choice(string.ascii_uppercase)}"
+
+
+@pytest.fixture(scope="module")
+def user_token():
+    return register_user("kyc_docs")
+
+
+@pytest.fixture(scope="module")
+def pan_number():
+    return random_pan()
+
+
+@pytest.fixture(scope="module")
+def admin_token():
+    """Get admin auth token using provided credentials"""
+    login_resp = requests.post(f"{BASE_URL}/api/auth/login", json={
+        "email": "admin@bharatbit.com",
+        "password": "admin123"
+    }, timeout=30)
+    
+    if login_resp.status_code != 200:
+        pytest.skip(f"Admin login failed: {login_resp.text}")
+    
+    login_data = login_resp.json()
+    verify_resp = requests.post(f"{BASE_URL}/api/auth/verify-2fa", json={
+        "mobile": login_data["mobile"],
+        "otp": login_data["mock_otp"]
+    }, timeout=30)
+    
+    if verify_resp.status_code != 200:
+        pytest.skip(f"Admin 2FA failed: {verify_resp.text}")
+    
+    return verify_resp.json()["token"]
+
+
+@pytest.fixture(scope="module")
+def submitted_kyc(user_token, pan_number):
+    """Upload a PAN image as multipart, then submit KYC referencing it"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    upload = requests.post(
+        f"{BASE_URL}/api/kyc/upload",
+        headers=headers,
+        data={"field": "pan_image"},
+        files={"file": ("pan.png", PNG_BYTES, "image/png")},
+        timeout=30
+    )
+    assert upload.status_code == 200, upload.text
+    reference = upload.json()["reference"]
+    
+    submit = requests.post(f"{BASE_URL}/api/kyc/submit", headers=headers, json={
+        "pan_number": pan_number,
+        "pan_image": reference,
+        "bank_account_number": "1234567890",
+        "bank_ifsc": "ICIC0003458",
+        "bank_name": "ICICI Bank",
+        "bank_branch": "Pune",
+        "account_holder_name": "Test Holder",
+        "nominee_name": "Test Nominee",
+        "nominee_relationship": "Sibling",
+        "nominee_dob": "1990-01-01"
+    }, timeout=30)
+    assert submit.status_code == 200, submit.text
+    return reference
+
+
+class TestKYCUpload:
+    """Test POST /api/kyc/upload"""
+    
+    def test_upload_returns_reference(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.post(
+            f"{BASE_URL}/api/kyc/upload",
+            headers=headers,
+            data={"field": "selfie_image"},
+            files={"file": ("selfie.png", PNG_BYTES, "image/png")},
+            timeout=30
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["reference"].startswith("blob:")
+        assert data["size"] == len(PNG_BYTES)
+        print(f"✓ Upload stored as {data['reference'][:20]}...")
+    
+    def test_unsupported_type_rejected(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.post(
+            f"{BASE_URL}/api/kyc/upload",
+            headers=headers,
+            files={"file": ("notes.txt", b"hello", "text/plain")},
+            timeout=30
+        )
+        assert response.status_code == 415
+        print("✓ Non-image upload rejected with 415")
+    
+    def test_unknown_reference_rejected(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.post(f"{BASE_URL}/api/kyc/submit", headers=headers, json={
+            "pan_image": "blob:" + "0" * 64,
+            "bank_account_number": "1234567890",
+            "bank_ifsc": "ICIC0003458",
+            "bank_name": "ICICI Bank",
+            "bank_branch": "Pune",
+            "account_holder_name": "Test Holder",
+            "nominee_name": "Test Nominee",
+            "nominee_relationship": "Sibling",
+            "nominee_dob": "1990-01-01"
+        }, timeout=30)
+        assert response.status_code == 400
+        print("✓ Reference to someone else's upload rejected")
+    
+    def test_original_released_after_submit(self, user_token, submitted_kyc, pan_number):
+        # The re-encoded image replaces the raw upload, whose EXIF must not linger
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.post(f"{BASE_URL}/api/kyc/submit", headers=headers, json={
+            "pan_number": pan_number,
+            "pan_image": submitted_kyc,
+            "bank_account_number": "1234567890",
+            "bank_ifsc": "ICIC0003458",
+            "bank_name": "ICICI Bank",
+            "bank_branch": "Pune",
+            "account_holder_name": "Test Holder",
+            "nominee_name": "Test Nominee",
+            "nominee_relationship": "Sibling",
+            "nominee_dob": "1990-01-01"
+        }, timeout=30)
+        assert response.status_code == 400
+        assert "Unknown upload reference" in response.json()["detail"]
+        print("✓ Raw upload released once re-encoded")
+
+
+class TestIdentityFingerprints:
+    """Test duplicate identity checks on POST /api/kyc/submit"""
+    
+    def test_duplicate_pan_rejected(self, submitted_kyc, pan_number):
+        headers = {"Authorization": f"Bearer {register_user('kyc_dup')}"}
+        response = requests.post(f"{BASE_URL}/api/kyc/submit", headers=headers, json={
+            "pan_number": pan_number.lower(),
+            "bank_account_number": "9876543210",
+            "bank_ifsc": "HDFC0001234",
+            "bank_name": "HDFC Bank",
+            "bank_branch": "Mumbai",
+            "account_holder_name": "Second Holder",
+            "nominee_name": "Test Nominee",
+            "nominee_relationship": "Sibling",
+            "nominee_dob": "1990-01-01"
+        }, timeout=30)
+        assert response.status_code == 400
+        assert "PAN" in response.json()["detail"]
+        print("✓ PAN registered to another account rejected")
+    
+    def test_collisions_report(self, admin_token):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = requests.get(f"{BASE_URL}/api/admin/kyc/collisions", headers=headers, timeout=30)
+        assert response.status_code == 200
+        for entry in response.json():
+            assert entry["count"] > 1
+            assert entry["kind"] in ("pan", "aadhaar", "bank")
+        print(f"✓ Collisions report returned {len(response.json())} groups")
+
+
+class TestAdminKYCQueue:
+    """Test GET /api/admin/kyc-pending and document streaming"""
+    
+    def test_queue_has_no_images(self, admin_token, submitted_kyc):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = requests.get(f"{BASE_URL}/api/admin/kyc-pending", headers=headers, params={"limit": 500}, timeout=30)
+        assert response.status_code == 200
+        rows = response.json()
+        assert isinstance(rows, list)
+        for row in rows:
+            assert "pan_image" not in row
+            assert "bank_account_number" not in row
+        print(f"✓ Queue returned {len(rows)} summaries in {len(response.content)} bytes")
+    
+    def test_queue_pagination(self, admin_token, submitted_kyc):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        first = requests.get(f"{BASE_URL}/api/admin/kyc-pending", headers=headers, params={"limit": 1}, timeout=30)
+        assert first.status_code == 200
+        assert len(first.json()) == 1
+        cursor = first.headers.get("X-Next-Cursor")
+        if not cursor:
+            pytest.skip("Only one pending KYC")
+        
+        second = requests.get(f"{BASE_URL}/api/admin/kyc-pending", headers=headers, params={"limit": 1, "cursor": cursor}, timeout=30)
+        assert second.status_code == 200
+        assert all(row["id"] != first.json()[0]["id"] for row in second.json())
+        print("✓ Cursor pagination returns the next page")
+    
+    def test_document_streams_on_demand(self, admin_token, submitted_kyc):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        rows = requests.get(f"{BASE_URL}/api/admin/kyc-pending", headers=headers, params={"limit": 500}, timeout=30).json()
+        row = next((r for r in rows if "pan_image" in r.get("documents", {})), None)
+        if row is None:
+            pytest.skip("Submitted KYC not in the first queue page")
+        
+        link = row["documents"]["pan_image"]
+        response = requests.get(f"{BASE_URL}{link['url']}", headers=headers, timeout=30)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("image/")
+        assert len(response.content) == link["size"]
+        print(f"✓ Document streamed ({len(response.content)} bytes)")
+    
+    def test_detail_links_documents(self, admin_token, submitted_kyc):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        rows = requests.get(f"{BASE_URL}/api/admin/kyc-pending", headers=headers, params={"limit": 500}, timeout=30).json()
+        row = next((r for r in rows if "pan_image" in r.get("documents", {})), None)
+        if row is None:
+            pytest.skip("Submitted KYC not in the first queue page")
+        
+        detail = requests.get(f"{BASE_URL}/api/admin/kyc/{row['id']}", headers=headers, timeout=30)
+        assert detail.status_code == 200
+        data = detail.json()
+        assert data["documents"]["pan_image"]["url"].endswith(f"/kyc/{row['id']}/documents/pan_image")
+        assert not data.get("pan_image")
+        assert "data:" not in detail.text
+        print("✓ KYC detail links documents instead of inlining them")
+    
+    def test_auto_verification_recorded(self, admin_token, submitted_kyc):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        rows = requests.get(f"{BASE_URL}/api/admin/kyc-pending", headers=headers, params={"limit": 500}, timeout=30).json()
+        row = next((r for r in rows if "pan_image" in r.get("documents", {})), None)
+        if row is None:
+            pytest.skip("Submitted KYC not in the first queue page")
+        
+        # The checks run in the background after submission
+        for _ in range(20):
+            detail = requests.get(f"{BASE_URL}/api/admin/kyc/{row['id']}", headers=headers, timeout=30).json()
+            auto = detail.get("auto_verification") or {}
+            if auto.get("status") not in (None, "queued", "running"):
+                break
+            time.sleep(1)
+        
+        assert auto.get("status") in ("passed", "failed", "review")
+        assert set(auto["checks"]) == {"pan", "aadhaar", "bank"}
+        assert auto["checks"]["aadhaar"]["status"] == "skipped"
+        print(f"✓ Automated verification finished: {auto['status']}")
+
+
+class TestBulkKYCAction:
+    """Test POST /api/admin/kyc/bulk-action"""
+    
+    def test_bulk_reject_reports_each_item(self, admin_token):
+        token = register_user("kyc_bulk")
+        holder = f"Bulk Holder {uuid.uuid4().hex[:8]}"
+        submit = requests.post(f"{BASE_URL}/api/kyc/submit", headers={"Authorization": f"Bearer {token}"}, json={
+            "pan_number": random_pan(),
+            "bank_account_number": "1234567890",
+            "bank_ifsc": "ICIC0003458",
+            "bank_name": "ICICI Bank",
+            "bank_branch": "Pune",
+            "account_holder_name": holder,
+            "nominee_name": "Test Nominee",
+            "nominee_relationship": "Sibling",
+            "nominee_dob": "1990-01-01"
+        }, timeout=30)
+        assert submit.status_code == 200, submit.text
+        
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        rows = requests.get(f"{BASE_URL}/api/admin/kyc-pending", headers=headers, params={"limit": 500}, timeout=30).json()
+        row = next((r for r in rows if r.get("account_holder_name") == holder), None)
+        if row is None:
+            pytest.skip("Submitted KYC not in the first queue page")
+        
+        response = requests.post(f"{BASE_URL}/api/admin/kyc/bulk-action", headers=headers, json={
+            "kyc_ids": [row["id"], "no-such-kyc"],
+            "action": "reject",
+            "rejection_reason": "Bulk test"
+        }, timeout=30)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["updated"] == 1
+        results = {r["kyc_id"]: r for r in data["results"]}
+        assert results[row["id"]]["success"] and results[row["id"]]["status"] == "rejected"
+        assert not results["no-such-kyc"]["success"]
+        
+        status = requests.get(f"{BASE_URL}/api/kyc/status", headers={"Authorization": f"Bearer {token}"}, timeout=30).json()
+        assert status["status"] == "rejected"
+        assert status["kyc_status"] == "rejected"
+        
+        invalid = requests.post(f"{BASE_URL}/api/admin/kyc/bulk-action", headers=headers, json={
+            "kyc_ids": [row["id"]], "action": "delete"
+        }, timeout=30)
+        assert invalid.status_code == 400
+        print("✓ Bulk KYC action applied with per-item results")
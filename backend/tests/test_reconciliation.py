@@ -0,0 +1,120 @@
+"""
+Reconciliation Test Suite
+=========================
+
+Unit tests for services.reconciliation_service.reconcile_arrays, the
+vectorized order/ledger join behind POST /api/admin/reconciliation/run:
+- Missing, duplicate, mismatched and orphaned ledger entries
+- Minor-unit rounding of float quantities
+- Sample ids for legacy (non-UUID) order ids
+"""
+
+import os
+import sys
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.reconciliation_service import (  # noqa: E402
+    QUANTITY_SCALE, INR_SCALE, _key_bytes, _to_minor_units, reconcile_arrays
+)
+
+BTC, ETH = 0, 1
+
+
+def _columns(rows, originals, with_inr=False):
+    """(id, signed quantity, asset[, total_inr]) rows -> reconcile_arrays columns"""
+    keys = np.frombuffer(b"".join(_key_bytes(row[0], originals) for row in rows), dtype="S16")
+    amounts = _to_minor_units([row[1] for row in rows], QUANTITY_SCALE)
+    assets = np.asarray([row[2] for row in rows], dtype=np.int32)
+    if with_inr:
+        return keys, amounts, assets, _to_minor_units([row[3] for row in rows], INR_SCALE)
+    return keys, amounts, assets
+
+
+def _reconcile(orders, ledger):
+    originals = {}
+    order_columns = _columns(orders, originals, with_inr=True)
+    ledger_columns = _columns(ledger, originals)
+    return reconcile_arrays(*order_columns, *ledger_columns, originals)
+
+
+class TestReconcileArrays:
+    """Break detection in reconcile_arrays"""
+    
+    def test_matching_orders_reconcile(self):
+        a, b = str(uuid.uuid4()), str(uuid.uuid4())
+        report = _reconcile(
+            [(a, 0.5, BTC, 2500000.0), (b, -2.0, ETH, 400000.0)],
+            [(a, 0.5, BTC), (b, -2.0, ETH)]
+        )
+        assert report["matched"] == 2
+        for kind in ("missing", "duplicate", "mismatched", "orphaned"):
+            assert report[kind]["count"] == 0
+        print("✓ Matching orders reconcile")
+    
+    def test_missing_entry_is_reported_with_inr(self):
+        a, b = str(uuid.uuid4()), str(uuid.uuid4())
+        report = _reconcile(
+            [(a, 0.5, BTC, 2500000.0), (b, 1.0, ETH, 200000.55)],
+            [(a, 0.5, BTC)]
+        )
+        assert report["missing"]["count"] == 1
+        assert report["missing"]["order_ids"] == [b]
+        assert report["missing"]["total_inr"] == 200000.55
+        print("✓ Missing ledger entry reported")
+    
+    def test_duplicate_entries_are_counted(self):
+        a = str(uuid.uuid4())
+        report = _reconcile(
+            [(a, 0.5, BTC, 2500000.0)],
+            [(a, 0.5, BTC), (a, 0.5, BTC), (a, 0.5, BTC)]
+        )
+        assert report["duplicate"]["count"] == 1
+        assert report["duplicate"]["extra_entries"] == 2
+        assert report["duplicate"]["order_ids"] == [a]
+        assert report["matched"] == 0
+        print("✓ Duplicate ledger entries counted")
+    
+    def test_mismatched_amount_and_asset(self):
+        a, b = str(uuid.uuid4()), str(uuid.uuid4())
+        report = _reconcile(
+            [(a, 0.5, BTC, 2500000.0), (b, 1.0, ETH, 200000.0)],
+            [(a, 0.4, BTC), (b, 1.0, BTC)]
+        )
+        assert report["mismatched"]["count"] == 2
+        assert sorted(report["mismatched"]["order_ids"]) == sorted([a, b])
+        print("✓ Mismatched amount and asset detected")
+    
+    def test_orphaned_entry(self):
+        a, stray = str(uuid.uuid4()), str(uuid.uuid4())
+        report = _reconcile([(a, 0.5, BTC, 2500000.0)], [(a, 0.5, BTC), (stray, 1.0, ETH)])
+        assert report["orphaned"]["count"] == 1
+        assert report["orphaned"]["order_ids"] == [stray]
+        print("✓ Orphaned ledger entry reported")
+    
+    def test_float_noise_is_rounded_to_minor_units(self):
+        a = str(uuid.uuid4())
+        # 0.1 + 0.2 != 0.3 in floats, but both are 30000000 satoshi
+        report = _reconcile([(a, 0.1 + 0.2, BTC, 0.1 + 0.2)], [(a, 0.3, BTC)])
+        assert report["matched"] == 1
+        assert report["mismatched"]["count"] == 0
+        assert _to_minor_units([0.123456789], QUANTITY_SCALE)[0] == 12345679
+        print("✓ Float noise rounded away in minor units")
+    
+    def test_legacy_ids_are_sampled_verbatim(self):
+        report = _reconcile(
+            [("ORD-1001", 1.0, BTC, 100.0), ("ORD-1002", 1.0, BTC, 100.0)],
+            [("ORD-1001", 1.0, BTC)]
+        )
+        assert report["missing"]["order_ids"] == ["ORD-1002"]
+        print("✓ Legacy order ids reported as stored")
+    
+    def test_empty_ledger(self):
+        a = str(uuid.uuid4())
+        report = _reconcile([(a, 0.5, BTC, 2500000.0)], [])
+        assert report["missing"]["count"] == 1
+        assert report["orphaned"]["count"] == 0
+        print("✓ Empty ledger reports every order missing")
@@ -0,0 +1,143 @@
+"""
+Saved Wallet Address Test Suite
+===============================
+
+Tests for:
+- Address validation on save - POST /api/wallets/save
+- Duplicate detection on save (per user, network and normalized address)
+- Admin batch validation - POST /api/admin/wallets/validate
+"""
+
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://crypto-trading-desk.preview.emergentagent.com').rstrip('/')
+
+VALID_ERC20 = "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"
+BAD_CHECKSUM_ERC20 = "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAeD"
+VALID_TRC20 = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+
+
+@pytest.fixture(scope="module")
+def user_token():
+    """Register and verify a fresh user, return auth token"""
+    unique_id = str(uuid.uuid4())[:8]
+    test_email = f"wallet_test_{unique_id}@testmail.com"
+    test_mobile = f"+919333{unique_id[:6]}"
+    
+    reg_resp = requests.post(f"{BASE_URL}/api/auth/register", json={
+        "mobile": test_mobile,
+        "email": test_email,
+        "password": "TestPassword123!"
+    }, timeout=30)
+    
+    if reg_resp.status_code != 200:
+        pytest.skip(f"Registration failed: {reg_resp.text}")
+    
+    verify_resp = requests.post(f"{BASE_URL}/api/auth/verify-otp", json={
+        "mobile": test_email,
+        "otp": reg_resp.json()["mock_otp"],
+        "purpose": "registration"
+    }, timeout=30)
+    
+    if verify_resp.status_code != 200:
+        pytest.skip(f"OTP verification failed: {verify_resp.text}")
+    
+    return verify_resp.json()["token"]
+
+
+@pytest.fixture(scope="module")
+def admin_token():
+    """Get admin auth token using provided credentials"""
+    login_resp = requests.post(f"{BASE_URL}/api/auth/login", json={
+        "email": "admin@bharatbit.com",
+        "password": "admin123"
+    }, timeout=30)
+    
+    if login_resp.status_code != 200:
+        pytest.skip(f"Admin login failed: {login_resp.text}")
+    
+    login_data = login_resp.json()
+    verify_resp = requests.post(f"{BASE_URL}/api/auth/verify-2fa", json={
+        "mobile": login_data["mobile"],
+        "otp": login_data["mock_otp"]
+    }, timeout=30)
+    
+    if verify_resp.status_code != 200:
+        pytest.skip(f"Admin 2FA failed: {verify_resp.text}")
+    
+    return verify_resp.json()["token"]
+
+
+class TestSaveWalletValidation:
+    """Test POST /api/wallets/save address checks"""
+    
+    def test_malformed_address_rejected(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.post(f"{BASE_URL}/api/wallets/save", json={
+            "asset": "USDT",
+            "network": "ERC20",
+            "wallet_address": BAD_CHECKSUM_ERC20,
+            "label": "Bad checksum"
+        }, headers=headers, timeout=30)
+        
+        assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+        assert "Invalid" in response.json()["detail"]
+        print(f"✓ Bad EIP-55 checksum rejected")
+    
+    def test_valid_address_saved_then_duplicate_rejected(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        payload = {
+            "asset": "USDT",
+            "network": "ERC20",
+            "wallet_address": VALID_ERC20,
+            "label": "Main"
+        }
+        response = requests.post(f"{BASE_URL}/api/wallets/save", json=payload, headers=headers, timeout=30)
+        assert response.status_code == 200, f"Save failed: {response.text}"
+        assert response.json()["wallet"]["verification_status"] == "pending"
+        
+        # Same address in a different case is the same EVM address
+        payload["wallet_address"] = VALID_ERC20.lower()
+        response = requests.post(f"{BASE_URL}/api/wallets/save", json=payload, headers=headers, timeout=30)
+        assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+        assert response.json()["detail"] == "Wallet address already saved"
+        
+        # "Ethereum" is another spelling of the ERC20 network
+        payload["network"] = "Ethereum"
+        response = requests.post(f"{BASE_URL}/api/wallets/save", json=payload, headers=headers, timeout=30)
+        assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+        assert response.json()["detail"] == "Wallet address already saved"
+        print(f"✓ Case-folded and network-alias duplicate EVM addresses rejected")
+
+
+class TestAdminBatchValidation:
+    """Test POST /api/admin/wallets/validate"""
+    
+    def test_requires_admin(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.post(f"{BASE_URL}/api/admin/wallets/validate", json={"addresses": []}, headers=headers, timeout=30)
+        assert response.status_code == 403, f"Expected 403, got {response.status_code}"
+    
+    def test_batch_results(self, admin_token):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = requests.post(f"{BASE_URL}/api/admin/wallets/validate", json={"addresses": [
+            {"network": "ERC20", "address": VALID_ERC20},
+            {"network": "ERC20", "address": BAD_CHECKSUM_ERC20},
+            {"network": "TRC20", "address": VALID_TRC20},
+            {"network": "Lightning", "address": "anything"}
+        ]}, headers=headers, timeout=30)
+        
+        assert response.status_code == 200, f"Validate failed: {response.text}"
+        data = response.json()
+        assert data["total"] == 4
+        assert data["invalid"] == 1
+        assert data["unchecked"] == 1
+        assert [r["valid"] for r in data["results"]] == [True, False, True, True]
+        print(f"✓ Batch validation: {data['valid']} valid, {data['invalid']} invalid")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
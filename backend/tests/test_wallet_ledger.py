@@ -0,0 +1,142 @@
+"""
+Wallet Ledger Test Suite
+========================
+
+Tests for:
+- Point-in-time balances - GET /api/wallets/balance?as_of=
+- Cursor pagination - GET /api/wallets/ledger?limit=&cursor=
+- Streaming export - GET /api/wallets/ledger/export
+"""
+
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://crypto-trading-desk.preview.emergentagent.com').rstrip('/')
+
+
+@pytest.fixture(scope="module")
+def user_token():
+    """Register and verify a fresh user, return auth token"""
+    unique_id = str(uuid.uuid4())[:8]
+    test_email = f"ledger_test_{unique_id}@testmail.com"
+    test_mobile = f"+919222{unique_id[:6]}"
+    
+    reg_resp = requests.post(f"{BASE_URL}/api/auth/register", json={
+        "mobile": test_mobile,
+        "email": test_email,
+        "password": "TestPassword123!"
+    }, timeout=30)
+    
+    if reg_resp.status_code != 200:
+        pytest.skip(f"Registration failed: {reg_resp.text}")
+    
+    verify_resp = requests.post(f"{BASE_URL}/api/auth/verify-otp", json={
+        "mobile": test_email,
+        "otp": reg_resp.json()["mock_otp"],
+        "purpose": "registration"
+    }, timeout=30)
+    
+    if verify_resp.status_code != 200:
+        pytest.skip(f"OTP verification failed: {verify_resp.text}")
+    
+    return verify_resp.json()["token"]
+
+
+class TestPointInTimeBalance:
+    """Test GET /api/wallets/balance with and without as_of"""
+    
+    def test_balance_requires_auth(self):
+        response = requests.get(f"{BASE_URL}/api/wallets/balance", timeout=10)
+        assert response.status_code in [401, 403], f"Expected 401/403, got {response.status_code}"
+        print(f"✓ Balance endpoint requires authentication")
+    
+    def test_current_balance_returns_list(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(f"{BASE_URL}/api/wallets/balance", headers=headers, timeout=30)
+        
+        assert response.status_code == 200, f"Balance failed: {response.text}"
+        assert isinstance(response.json(), list)
+        print(f"✓ Current balance returned: {response.json()}")
+    
+    def test_balance_as_of_past_date(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(
+            f"{BASE_URL}/api/wallets/balance",
+            params={"as_of": "2024-01-01T00:00:00Z"},
+            headers=headers,
+            timeout=30
+        )
+        
+        assert response.status_code == 200, f"Balance as_of failed: {response.text}"
+        # A fresh account had nothing before it existed
+        assert response.json() == []
+        print(f"✓ Historical balance is empty for a new account")
+    
+    def test_balance_invalid_as_of_rejected(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(
+            f"{BASE_URL}/api/wallets/balance",
+            params={"as_of": "not-a-date"},
+            headers=headers,
+            timeout=30
+        )
+        assert response.status_code == 422, f"Expected 422, got {response.status_code}"
+        print(f"✓ Invalid as_of rejected")
+
+
+class TestLedgerPagination:
+    """Test GET /api/wallets/ledger keyset pagination"""
+    
+    def test_ledger_returns_list(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(f"{BASE_URL}/api/wallets/ledger", params={"limit": 10}, headers=headers, timeout=30)
+        
+        assert response.status_code == 200, f"Ledger failed: {response.text}"
+        assert isinstance(response.json(), list)
+        # Empty ledger fits on one page, so there is no next cursor
+        assert "X-Next-Cursor" not in response.headers
+        print(f"✓ Ledger page returned: {len(response.json())} entries")
+    
+    def test_ledger_invalid_cursor_rejected(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(f"{BASE_URL}/api/wallets/ledger", params={"cursor": "garbage"}, headers=headers, timeout=30)
+        assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+        print(f"✓ Invalid cursor rejected")
+    
+    def test_ledger_limit_bounds(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(f"{BASE_URL}/api/wallets/ledger", params={"limit": 10000}, headers=headers, timeout=30)
+        assert response.status_code == 422, f"Expected 422, got {response.status_code}"
+        print(f"✓ Oversized limit rejected")
+
+
+class TestLedgerExport:
+    """Test GET /api/wallets/ledger/export"""
+    
+    def test_export_csv_has_header(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(f"{BASE_URL}/api/wallets/ledger/export", params={"format": "csv"}, headers=headers, timeout=30)
+        
+        assert response.status_code == 200, f"Export failed: {response.text}"
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.text.splitlines()[0].startswith("id,created_at,asset")
+        print(f"✓ CSV export returned header row")
+    
+    def test_export_ndjson(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(f"{BASE_URL}/api/wallets/ledger/export", params={"format": "ndjson"}, headers=headers, timeout=30)
+        
+        assert response.status_code == 200, f"Export failed: {response.text}"
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        print(f"✓ NDJSON export returned")
+    
+    def test_export_unknown_format_rejected(self, user_token):
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = requests.get(f"{BASE_URL}/api/wallets/ledger/export", params={"format": "xml"}, headers=headers, timeout=30)
+        assert response.status_code == 422, f"Expected 422, got {response.status_code}"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])